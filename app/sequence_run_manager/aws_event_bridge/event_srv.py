@@ -1,9 +1,9 @@
-import os
 import logging
 from django.utils import timezone
 from libumccr.aws import libeb
 from sequence_run_manager_proc.domain.samplesheet import SampleSheetDomain
 from sequence_run_manager_proc.domain.librarylinking import LibraryLinkingDomain
+from sequence_run_manager_proc.domain.putevents import batch_put_events_entries
 from sequence_run_manager_proc.domain.events.srsc import SequenceRunStateChange
 
 logger = logging.getLogger(__name__)
@@ -15,208 +15,94 @@ SRLLC_EVENT_TYPE = "SequenceRunLibraryLinkingChange"
 SRM_SOURCE = "orcabus.sequencerunmanager"
 
 
-class EventBridgePublishError(RuntimeError):
-    """Raised when EventBridge accepts a request but rejects its event entry."""
-
-    def __init__(self, message: str, failed_entries: list[dict] | None = None):
-        super().__init__(message)
-        self.failed_entries = failed_entries or []
-
-
-def _get_event_bus_name():
-    event_bus_name = os.environ.get("EVENT_BUS_NAME", None)
-    if event_bus_name is None:
-        logger.error("EVENT_BUS_NAME is not set")
-    return event_bus_name
-
+def get_failed_entries(response: dict) -> dict[int, dict]:
+    """
+    Entries rejected by EventBridge in a PutEvents response, keyed by their index in the request
+    (response entries are in the same order as the request entries).
+    """
+    if not response.get("FailedEntryCount", 0):
+        return {}
+    return {
+        index: {
+            "error_code": entry.get("ErrorCode"),
+            "error_message": entry.get("ErrorMessage"),
+        }
+        for index, entry in enumerate(response.get("Entries", []))
+        if entry.get("ErrorCode") or entry.get("ErrorMessage")
+    }
 
-def _event_type_is_valid(event: dict, expected_event_type: str) -> bool:
-    event_type = event.get("eventType")
-    if event_type != expected_event_type:
-        logger.error(f"Unsupported event type: {event_type}")
-        return False
-    return True
 
+def put_events_batch(event_entries: list[dict]) -> tuple[list[dict], dict[int, dict]]:
+    """
+    Publish the leading event entries that fit in one PutEvents request (up to 10 entries, within the
+    request size limit, see `batch_put_events_entries`), keeping their order.
 
-def _emit_api_event(event_type: str, event_entry: dict, event_bus_name: str):
+    Returns the entries sent and those not published, keyed by their index in the request (see
+    `get_failed_entries`): the ones rejected by EventBridge, or all of them if the request itself failed.
+    """
+    batch = next(batch_put_events_entries(event_entries))
     try:
-        response = libeb.emit_event(event_entry)
-        logger.info(
-            f"Sent a {event_type} event to event bus {event_bus_name}: {event_entry}"
-        )
-        return response
+        return batch, get_failed_entries(libeb.emit_events(batch))
     except Exception as e:
-        logger.error(f"Failed to emit {event_type} event: {e}")
-        return
-
-
-def emit_srsc_api_event(event: dict, attempt_count: int = 1):
-    """Validate and emit a SequenceRunStateChange created through the API."""
-    event_id = event.get("id", "unknown")
-    instrument_run_id = event.get("instrumentRunId", "unknown")
-    event_status = event.get("status", "unknown")
-
-    try:
-        event_bus_name = os.environ.get("EVENT_BUS_NAME", None)
-        if event_bus_name is None:
-            raise ValueError("EVENT_BUS_NAME environment variable is not set.")
+        logger.exception(f"Failed to publish {len(batch)} event entries")
+        return batch, {
+            index: {"error_code": type(e).__name__, "error_message": str(e)}
+            for index in range(len(batch))
+        }
 
-        validated = SequenceRunStateChange.model_validate(event)
-        detail_json = validated.model_dump_json()
-        event_id = validated.id
-        instrument_run_id = validated.instrumentRunId
-        event_status = validated.status
 
-        logger.info(
-            "Emitting SRSC event: event_id=%s instrument_run_id=%s status=%s attempt=%s",
-            event_id,
-            instrument_run_id,
-            event_status,
-            attempt_count,
-        )
-        response = libeb.emit_event(
-            {
-                "Source": SRM_SOURCE,
-                "DetailType": SRSC_EVENT_TYPE,
-                "Detail": detail_json,
-                "EventBusName": event_bus_name,
-            }
-        )
+def _srsc_event_entry(
+    validated: SequenceRunStateChange, event_bus_name: str | None
+) -> dict:
+    return {
+        "Source": SRM_SOURCE,
+        "DetailType": SRSC_EVENT_TYPE,
+        "Detail": validated.model_dump_json(),
+        "EventBusName": event_bus_name,
+    }
 
-        failed_entry_count = response.get("FailedEntryCount", 0)
-        if failed_entry_count:
-            failed_entries = [
-                {
-                    "error_code": entry.get("ErrorCode"),
-                    "error_message": entry.get("ErrorMessage"),
-                }
-                for entry in response.get("Entries", [])
-                if entry.get("ErrorCode") or entry.get("ErrorMessage")
-            ]
-            logger.error(
-                "EventBridge rejected SRSC event entry: event_id=%s instrument_run_id=%s status=%s attempt=%s failed_entry_count=%s failed_entries=%s",
-                event_id,
-                instrument_run_id,
-                event_status,
-                attempt_count,
-                failed_entry_count,
-                failed_entries,
-            )
-            raise EventBridgePublishError(
-                f"EventBridge rejected {failed_entry_count} SRSC event entry: {failed_entries}",
-                failed_entries=failed_entries,
-            )
 
-        logger.info(
-            "SRSC event emitted: event_id=%s instrument_run_id=%s status=%s attempt=%s",
-            event_id,
-            instrument_run_id,
-            event_status,
-            attempt_count,
-        )
-        return response
-    except Exception:
-        logger.exception(
-            "Failed to emit SRSC event: event_id=%s instrument_run_id=%s status=%s attempt=%s",
-            event_id,
-            instrument_run_id,
-            event_status,
-            attempt_count,
-        )
-        raise
+def srsc_api_event_entry(event: dict, event_bus_name: str | None = None) -> dict:
+    """Validate a SequenceRunStateChange created through the API and build its PutEvents entry."""
+    return _srsc_event_entry(
+        SequenceRunStateChange.model_validate(event), event_bus_name
+    )
 
 
-def emit_srssc_api_event(event):
+def srssc_api_event_entries(
+    event: dict, event_bus_name: str | None = None
+) -> list[dict]:
     """
-    Emit SRSSC events to the event bridge sourced from the sequence run manager API.
-
-    Example:
-    {
-    "version": "0",
-    "id": "12345678-90ab-cdef-1234-567890abcdef",
-    "detail-type": "SequenceRunSampleSheetChange",
-    "source": "orcabus.sequencerunmanager",
-    "account": "000000000000",
-    "time": "2025-03-00T00:00:00Z",
-    "region": "ap-southeast-2",
-    "resources": [],
-    "detail": {
-        "instrumentRunId": "250328_A01052_0258_AHFGM7DSXF",
-        "sequenceRunId": "r.1234567890abcdefghijklmn", // fake sequence run id (if empty, a new ghost sequence run is created)
-        "timeStamp": "2025-03-01T00:00:00.000000+00:00",
-        "sampleSheetName": "sampleSheet_v2.csv",
-        "samplesheetBase64gz": "base64_encoded_samplesheet........",
-        "comment":{
-            "comment": "comment",
-            "created_by": "user",
-            "created_at": "2025-03-01T00:00:00.000000+00:00"
-        }
-        }
-    }
+    PutEvents entries of a SequenceRunSampleSheetChange created through the API, a single
+    entry compacted to a pointer event if over the EventBridge size limit.
+    Raises EventEntryTooLargeError if the event can not be made to fit.
     """
-
-    event_bus_name = _get_event_bus_name()
-    if event_bus_name is None:
-        return
-
-    if not _event_type_is_valid(event, SRSSC_EVENT_TYPE):
-        return
-
     sample_sheet_domain = SampleSheetDomain(
         instrument_run_id=event["instrumentRunId"],
         sequence_run_id=event["sequenceRunId"],
         sample_sheet=event["sampleSheet"],
         description=event["description"],
     )
-    event_entry = sample_sheet_domain.to_put_events_request_entry(
+    return sample_sheet_domain.to_put_events_request_entries(
         event_bus_name=event_bus_name,
     )
 
-    return _emit_api_event(SRSSC_EVENT_TYPE, event_entry, event_bus_name)
 
-
-def emit_srllc_api_event(event):
+def srllc_api_event_entries(
+    event: dict, event_bus_name: str | None = None
+) -> list[dict]:
     """
-    Emit SRLLC events to the event bridge sourced from the sequence run manager API.
-
-    Example:
-    {
-    "version": "0",
-    "id": "12345678-90ab-cdef-1234-567890abcdef",
-    "detail-type": "SequenceRunLibraryLinkingChange",
-    "source": "orcabus.sequencerunmanager",
-    "account": "000000000000",
-    "time": "2025-03-00T00:00:00Z",
-    "region": "ap-southeast-2",
-    "resources": [],
-    "detail": {
-        "instrumentRunId": "250328_A01052_0258_AHFGM7DSXF",
-        "sequenceRunId": "r.1234567890abcdefghijklmn", // fake sequence run id (required as sequence run is necessary for library linking)
-        "timeStamp": "2025-03-01T00:00:00.000000+00:00",
-        "linkedLibraries": [
-                "L2000000",
-                "L2000001",
-                "L2000002"
-            ],
-        }
-    }
+    PutEvents entries of a SequenceRunLibraryLinkingChange created through the API, followed by its delta event when the added and removed libraries are given; each split into chunk events if
+    over the EventBridge size limit. Raises EventEntryTooLargeError if the event can not be split to fit.
     """
-
-    event_bus_name = _get_event_bus_name()
-    if event_bus_name is None:
-        return
-
-    if not _event_type_is_valid(event, SRLLC_EVENT_TYPE):
-        return
-
     library_linking_domain = LibraryLinkingDomain(
         instrument_run_id=event["instrumentRunId"],
         sequence_run_id=event["sequenceRunId"],
         linked_libraries=event["linkedLibraries"],
         timestamp=(event["timeStamp"] if "timeStamp" in event else timezone.now()),
+        added_libraries=event.get("addedLibraries"),
+        removed_libraries=event.get("removedLibraries"),
     )
-    event_entry = library_linking_domain.to_put_events_request_entry(
+    return library_linking_domain.to_put_events_request_entries(
         event_bus_name=event_bus_name,
     )
-
-    return _emit_api_event(SRLLC_EVENT_TYPE, event_entry, event_bus_name)
@@ -0,0 +1,188 @@
+import os
+import logging
+from datetime import timedelta
+from typing import Callable, Optional
+
+from django.db import transaction
+from django.db.models import Min, Q
+from django.utils import timezone
+
+from sequence_run_manager.aws_event_bridge.event_srv import put_events_batch
+from sequence_run_manager.models.event_outbox import EventOutbox, EventOutboxStatus
+from sequence_run_manager.models.sequence import Sequence
+
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.INFO)
+
+OUTBOX_RELAY_LIMIT = 100
+OUTBOX_MAX_ATTEMPTS = 10
+# claims of the events being published by a relay, left over by a relay that died before recording the
+# result, are taken over by other relays after that long
+OUTBOX_CLAIM_TIMEOUT = timedelta(minutes=5)
+
+
+def relay_outbox_events(
+    sequence: Optional[Sequence] = None,
+    limit: int = OUTBOX_RELAY_LIMIT,
+    max_attempts: int = OUTBOX_MAX_ATTEMPTS,
+) -> dict:
+    """
+    Publish up to `limit` pending outbox events (optionally only those of the given sequence run) to
+    EventBridge, oldest first, in PutEvents requests of up to 10 entries.
+
+    The events are claimed (marked in flight) in a short transaction, published with no transaction open,
+    then their result is recorded in a second short transaction: no row lock is held during the PutEvents
+    requests. Events claimed by a concurrent relay are skipped until the claim times out.
+
+    Events rejected by EventBridge stay pending and are retried, on their own, by the next relay; they
+    are marked FAILED once rejected max_attempts times. Events of a sequence run are published in the
+    order they were recorded: once one is rejected, the later events of the same sequence run are held
+    back until it is published (or given up on).
+
+    Returns the number of events published, rejected (to be retried), given up on and held back.
+    """
+    event_bus_name = os.environ.get("EVENT_BUS_NAME", None)
+    if event_bus_name is None:
+        raise ValueError("EVENT_BUS_NAME environment variable is not set.")
+
+    result = {"published": 0, "rejected": 0, "failed": 0, "held_back": 0}
+
+    remaining, result["held_back"] = _claim_outbox_events(sequence, limit)
+    if not remaining:
+        return result
+
+    held_back_sequence_ids = set()
+    relayed = []
+    unsent = []
+    while remaining:
+        # drop the events of sequence runs with an event rejected in an earlier request
+        pending = []
+        for outbox_event in remaining:
+            if outbox_event.sequence_id in held_back_sequence_ids:
+                unsent.append(outbox_event)
+            else:
+                pending.append(outbox_event)
+        if not pending:
+            break
+
+        event_entries = [
+            outbox_event.to_put_events_request_entry(event_bus_name)
+            for outbox_event in pending
+        ]
+        batch, failed_entries = put_events_batch(event_entries)
+        batch_events, remaining = pending[: len(batch)], pending[len(batch) :]
+
+        now = timezone.now()
+        for index, outbox_event in enumerate(batch_events):
+            outbox_event.attempt_count += 1
+            outbox_event.claimed_at = None
+            failed_entry = failed_entries.get(index)
+            if failed_entry is None:
+                outbox_event.status = EventOutboxStatus.PUBLISHED
+                outbox_event.published_at = now
+                outbox_event.last_error = None
+                result["published"] += 1
+                continue
+
+            outbox_event.last_error = (
+                f"{failed_entry['error_code']}: {failed_entry['error_message']}"
+            )
+            held_back_sequence_ids.add(outbox_event.sequence_id)
+            if outbox_event.attempt_count >= max_attempts:
+                outbox_event.status = EventOutboxStatus.FAILED
+                result["failed"] += 1
+                logger.error(
+                    f"Giving up on outbox event {outbox_event.id} ({outbox_event.detail_type}) of sequence {outbox_event.sequence_id} after {outbox_event.attempt_count} attempts: {outbox_event.last_error}"
+                )
+            else:
+                result["rejected"] += 1
+                logger.warning(
+                    f"EventBridge rejected outbox event {outbox_event.id} ({outbox_event.detail_type}) of sequence {outbox_event.sequence_id}, attempt {outbox_event.attempt_count}: {outbox_event.last_error}"
+                )
+        relayed.extend(batch_events)
+
+    # the events claimed but held back, not sent, are released for the next relay
+    result["held_back"] += len(unsent)
+    for outbox_event in unsent:
+        outbox_event.claimed_at = None
+
+    with transaction.atomic():
+        EventOutbox.objects.bulk_update(
+            relayed + unsent,
+            ["status", "attempt_count", "last_error", "published_at", "claimed_at"],
+        )
+
+    logger.info(f"Outbox relay: {result}")
+    return result
+
+
+def _claim_outbox_events(
+    sequence: Optional[Sequence], limit: int
+) -> tuple[list[EventOutbox], int]:
+    """
+    Claim up to `limit` pending outbox events not in flight, oldest first, in a short transaction.
+    Returns the claimed events, and the number of the others selected but held back by an earlier event
+    of the same sequence run in flight (claimed by a concurrent relay), left unclaimed.
+    """
+    now = timezone.now()
+    with transaction.atomic():
+        qs = EventOutbox.objects.filter(status=EventOutboxStatus.PENDING).filter(
+            Q(claimed_at__isnull=True) | Q(claimed_at__lt=now - OUTBOX_CLAIM_TIMEOUT)
+        )
+        if sequence is not None:
+            qs = qs.filter(sequence=sequence)
+        # rows being claimed by a concurrent relay are skipped
+        outbox_events = list(
+            qs.select_for_update(skip_locked=True).order_by("id")[:limit]
+        )
+        if not outbox_events:
+            return [], 0
+
+        # an earlier pending event of a sequence run, skipped as in flight, holds back the later ones of
+        # the same sequence run
+        selected_ids = {outbox_event.id for outbox_event in outbox_events}
+        skipped_first_ids = dict(
+            EventOutbox.objects.filter(
+                status=EventOutboxStatus.PENDING,
+                sequence_id__in={e.sequence_id for e in outbox_events},
+                id__lt=outbox_events[-1].id,
+            )
+            .exclude(id__in=selected_ids)
+            .values("sequence_id")
+            .annotate(first_id=Min("id"))
+            .values_list("sequence_id", "first_id")
+        )
+
+        claimed = [
+            outbox_event
+            for outbox_event in outbox_events
+            if outbox_event.id
+            <= skipped_first_ids.get(outbox_event.sequence_id, outbox_event.id)
+        ]
+        EventOutbox.objects.filter(
+            id__in=[outbox_event.id for outbox_event in claimed]
+        ).update(claimed_at=now)
+        for outbox_event in claimed:
+            outbox_event.claimed_at = now
+
+    return claimed, len(outbox_events) - len(claimed)
+
+
+def drain_outbox_events(
+    limit: int = OUTBOX_RELAY_LIMIT,
+    max_attempts: int = OUTBOX_MAX_ATTEMPTS,
+    should_continue: Callable[[], bool] = lambda: True,
+) -> dict:
+    """
+    Relay pending outbox events, `limit` at a time, until there are none left or none could be published by
+    the last relay (rejected ones are left for the next drain). `should_continue` is checked before each relay,
+    e.g. to stop before running out of Lambda time.
+    """
+    totals = {"published": 0, "rejected": 0, "failed": 0, "held_back": 0}
+    while should_continue():
+        result = relay_outbox_events(limit=limit, max_attempts=max_attempts)
+        for key, count in result.items():
+            totals[key] += count
+        if sum(result.values()) < limit or result["published"] == 0:
+            break
+    return totals
@@ -0,0 +1,52 @@
+from django.core.management import BaseCommand
+
+from sequence_run_manager.models import SampleSheet
+from sequence_run_manager.models.sample_sheet import SAMPLE_SHEET_CHECKSUM_TYPES
+
+
+class Command(BaseCommand):
+    help = "Backfill stored checksums for existing sample sheets, in chunks"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--chunk-size",
+            type=int,
+            default=500,
+            help="Number of sample sheets to load and update per chunk",
+        )
+
+    def handle(self, *args, **options):
+        chunk_size = options["chunk_size"]
+        checksum_fields = [
+            f"checksum_{checksum_type}" for checksum_type in SAMPLE_SHEET_CHECKSUM_TYPES
+        ]
+
+        qs = (
+            SampleSheet.objects.filter(
+                checksum_sha256__isnull=True,
+                sample_sheet_content_original__isnull=False,
+            )
+            .only("orcabus_id", "sample_sheet_content_original")
+            .order_by("orcabus_id")
+        )
+
+        # keyset pagination on the primary key so rows without content do not get re-scanned
+        last_orcabus_id = None
+        total = 0
+        while True:
+            chunk_qs = qs
+            if last_orcabus_id is not None:
+                chunk_qs = chunk_qs.filter(orcabus_id__gt=last_orcabus_id)
+            chunk = list(chunk_qs[:chunk_size])
+            if not chunk:
+                break
+
+            for sample_sheet in chunk:
+                sample_sheet.set_checksums()
+            SampleSheet.objects.bulk_update(chunk, checksum_fields)
+
+            total += len(chunk)
+            last_orcabus_id = chunk[-1].orcabus_id
+            print(f"Backfilled checksums for {total} sample sheets")
+
+        print("Done")
@@ -0,0 +1,12 @@
+from django.core.management import BaseCommand
+
+from sequence_run_manager.models import InstrumentRun
+
+
+class Command(BaseCommand):
+    help = "Rebuild the instrument run summaries from the sequence runs"
+
+    def handle(self, *args, **options):
+        total = InstrumentRun.objects.rebuild()
+        print(f"Rebuilt the summaries of {total} instrument runs")
+        print("Done")
@@ -0,0 +1,34 @@
+from django.core.management import BaseCommand
+
+from sequence_run_manager.aws_event_bridge.outbox_srv import (
+    OUTBOX_MAX_ATTEMPTS,
+    OUTBOX_RELAY_LIMIT,
+    drain_outbox_events,
+)
+
+
+class Command(BaseCommand):
+    help = "Publish the pending events of the event outbox to EventBridge"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--limit",
+            type=int,
+            default=OUTBOX_RELAY_LIMIT,
+            help="Number of outbox events to load and publish per relay",
+        )
+        parser.add_argument(
+            "--max-attempts",
+            type=int,
+            default=OUTBOX_MAX_ATTEMPTS,
+            help="Number of rejected attempts after which an outbox event is marked as failed",
+        )
+
+    def handle(self, *args, **options):
+        result = drain_outbox_events(
+            limit=options["limit"], max_attempts=options["max_attempts"]
+        )
+        print(
+            f"Published {result['published']} events, {result['rejected']} rejected (to be retried), "
+            f"{result['failed']} failed, {result['held_back']} held back"
+        )
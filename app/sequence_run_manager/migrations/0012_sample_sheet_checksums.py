@@ -0,0 +1,42 @@
+# Generated by Django 5.2.15 on 2026-10-17 01:06
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("sequence_run_manager", "0011_add_sample_sheet_content_original"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="samplesheet",
+            name="checksum_crc32",
+            field=models.CharField(blank=True, max_length=8, null=True),
+        ),
+        migrations.AddField(
+            model_name="samplesheet",
+            name="checksum_md5",
+            field=models.CharField(blank=True, max_length=32, null=True),
+        ),
+        migrations.AddField(
+            model_name="samplesheet",
+            name="checksum_sha256",
+            field=models.CharField(blank=True, max_length=64, null=True),
+        ),
+        migrations.AddIndex(
+            model_name="samplesheet",
+            index=models.Index(
+                fields=["checksum_sha256"], name="samplesheet_sha256_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="samplesheet",
+            index=models.Index(fields=["checksum_md5"], name="samplesheet_md5_idx"),
+        ),
+        migrations.AddIndex(
+            model_name="samplesheet",
+            index=models.Index(fields=["checksum_crc32"], name="samplesheet_crc32_idx"),
+        ),
+    ]
@@ -0,0 +1,60 @@
+# Generated by Django 5.2.15 on 2026-10-17 01:08
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("sequence_run_manager", "0012_sample_sheet_checksums"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="comment",
+            index=models.Index(
+                condition=models.Q(("is_deleted", False)),
+                fields=["target_id"],
+                name="comment_active_target_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="libraryassociation",
+            index=models.Index(fields=["library_id"], name="libassoc_library_id_idx"),
+        ),
+        migrations.AddIndex(
+            model_name="samplesheet",
+            index=models.Index(
+                fields=["sequence", "sample_sheet_name", "association_timestamp"],
+                name="samplesheet_seq_name_ts_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="sequence",
+            index=models.Index(
+                fields=["sequence_run_id"], name="seq_sequence_run_id_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="sequence",
+            index=models.Index(
+                fields=["instrument_run_id", "start_time"],
+                name="seq_instrument_run_start_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="sequence",
+            index=models.Index(
+                condition=models.Q(("status__isnull", False)),
+                fields=["start_time"],
+                name="seq_start_time_real_run_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="state",
+            index=models.Index(
+                fields=["sequence", "timestamp", "status"],
+                name="state_seq_ts_status_idx",
+            ),
+        ),
+    ]
@@ -0,0 +1,52 @@
+# Generated by Django 5.2.15 on 2026-10-17 01:12
+
+from django.db import migrations, models
+from django.db.models import Exists, OuterRef
+
+
+def remove_duplicate_states(apps, schema_editor):
+    """
+    Duplicate states could be recorded by racing duplicate BSSH events before the unique constraint,
+    keep the first recorded one of each (sequence, timestamp, status).
+    Done in a single DELETE statement, on the (sequence, timestamp, status) index still in place.
+    """
+    State = apps.get_model("sequence_run_manager", "State")
+    earlier_state = State.objects.filter(
+        sequence_id=OuterRef("sequence_id"),
+        timestamp=OuterRef("timestamp"),
+        status=OuterRef("status"),
+        orcabus_id__lt=OuterRef("orcabus_id"),
+    )
+    State.objects.filter(Exists(earlier_state)).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("sequence_run_manager", "0013_hot_path_indexes"),
+    ]
+
+    operations = [
+        migrations.RunPython(remove_duplicate_states, migrations.RunPython.noop),
+        migrations.RemoveIndex(
+            model_name="sequence",
+            name="seq_sequence_run_id_idx",
+        ),
+        migrations.RemoveIndex(
+            model_name="state",
+            name="state_seq_ts_status_idx",
+        ),
+        migrations.AddConstraint(
+            model_name="sequence",
+            constraint=models.UniqueConstraint(
+                fields=("sequence_run_id",), name="seq_sequence_run_id_unique"
+            ),
+        ),
+        migrations.AddConstraint(
+            model_name="state",
+            constraint=models.UniqueConstraint(
+                fields=("sequence", "timestamp", "status"),
+                name="state_seq_ts_status_unique",
+            ),
+        ),
+    ]
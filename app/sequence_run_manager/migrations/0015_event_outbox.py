@@ -0,0 +1,62 @@
+# Generated by Django 5.2.15 on 2026-10-17 01:27
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("sequence_run_manager", "0014_sequence_state_unique"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="EventOutbox",
+            fields=[
+                ("id", models.BigAutoField(primary_key=True, serialize=False)),
+                ("source", models.CharField(max_length=255)),
+                ("detail_type", models.CharField(max_length=255)),
+                ("detail", models.TextField()),
+                ("resources", models.JSONField(blank=True, default=list)),
+                (
+                    "status",
+                    models.CharField(
+                        choices=[
+                            ("PENDING", "Pending"),
+                            ("PUBLISHED", "Published"),
+                            ("FAILED", "Failed"),
+                        ],
+                        default="PENDING",
+                        max_length=255,
+                    ),
+                ),
+                ("attempt_count", models.PositiveIntegerField(default=0)),
+                ("last_error", models.TextField(blank=True, null=True)),
+                ("created_at", models.DateTimeField(auto_now_add=True)),
+                ("published_at", models.DateTimeField(blank=True, null=True)),
+                (
+                    "sequence",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="outbox_events",
+                        to="sequence_run_manager.sequence",
+                    ),
+                ),
+            ],
+            options={
+                "indexes": [
+                    models.Index(
+                        condition=models.Q(("status", "PENDING")),
+                        fields=["id"],
+                        name="outbox_pending_idx",
+                    ),
+                    models.Index(
+                        condition=models.Q(("status", "PENDING")),
+                        fields=["sequence", "id"],
+                        name="outbox_seq_pending_idx",
+                    ),
+                ],
+            },
+        ),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 5.2.15 on 2026-10-17 01:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("sequence_run_manager", "0015_event_outbox"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="samplesheet",
+            name="bssh_file_date_modified",
+            field=models.CharField(blank=True, max_length=64, null=True),
+        ),
+        migrations.AddField(
+            model_name="samplesheet",
+            name="bssh_file_etag",
+            field=models.CharField(blank=True, max_length=255, null=True),
+        ),
+        migrations.AddField(
+            model_name="samplesheet",
+            name="bssh_file_size",
+            field=models.BigIntegerField(blank=True, null=True),
+        ),
+    ]
@@ -0,0 +1,38 @@
+# Generated by Django 5.2.15 on 2026-10-17 01:43
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("sequence_run_manager", "0016_sample_sheet_bssh_file"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="SequenceRunDetails",
+            fields=[
+                (
+                    "sequence",
+                    models.OneToOneField(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        primary_key=True,
+                        related_name="run_details",
+                        serialize=False,
+                        to="sequence_run_manager.sequence",
+                    ),
+                ),
+                ("content", models.BinaryField()),
+                ("fetched_at", models.DateTimeField()),
+                (
+                    "fetched_status",
+                    models.CharField(blank=True, max_length=255, null=True),
+                ),
+            ],
+            options={
+                "abstract": False,
+            },
+        ),
+    ]
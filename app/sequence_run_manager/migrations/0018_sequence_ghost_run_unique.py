@@ -0,0 +1,29 @@
+# Generated by Django 5.2.15 on 2026-10-17 01:52
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("sequence_run_manager", "0017_sequence_run_details"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="sequence",
+            name="ghost_sample_sheet_checksum",
+            field=models.CharField(blank=True, max_length=64, null=True),
+        ),
+        migrations.AddConstraint(
+            model_name="sequence",
+            constraint=models.UniqueConstraint(
+                fields=(
+                    "instrument_run_id",
+                    "sample_sheet_name",
+                    "ghost_sample_sheet_checksum",
+                ),
+                name="seq_ghost_run_unique",
+            ),
+        ),
+    ]
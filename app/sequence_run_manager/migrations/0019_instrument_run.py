@@ -0,0 +1,83 @@
+# Generated by Django 5.2.15 on 2026-10-17 01:55
+
+from django.db import migrations, models
+from django.db.models import Count, Max, Min, OuterRef, Subquery
+from django.utils import timezone
+
+
+def populate_instrument_runs(apps, schema_editor):
+    """
+    Summarise the existing (real) sequence runs per instrument run, as `manage.py rebuild_instrument_runs`
+    does: sequence count, first start time, last end time and the status of the latest started one.
+    """
+    Sequence = apps.get_model("sequence_run_manager", "Sequence")
+    InstrumentRun = apps.get_model("sequence_run_manager", "InstrumentRun")
+    sequences = Sequence.objects.filter(status__isnull=False)
+    latest_status = Subquery(
+        sequences.filter(instrument_run_id=OuterRef("instrument_run_id"))
+        .order_by("-start_time", "-orcabus_id")
+        .values("status")[:1]
+    )
+    groups = (
+        sequences.filter(instrument_run_id__isnull=False)
+        .exclude(instrument_run_id="")
+        .values("instrument_run_id")
+        .annotate(
+            count=Count("orcabus_id", distinct=True),
+            start_time=Min("start_time"),
+            end_time=Max("end_time"),
+            group_status=latest_status,
+        )
+        .order_by()
+    )
+    last_updated = timezone.now()
+    InstrumentRun.objects.bulk_create(
+        (
+            InstrumentRun(
+                instrument_run_id=group["instrument_run_id"],
+                sequence_count=group["count"],
+                start_time=group["start_time"],
+                end_time=group["end_time"],
+                status=group["group_status"],
+                last_updated=last_updated,
+            )
+            for group in groups.iterator()
+        ),
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("sequence_run_manager", "0018_sequence_ghost_run_unique"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="InstrumentRun",
+            fields=[
+                (
+                    "instrument_run_id",
+                    models.CharField(max_length=255, primary_key=True, serialize=False),
+                ),
+                ("sequence_count", models.PositiveIntegerField()),
+                ("start_time", models.DateTimeField(blank=True, null=True)),
+                ("end_time", models.DateTimeField(blank=True, null=True)),
+                ("status", models.CharField(blank=True, max_length=255, null=True)),
+                ("last_updated", models.DateTimeField()),
+            ],
+            options={
+                "indexes": [
+                    models.Index(
+                        fields=["start_time"], name="instrument_run_start_idx"
+                    ),
+                    models.Index(
+                        fields=["status", "start_time"],
+                        name="instrument_run_status_idx",
+                    ),
+                ],
+            },
+        ),
+        migrations.RunPython(populate_instrument_runs, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.15 on 2026-10-17 02:31
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("sequence_run_manager", "0019_instrument_run"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="eventoutbox",
+            name="claimed_at",
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+    ]
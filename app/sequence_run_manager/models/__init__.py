@@ -4,3 +4,6 @@ from .sequence import Sequence, SequenceStatus, LibraryAssociation
 from .comment import Comment
 from .state import State
 from .sample_sheet import SampleSheet
+from .event_outbox import EventOutbox, EventOutboxStatus
+from .sequence_run_details import SequenceRunDetails
+from .instrument_run import InstrumentRun
@@ -1,12 +1,16 @@
+import hashlib
+import json
 import logging
 import operator
 import ulid
 from functools import reduce
 from typing import List
 
-from django.core.exceptions import FieldError
+from django.core.exceptions import FieldError, ValidationError
 from django.core.validators import RegexValidator
-from django.db import models
+from django.db import connections, models
+from django.db.models.query_utils import DeferredAttribute
+from django.db.models.signals import class_prepared
 from django.db.models import (
     Q,
     ManyToManyField,
@@ -21,6 +25,7 @@ from django.db.models import (
 )
 from rest_framework.settings import api_settings
 
+from sequence_run_manager.fields import OrcaBusIdField
 from sequence_run_manager.pagination import PaginationConstant
 
 logger = logging.getLogger(__name__)
@@ -32,6 +37,53 @@ orcabus_id_validator = RegexValidator(
 )
 
 
+class JsonFingerprint(str):
+    """
+    Digest of a JSON value (dict or list), snapshot by `OrcaBusBaseModel.set_loaded_field_values` instead
+    of a copy of the value: a parsed sample sheet is not held twice by every loaded row.
+    """
+
+    @classmethod
+    def of(cls, value) -> "JsonFingerprint":
+        serialized = json.dumps(value, sort_keys=True, default=str)
+        return cls(hashlib.sha256(serialized.encode("utf-8")).hexdigest())
+
+
+class LoadedJson:
+    """
+    Reference to a JSON value (dict or list) as loaded from the database, snapshot by
+    `OrcaBusBaseModel.set_loaded_field_values` on load. It is fingerprinted on first access of the field
+    only (see `JsonFingerprintAttribute`), before it can be mutated in place: rows read and never
+    modified are not serialized and hashed.
+    """
+
+    __slots__ = ("value",)
+
+    def __init__(self, value):
+        self.value = value
+
+
+class JsonFingerprintAttribute(DeferredAttribute):
+    """
+    Model attribute of a JSON field, fingerprinting the loaded value on first access. A data descriptor
+    (unlike `DeferredAttribute`), so that it is reached even once the value is in the instance dict.
+    """
+
+    def __set__(self, instance, value):
+        instance.__dict__[self.field.attname] = value
+
+    def __get__(self, instance, cls=None):
+        value = super().__get__(instance, cls)
+        if instance is not None:
+            loaded_field_values = getattr(instance, "_loaded_field_values", {})
+            loaded_value = loaded_field_values.get(self.field.attname)
+            if isinstance(loaded_value, LoadedJson):
+                loaded_field_values[self.field.attname] = JsonFingerprint.of(
+                    loaded_value.value
+                )
+        return value
+
+
 class OrcaBusBaseManager(models.Manager):
     @staticmethod
     def reduce_multi_values_qor(key: str, values: List[str]):
@@ -82,18 +134,196 @@ class OrcaBusBaseManager(models.Manager):
 
         return qs
 
+    def fast_create(self, **kwargs):
+        """
+        Same as `create()` but saves in fast mode, see `OrcaBusBaseModel.save`
+        """
+        obj = self.model(**kwargs)
+        obj.save(force_insert=True, using=self.db, fast=True)
+        return obj
+
+    def insert_or_ignore(self, obj, unique_fields: List[str]) -> bool:
+        """
+        Insert the instance with a single `INSERT ... ON CONFLICT (unique_fields) DO NOTHING` statement,
+        fields are validated as in fast mode save. Returns True if the row was created, False if a row
+        with the same unique fields already exists (in which case the instance is left unsaved).
+        """
+        connection = connections[self.db]
+        meta = self.model._meta
+        qn = connection.ops.quote_name
+
+        obj.fast_full_clean()
+        fields = meta.concrete_fields
+        values = [
+            f.get_db_prep_save(f.pre_save(obj, add=True), connection) for f in fields
+        ]
+        conflict_columns = [meta.get_field(name).column for name in unique_fields]
+        sql = (
+            f"INSERT INTO {qn(meta.db_table)} ({', '.join(qn(f.column) for f in fields)}) "
+            f"VALUES ({', '.join(['%s'] * len(fields))}) "
+            f"ON CONFLICT ({', '.join(qn(c) for c in conflict_columns)}) DO NOTHING "
+            f"RETURNING {qn(meta.pk.column)}"
+        )
+        with connection.cursor() as cursor:
+            cursor.execute(sql, values)
+            created = cursor.fetchone() is not None
+
+        if created:
+            obj._state.adding = False
+            obj._state.db = self.db
+            obj.set_orcabus_id_prefixes()
+            obj.set_loaded_field_values()
+        return created
+
+    def bulk_create(self, objs, *args, **kwargs):
+        objs = super().bulk_create(objs, *args, **kwargs)
+        for obj in objs:
+            obj.set_orcabus_id_prefixes()
+            obj.set_loaded_field_values()
+        return objs
+
 
 class OrcaBusBaseModel(models.Model):
     class Meta:
         abstract = True
 
-    def save(self, *args, **kwargs):
-        self.full_clean()  # make sure we are validating the inputs (especially the OrcaBus ID)
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance.set_loaded_field_values(loaded=True)
+        return instance
+
+    def refresh_from_db(self, *args, **kwargs):
+        super().refresh_from_db(*args, **kwargs)
+        self.set_loaded_field_values(kwargs.get("fields"), loaded=True)
+
+    def set_loaded_field_values(self, fields=None, loaded: bool = False):
+        """
+        Snapshot the current field values as the persisted state used by `get_dirty_fields`.
+        Only the given field names (or attnames) are snapshot if provided.
+        JSON values just loaded from the database (loaded=True) are referenced and fingerprinted lazily,
+        other JSON values may still be referenced by the caller and are fingerprinted right away.
+        """
+        if not hasattr(self, "_loaded_field_values"):
+            self._loaded_field_values = {}
+        for field in self._meta.concrete_fields:
+            if fields is not None and not {field.name, field.attname} & set(fields):
+                continue
+            if field.attname not in self.__dict__:
+                # deferred field, not loaded
+                continue
+            value = self.__dict__[field.attname]
+            if isinstance(value, (dict, list)):
+                # JSON values may be mutated in place, keep their fingerprint rather than a copy
+                value = LoadedJson(value) if loaded else JsonFingerprint.of(value)
+            self._loaded_field_values[field.attname] = value
+
+    def get_dirty_fields(self) -> List[str]:
+        """
+        Names of the concrete fields whose value differs from the last loaded/saved state.
+        All loaded fields are dirty for an instance that has never been loaded or saved.
+        """
+        loaded_field_values = getattr(self, "_loaded_field_values", {})
+        dirty_fields = []
+        for field in self._meta.concrete_fields:
+            if field.primary_key or field.attname not in self.__dict__:
+                continue
+            if field.attname not in loaded_field_values:
+                dirty_fields.append(field.name)
+                continue
+            value = self.__dict__[field.attname]
+            loaded_value = loaded_field_values[field.attname]
+            try:
+                if isinstance(loaded_value, LoadedJson):
+                    # never accessed, so not mutated in place: only a new value can differ
+                    is_dirty = (
+                        value is not loaded_value.value and value != loaded_value.value
+                    )
+                elif isinstance(loaded_value, JsonFingerprint):
+                    is_dirty = not isinstance(
+                        value, (dict, list)
+                    ) or loaded_value != JsonFingerprint.of(value)
+                else:
+                    # compare as database values, e.g. ignoring the OrcaBus ID prefix or str vs datetime
+                    is_dirty = field.get_prep_value(value) != field.get_prep_value(
+                        loaded_value
+                    )
+            except (TypeError, ValueError, ValidationError):
+                is_dirty = True
+            if is_dirty:
+                dirty_fields.append(field.name)
+        return dirty_fields
+
+    def save(self, *args, fast: bool = False, **kwargs):
+        """
+        Validate and save the instance.
+
+        Saving an already persisted instance only writes the modified fields (see
+        `get_dirty_fields`), and issues no query at all when nothing has changed, unless
+        `update_fields` or `force_update` is given.
+
+        In fast mode, the foreign key, uniqueness and constraint checks of `full_clean` are left to
+        the database instead of being pre-checked with extra SELECT queries; field validation
+        (especially the OrcaBus ID) still runs.
+        """
+        track_changes = not (
+            self._state.adding
+            or args
+            or kwargs.get("force_insert")
+            or kwargs.get("force_update")
+            or kwargs.get("update_fields") is not None
+        )
+        if track_changes and not self.get_dirty_fields():
+            return
+
+        # make sure we are validating the inputs (especially the OrcaBus ID)
+        if fast:
+            self.fast_full_clean()
+        else:
+            self.full_clean()
+
+        if track_changes:
+            # re-evaluate on the cleaned values
+            dirty_fields = self.get_dirty_fields()
+            if not dirty_fields:
+                return
+            kwargs["update_fields"] = dirty_fields + [
+                f.name
+                for f in self._meta.concrete_fields
+                if getattr(f, "auto_now", False) and f.name not in dirty_fields
+            ]
+
         super(OrcaBusBaseModel, self).save(*args, **kwargs)
 
-        # Reload the object from the database to ensure custom fields like OrcaBusIdField
-        # invoke the `from_db_value` method (which provides the annotation) after saving.
-        self.refresh_from_db()
+        # `full_clean` strips the OrcaBus ID prefix, restore it in memory rather than reloading the row
+        self.set_orcabus_id_prefixes()
+        self.set_loaded_field_values(kwargs.get("update_fields"))
+
+    def fast_full_clean(self):
+        """
+        `full_clean` without the checks that need a query: foreign keys, uniqueness and constraints.
+        """
+        self.full_clean(
+            exclude=[f.name for f in self._meta.concrete_fields if f.is_relation],
+            validate_unique=False,
+            validate_constraints=False,
+        )
+
+    def set_orcabus_id_prefixes(self):
+        """
+        Set OrcaBus ID values (including foreign keys to them) to their prefixed form, as they would
+        be after a round trip through `OrcaBusIdField.from_db_value`.
+        """
+        for field in self._meta.concrete_fields:
+            target_field = field.target_field if field.is_relation else field
+            if not isinstance(target_field, OrcaBusIdField):
+                continue
+            value = self.__dict__.get(field.attname)
+            if value:
+                # write to __dict__ directly so cached related objects are kept
+                self.__dict__[field.attname] = target_field.from_db_value(
+                    target_field.get_prep_value(value), None, None
+                )
 
     @classmethod
     def get_fields(cls):
@@ -119,3 +349,15 @@ class OrcaBusBaseModel(models.Model):
                 continue
             base_fields.add(f.name)
         return list(base_fields)
+
+
+def set_json_fingerprint_attributes(sender, **kwargs):
+    """Make JSON fields of OrcaBus models fingerprint their loaded value on first access"""
+    if not issubclass(sender, OrcaBusBaseModel):
+        return
+    for field in sender._meta.concrete_fields:
+        if isinstance(field, models.JSONField):
+            setattr(sender, field.attname, JsonFingerprintAttribute(field))
+
+
+class_prepared.connect(set_json_fingerprint_attributes)
@@ -16,6 +16,16 @@ class CommentManager(OrcaBusBaseManager):
 
 
 class Comment(OrcaBusBaseModel):
+    class Meta:
+        indexes = [
+            # comments are only ever read for their target, excluding soft-deleted ones
+            models.Index(
+                fields=["target_id"],
+                name="comment_active_target_idx",
+                condition=models.Q(is_deleted=False),
+            ),
+        ]
+
     orcabus_id = OrcaBusIdField(primary_key=True, prefix="cmt")
     comment = models.TextField(null=False, blank=False)
     target_id = OrcaBusIdField(prefix="")  # comment association object id
@@ -0,0 +1,91 @@
+from django.db import models
+
+from sequence_run_manager.models.base import OrcaBusBaseModel, OrcaBusBaseManager
+from sequence_run_manager.models.sequence import Sequence
+
+
+class EventOutboxStatus(models.TextChoices):
+    PENDING = "PENDING"
+    PUBLISHED = "PUBLISHED"
+    FAILED = "FAILED"  # rejected by EventBridge on every attempt, given up on
+
+
+class EventOutboxManager(OrcaBusBaseManager):
+    def add_events(
+        self, sequence: Sequence, event_entries: list[dict]
+    ) -> list["EventOutbox"]:
+        """
+        Record PutEvents request entries of the sequence run, in order, for the outbox relay to publish.
+        To be called within the transaction of the change the events describe, so that both are committed
+        (or rolled back) together. The event bus is set by the relay at publication time.
+        """
+        return self.bulk_create(
+            [
+                self.model(
+                    sequence=sequence,
+                    source=event_entry["Source"],
+                    detail_type=event_entry["DetailType"],
+                    detail=event_entry["Detail"],
+                    resources=event_entry.get("Resources") or [],
+                )
+                for event_entry in event_entries
+            ]
+        )
+
+
+class EventOutbox(OrcaBusBaseModel):
+    """
+    Transactional outbox of the domain events to publish to EventBridge, drained by the outbox relay
+    (see `aws_event_bridge.outbox_srv`).
+    """
+
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=["id"],
+                condition=models.Q(status=EventOutboxStatus.PENDING),
+                name="outbox_pending_idx",
+            ),
+            models.Index(
+                fields=["sequence", "id"],
+                condition=models.Q(status=EventOutboxStatus.PENDING),
+                name="outbox_seq_pending_idx",
+            ),
+        ]
+
+    # sequential rather than an OrcaBus ID (ULID), as it gives the publication order of the events
+    id = models.BigAutoField(primary_key=True)
+    sequence = models.ForeignKey(
+        Sequence, on_delete=models.CASCADE, related_name="outbox_events"
+    )
+
+    source = models.CharField(max_length=255)
+    detail_type = models.CharField(max_length=255)
+    detail = models.TextField()
+    resources = models.JSONField(default=list, blank=True)
+
+    status = models.CharField(
+        max_length=255,
+        choices=EventOutboxStatus.choices,
+        default=EventOutboxStatus.PENDING,
+    )
+    attempt_count = models.PositiveIntegerField(default=0)
+    # set while the event is being published by a relay (in flight), from the start of its attempt
+    claimed_at = models.DateTimeField(null=True, blank=True)
+    last_error = models.TextField(null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    published_at = models.DateTimeField(null=True, blank=True)
+
+    objects = EventOutboxManager()
+
+    def __str__(self):
+        return f"ID: {self.id}, detail_type: {self.detail_type}, status: {self.status}, for {self.sequence_id}"
+
+    def to_put_events_request_entry(self, event_bus_name: str) -> dict:
+        return {
+            "Source": self.source,
+            "DetailType": self.detail_type,
+            "Detail": self.detail,
+            "Resources": self.resources,
+            "EventBusName": event_bus_name,
+        }
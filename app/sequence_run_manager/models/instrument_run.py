@@ -0,0 +1,155 @@
+from typing import Iterable, Optional
+
+from django.db import connections, models, transaction
+from django.db.models import Count, F, Max, Min, OuterRef, QuerySet, Subquery
+from django.utils import timezone
+
+from sequence_run_manager.models.base import OrcaBusBaseModel, OrcaBusBaseManager
+from sequence_run_manager.models.sequence import Sequence
+
+
+def instrument_run_groups_queryset(sequence_set: QuerySet) -> QuerySet:
+    """
+    One row per non-empty ``instrument_run_id`` in ``sequence_set``, with the same aggregates as
+    ``list_by_instrument_run_id`` plus ``group_status``: ``status`` of the row with latest
+    ``start_time`` (ties broken by ``orcabus_id`` desc), among rows with non-null ``status``.
+    """
+    latest_status_sq = Subquery(
+        sequence_set.filter(
+            instrument_run_id=OuterRef("instrument_run_id"),
+            status__isnull=False,
+        )
+        .order_by("-start_time", "-orcabus_id")
+        .values("status")[:1]
+    )
+    return (
+        sequence_set.filter(instrument_run_id__isnull=False)
+        .exclude(instrument_run_id="")
+        .values("instrument_run_id")
+        .annotate(
+            # Distinct sequence rows (avoids duplicate joins); matches rows in ``items``.
+            count=Count("orcabus_id", distinct=True),
+            start_time=Min("start_time"),
+            end_time=Max("end_time"),
+            group_status=latest_status_sq,
+        )
+        .order_by("-start_time")
+    )
+
+
+def summarised_sequences_queryset() -> QuerySet:
+    """Sequence runs summarised by InstrumentRun: real ones only, fake sequence runs have no status"""
+    return Sequence.objects.filter(status__isnull=False)
+
+
+class InstrumentRunManager(OrcaBusBaseManager):
+    def groups(self) -> QuerySet:
+        """
+        The rows of ``instrument_run_groups_queryset`` over all the (real) sequence runs, read from the
+        summary table: same keys, default ordering, and ``group_status`` to filter or order on.
+        """
+        return self.values(
+            "instrument_run_id",
+            "start_time",
+            "end_time",
+            count=F("sequence_count"),
+            group_status=F("status"),
+        ).order_by("-start_time")
+
+    def refresh(
+        self, instrument_run_ids: Optional[Iterable[str]] = None, prune: bool = False
+    ):
+        """
+        Recompute the summary of the given instrument runs (all of them if None) from their sequence runs,
+        with a single `INSERT ... SELECT ... ON CONFLICT DO UPDATE` statement. With prune, the summaries
+        of instrument runs left without any sequence run are deleted (a second statement).
+
+        Sequence runs of the same instrument run written concurrently may leave a summary behind the
+        sequence runs until their next write; `manage.py rebuild_instrument_runs` recomputes them all.
+        """
+        sequence_set = summarised_sequences_queryset()
+        if instrument_run_ids is not None:
+            instrument_run_ids = [i for i in set(instrument_run_ids) if i]
+            if not instrument_run_ids:
+                return
+            sequence_set = sequence_set.filter(instrument_run_id__in=instrument_run_ids)
+
+        connection = connections[self.db]
+        qn = connection.ops.quote_name
+        meta = self.model._meta
+        columns = [
+            meta.get_field(name).column
+            for name in (
+                "instrument_run_id",
+                "sequence_count",
+                "start_time",
+                "end_time",
+                "status",
+                "last_updated",
+            )
+        ]
+        groups_sql, groups_params = (
+            instrument_run_groups_queryset(sequence_set)
+            .order_by()
+            .query.sql_with_params()
+        )
+        # the groups as a derived table, whose WHERE clause also keeps SQLite from parsing ON CONFLICT
+        # as a join constraint
+        sql = (
+            f"INSERT INTO {qn(meta.db_table)} ({', '.join(qn(c) for c in columns)}) "
+            f"SELECT g.{qn('instrument_run_id')}, g.{qn('count')}, g.{qn('start_time')}, "
+            f"g.{qn('end_time')}, g.{qn('group_status')}, %s "
+            f"FROM ({groups_sql}) g WHERE true "
+            f"ON CONFLICT ({qn(columns[0])}) DO UPDATE SET "
+            + ", ".join(f"{qn(c)} = EXCLUDED.{qn(c)}" for c in columns[1:])
+        )
+        last_updated = connection.ops.adapt_datetimefield_value(timezone.now())
+        with connection.cursor() as cursor:
+            cursor.execute(sql, (last_updated, *groups_params))
+
+        if prune:
+            stale = self.exclude(
+                instrument_run_id__in=summarised_sequences_queryset().values(
+                    "instrument_run_id"
+                )
+            )
+            if instrument_run_ids is not None:
+                stale = stale.filter(instrument_run_id__in=instrument_run_ids)
+            stale.delete()
+
+    def rebuild(self) -> int:
+        """Recompute the summaries of all the instrument runs, returns their number"""
+        with transaction.atomic(using=self.db):
+            self.all().delete()
+            self.refresh()
+            return self.count()
+
+
+class InstrumentRun(OrcaBusBaseModel):
+    """
+    Summary of the (real) sequence runs of an instrument run, as grouped by ``list_by_instrument_run_id``,
+    kept up to date on every insert or update of a sequence run (see ``Sequence.save``) so that the
+    grouped list and its stats do not aggregate the Sequence table on each request.
+    """
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["start_time"], name="instrument_run_start_idx"),
+            models.Index(
+                fields=["status", "start_time"], name="instrument_run_status_idx"
+            ),
+        ]
+
+    instrument_run_id = models.CharField(max_length=255, primary_key=True)
+    sequence_count = models.PositiveIntegerField()
+    # first start and last end of its sequence runs
+    start_time = models.DateTimeField(null=True, blank=True)
+    end_time = models.DateTimeField(null=True, blank=True)
+    # status of its latest sequence run (by start time, then orcabus_id)
+    status = models.CharField(max_length=255, null=True, blank=True)
+    last_updated = models.DateTimeField()
+
+    objects = InstrumentRunManager()
+
+    def __str__(self):
+        return f"Instrument run {self.instrument_run_id}: {self.sequence_count} sequence runs, status {self.status}"
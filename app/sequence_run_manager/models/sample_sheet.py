@@ -1,15 +1,70 @@
+import hashlib
+import zlib
+from typing import Iterable, Optional
+
 from django.db import models
 
 from sequence_run_manager.models.base import OrcaBusBaseModel, OrcaBusBaseManager
 from sequence_run_manager.models.sequence import Sequence
 from sequence_run_manager.fields import OrcaBusIdField
 
+SAMPLE_SHEET_CHECKSUM_TYPES = ("sha256", "md5", "crc32")
+
+
+def calculate_sample_sheet_checksums(
+    sample_sheet_content_original: Optional[str],
+) -> dict[str, Optional[str]]:
+    """
+    Calculate all supported checksums of the original sample sheet content in a single pass.
+    Args:
+        sample_sheet_content_original: Original CSV content of the sample sheet
+    Returns:
+        dict: lowercase hexadecimal checksum keyed by checksum type ('sha256', 'md5', 'crc32'),
+        values are None if content is None/empty
+    """
+    if not sample_sheet_content_original:
+        return {checksum_type: None for checksum_type in SAMPLE_SHEET_CHECKSUM_TYPES}
+
+    content_bytes = sample_sheet_content_original.encode("utf-8")
+    sha256 = hashlib.sha256()
+    md5 = hashlib.md5()
+    crc32 = 0
+    view = memoryview(content_bytes)
+    for offset in range(0, len(view), 1024 * 1024):
+        block = view[offset : offset + 1024 * 1024]
+        sha256.update(block)
+        md5.update(block)
+        crc32 = zlib.crc32(block, crc32)
+
+    return {
+        "sha256": sha256.hexdigest(),
+        "md5": md5.hexdigest(),
+        # CRC32 is unsigned 32-bit, formatted as zero padded hex
+        "crc32": format(crc32 & 0xFFFFFFFF, "08x"),
+    }
+
 
 class SampleSheetManager(OrcaBusBaseManager):
-    pass
+    def bulk_create(self, objs: Iterable["SampleSheet"], *args, **kwargs):
+        # bulk_create bypasses save(), so populate the checksum columns here
+        objs = list(objs)
+        for obj in objs:
+            obj.set_checksums()
+        return super().bulk_create(objs, *args, **kwargs)
 
 
 class SampleSheet(OrcaBusBaseModel):
+    class Meta:
+        indexes = [
+            models.Index(fields=["checksum_sha256"], name="samplesheet_sha256_idx"),
+            models.Index(fields=["checksum_md5"], name="samplesheet_md5_idx"),
+            models.Index(fields=["checksum_crc32"], name="samplesheet_crc32_idx"),
+            models.Index(
+                fields=["sequence", "sample_sheet_name", "association_timestamp"],
+                name="samplesheet_seq_name_ts_idx",
+            ),
+        ]
+
     orcabus_id = OrcaBusIdField(primary_key=True, prefix="ss")
     sequence = models.ForeignKey(Sequence, on_delete=models.CASCADE)
     sample_sheet_name = models.CharField(max_length=255, null=False, blank=False)
@@ -22,11 +77,53 @@ class SampleSheet(OrcaBusBaseModel):
     # original CSV content of the sample sheet
     sample_sheet_content_original = models.TextField(null=True, blank=True)
 
-    # TODO: add checksums field and filemanager orcabus_id if needed
-    # checksums = models.JSONField()
+    # checksums of the original CSV content, computed at write time
+    checksum_sha256 = models.CharField(max_length=64, null=True, blank=True)
+    checksum_md5 = models.CharField(max_length=32, null=True, blank=True)
+    checksum_crc32 = models.CharField(max_length=8, null=True, blank=True)
+
+    # metadata of the BSSH run file the sample sheet was downloaded from, as listed by BSSH, to tell
+    # whether the file has changed without downloading it again
+    bssh_file_size = models.BigIntegerField(null=True, blank=True)
+    bssh_file_date_modified = models.CharField(max_length=64, null=True, blank=True)
+    bssh_file_etag = models.CharField(max_length=255, null=True, blank=True)
+
+    # TODO: add filemanager orcabus_id if needed
     # fm_orcabus_id = OrcaBusIdField(prefix='fm')
 
     objects = SampleSheetManager()
 
     def __str__(self):
         return f"ID: {self.orcabus_id}, sample_sheet_name: {self.sample_sheet_name}, sequence: {self.sequence}"
+
+    def set_checksums(self):
+        """Populate the checksum columns from the original sample sheet content."""
+        checksums = calculate_sample_sheet_checksums(self.sample_sheet_content_original)
+        for checksum_type, checksum in checksums.items():
+            setattr(self, f"checksum_{checksum_type}", checksum)
+
+    def set_bssh_file(self, bssh_file: Optional[dict]):
+        """Record the metadata of the BSSH run file (an item of the run files listing)"""
+        bssh_file = bssh_file or {}
+        self.bssh_file_size = bssh_file.get("Size")
+        self.bssh_file_date_modified = bssh_file.get("DateModified")
+        self.bssh_file_etag = bssh_file.get("ETag")
+
+    def matches_bssh_file(self, bssh_file: Optional[dict]) -> bool:
+        """
+        Whether the BSSH run file is the one the sample sheet was downloaded from: same size, date
+        modified and ETag. Never matches when the metadata is unknown on either side.
+        """
+        if not bssh_file or self.bssh_file_size is None:
+            return False
+        if not (self.bssh_file_date_modified or self.bssh_file_etag):
+            return False
+        return (
+            self.bssh_file_size == bssh_file.get("Size")
+            and self.bssh_file_date_modified == bssh_file.get("DateModified")
+            and self.bssh_file_etag == bssh_file.get("ETag")
+        )
+
+    def save(self, *args, **kwargs):
+        self.set_checksums()
+        super().save(*args, **kwargs)
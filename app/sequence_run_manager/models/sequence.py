@@ -1,13 +1,33 @@
 import logging
+from typing import Iterable, Optional
 
-from django.db import models
+import ulid
+from django.db import models, transaction
 from django.db.models import QuerySet
+from django.utils import timezone
 
 from sequence_run_manager.models.base import OrcaBusBaseModel, OrcaBusBaseManager
 from sequence_run_manager.fields import OrcaBusIdField
 
 logger = logging.getLogger(__name__)
 
+ASSOCIATION_STATUS = "ACTIVE"
+
+# Sequence fields summarised by InstrumentRun
+INSTRUMENT_RUN_SUMMARY_FIELDS = frozenset(
+    {"instrument_run_id", "status", "start_time", "end_time"}
+)
+
+
+def refresh_instrument_runs(
+    instrument_run_ids: Optional[Iterable[str]], prune: bool = False
+):
+    """Recompute the InstrumentRun summaries of the given instrument runs (all of them if None)"""
+    # imported here, the summary model is built on Sequence
+    from sequence_run_manager.models.instrument_run import InstrumentRun
+
+    InstrumentRun.objects.refresh(instrument_run_ids, prune=prune)
+
 
 class SequenceStatus(models.TextChoices):
     # Convention: status values are to be stored as upper cases
@@ -76,11 +96,91 @@ class SequenceStatus(models.TextChoices):
         ]
 
 
-class SequenceManager(OrcaBusBaseManager):
+class SequenceQuerySet(QuerySet):
+    """Bulk updates and deletes of sequence runs refresh the InstrumentRun summaries they affect"""
+
+    def _summarised_instrument_run_ids(self) -> set[str]:
+        return set(
+            self.filter(status__isnull=False)
+            .values_list("instrument_run_id", flat=True)
+            .distinct()
+        )
+
+    def update(self, **kwargs):
+        if not INSTRUMENT_RUN_SUMMARY_FIELDS.intersection(kwargs):
+            return super().update(**kwargs)
+
+        instrument_run_ids = set(self.values_list("instrument_run_id", flat=True))
+        rows = super().update(**kwargs)
+        instrument_run_id = kwargs.get("instrument_run_id")
+        if instrument_run_id is not None and not isinstance(instrument_run_id, str):
+            # an expression, the new instrument runs are not known
+            refresh_instrument_runs(None, prune=True)
+        else:
+            refresh_instrument_runs(
+                instrument_run_ids | {instrument_run_id}, prune=True
+            )
+        return rows
+
+    update.alters_data = True
+
+    def delete(self):
+        instrument_run_ids = self._summarised_instrument_run_ids()
+        result = super().delete()
+        refresh_instrument_runs(instrument_run_ids, prune=True)
+        return result
+
+    delete.alters_data = True
+    delete.queryset_only = True
+
+
+class SequenceManager(OrcaBusBaseManager.from_queryset(SequenceQuerySet)):
     def get_by_keyword(self, **kwargs) -> QuerySet:
-        qs: QuerySet = super().get_queryset()
+        qs: QuerySet = self.get_queryset()
         return self.get_model_fields_query(qs, **kwargs)
 
+    def insert_or_ignore(self, obj, unique_fields: list[str]) -> bool:
+        created = super().insert_or_ignore(obj, unique_fields)
+        if created and obj.status is not None:
+            refresh_instrument_runs([obj.instrument_run_id])
+        return created
+
+    def bulk_create(self, objs, *args, **kwargs):
+        objs = super().bulk_create(objs, *args, **kwargs)
+        refresh_instrument_runs(
+            obj.instrument_run_id for obj in objs if obj.status is not None
+        )
+        return objs
+
+    def get_or_create_ghost(
+        self, instrument_run_id: str, sample_sheet_name: str, sample_sheet_checksum: str
+    ) -> tuple["Sequence", bool]:
+        """
+        Ghost (fake) sequence run of the instrument run for the sample sheet of the given name and
+        content (SHA-256 checksum), created if it does not exist yet. Repeated sample sheet events
+        resolve to the same ghost with a single lookup on the unique ghost run key; a concurrent
+        creation is resolved by the unique constraint.
+
+        Returns the (sequence, created) tuple.
+        """
+        ghost_key = {
+            "instrument_run_id": instrument_run_id,
+            "sample_sheet_name": sample_sheet_name,
+            "ghost_sample_sheet_checksum": sample_sheet_checksum,
+        }
+        ghost = self.filter(**ghost_key).first()
+        if ghost is not None:
+            return ghost, False
+
+        ghost = self.model(
+            sequence_run_id="r." + ulid.new().str,
+            start_time=timezone.now(),  # record the time when the (ghost) sequence run is created
+            **ghost_key,
+        )
+        if self.insert_or_ignore(ghost, unique_fields=list(ghost_key)):
+            return ghost, True
+        return self.get(**ghost_key), False
+
 
 class Sequence(OrcaBusBaseModel):
     # must have (run_folder_path) or (v1pre3_id and ica_project_id and api_url)
@@ -95,14 +195,42 @@ class Sequence(OrcaBusBaseModel):
         #                                                                                     api_url__isnull=False),
         #                            name='check_run_folder_path_or_bssh_keys_not_null')
         # ]
-        pass
+        constraints = [
+            # looked up on every BSSH event, and the conflict target of the sequence upsert
+            models.UniqueConstraint(
+                fields=["sequence_run_id"], name="seq_sequence_run_id_unique"
+            ),
+            # one ghost sequence run per instrument run and sample sheet (name and content), looked up
+            # by repeated sample sheet events; real sequence runs have no ghost checksum (NULLs are distinct)
+            models.UniqueConstraint(
+                fields=[
+                    "instrument_run_id",
+                    "sample_sheet_name",
+                    "ghost_sample_sheet_checksum",
+                ],
+                name="seq_ghost_run_unique",
+            ),
+        ]
+        indexes = [
+            # instrument run grouping / lookup, ordered by start time within a group
+            models.Index(
+                fields=["instrument_run_id", "start_time"],
+                name="seq_instrument_run_start_idx",
+            ),
+            # list/stats views exclude fake sequence runs (status null) and filter by start time range
+            models.Index(
+                fields=["start_time"],
+                name="seq_start_time_real_run_idx",
+                condition=models.Q(status__isnull=False),
+            ),
+        ]
 
     orcabus_id = OrcaBusIdField(primary_key=True, prefix="seq")
 
     # mandatory non-nullable base fields
     sequence_run_id = models.CharField(
         max_length=255, null=False, blank=False
-    )  # unique key, legacy `run_id`
+    )  # unique key (see Meta.constraints), legacy `run_id`
 
     # NOTE: sample_sheet_name is nullable in BSSH event, but we use UNKNOWN_VALUE to represent the absence of sample sheet
     # https://github.com/OrcaBus/service-sequence-run-manager/issues/28
@@ -138,7 +266,10 @@ class Sequence(OrcaBusBaseModel):
     )  # legacy `name`
     experiment_name = models.CharField(max_length=255, null=True, blank=True)
 
-    # run_config = models.JSONField(null=True, blank=True)  # TODO could be it's own model
+    # SHA-256 of the sample sheet a ghost (fake) sequence run was created for, see get_or_create_ghost
+    ghost_sample_sheet_checksum = models.CharField(max_length=64, null=True, blank=True)
+
+    # BSSH run details (run config) are kept in their own model, see SequenceRunDetails
     # sample_sheet_config = models.JSONField(null=True, blank=True)  # TODO could be it's own model
 
     objects = SequenceManager()
@@ -152,10 +283,43 @@ class Sequence(OrcaBusBaseModel):
             f"Status '{self.status}'"
         )
 
+    def save(self, *args, **kwargs):
+        """Save, and refresh the summary of its instrument run(s) if a summarised field has changed"""
+        loaded_field_values = getattr(self, "_loaded_field_values", {})
+        update_fields = kwargs.get("update_fields")
+        changed_fields = (
+            self.get_dirty_fields() if update_fields is None else update_fields
+        )
+        # fake sequence runs (no status) are not summarised
+        summarised = INSTRUMENT_RUN_SUMMARY_FIELDS.intersection(changed_fields) and (
+            self.status is not None or loaded_field_values.get("status") is not None
+        )
+        previous_instrument_run_id = loaded_field_values.get("instrument_run_id")
+
+        super().save(*args, **kwargs)
+
+        if summarised:
+            refresh_instrument_runs(
+                [self.instrument_run_id, previous_instrument_run_id],
+                prune=previous_instrument_run_id not in (None, self.instrument_run_id),
+            )
+
+    def delete(self, *args, **kwargs):
+        result = super().delete(*args, **kwargs)
+        if self.status is not None:
+            refresh_instrument_runs([self.instrument_run_id], prune=True)
+        return result
+
     def libraries(self) -> list[str]:
         """
-        Get all libraries associated with the sequence
+        Get all libraries associated with the sequence, from the associations prefetched with
+        `prefetch_related("libraryassociation_set")` if any
         """
+        if "libraryassociation_set" in getattr(self, "_prefetched_objects_cache", {}):
+            return [
+                association.library_id
+                for association in self.libraryassociation_set.all()
+            ]
         return list(
             LibraryAssociation.objects.filter(sequence=self).values_list(
                 "library_id", flat=True
@@ -170,10 +334,58 @@ class Sequence(OrcaBusBaseModel):
 
 
 class LibraryAssociationManager(OrcaBusBaseManager):
-    pass
+    def link_libraries(
+        self,
+        sequence: Sequence,
+        library_ids: Iterable[str],
+        existing_library_ids: Optional[Iterable[str]] = None,
+    ) -> tuple[set[str], set[str]]:
+        """
+        Make `library_ids` the libraries linked to the sequence, by inserting the missing and deleting
+        the stale associations only (one bulk statement each), unchanged associations are kept as is.
+        `existing_library_ids` saves looking up the current associations when already known.
+
+        Returns the (added, removed) library id sets.
+        """
+        if existing_library_ids is None:
+            existing_library_ids = self.filter(sequence=sequence).values_list(
+                "library_id", flat=True
+            )
+        library_ids = list(dict.fromkeys(library_ids))
+        existing_library_ids = set(existing_library_ids)
+
+        added = [
+            library_id
+            for library_id in library_ids
+            if library_id not in existing_library_ids
+        ]
+        removed = existing_library_ids.difference(library_ids)
+
+        with transaction.atomic(using=self.db):
+            if removed:
+                self.filter(sequence=sequence, library_id__in=removed).delete()
+            if added:
+                association_date = timezone.now()
+                self.bulk_create(
+                    [
+                        self.model(
+                            sequence=sequence,
+                            library_id=library_id,
+                            association_date=association_date,
+                            status=ASSOCIATION_STATUS,
+                        )
+                        for library_id in added
+                    ]
+                )
+        return set(added), removed
 
 
 class LibraryAssociation(OrcaBusBaseModel):
+    class Meta:
+        indexes = [
+            models.Index(fields=["library_id"], name="libassoc_library_id_idx"),
+        ]
+
     orcabus_id = OrcaBusIdField(primary_key=True)
     sequence = models.ForeignKey(Sequence, on_delete=models.CASCADE)
     library_id = models.CharField(max_length=255)
@@ -0,0 +1,72 @@
+import json
+import zlib
+from typing import Any, Optional
+
+from django.db import models
+from django.utils import timezone
+
+from sequence_run_manager.models.base import OrcaBusBaseModel, OrcaBusBaseManager
+from sequence_run_manager.models.sequence import Sequence
+
+
+class SequenceRunDetailsManager(OrcaBusBaseManager):
+    def get_for_sequence(self, sequence: Sequence) -> Optional["SequenceRunDetails"]:
+        return self.filter(sequence=sequence).first()
+
+    def store(
+        self,
+        sequence: Sequence,
+        run_details: dict[str, Any],
+        sequence_run_details: Optional["SequenceRunDetails"] = None,
+    ) -> "SequenceRunDetails":
+        """
+        Record the BSSH run details of the sequence run, fetched at its current status. The recorded
+        ones, if any, are to be given to be replaced (updated), otherwise they are inserted.
+        """
+        if sequence_run_details is None:
+            sequence_run_details = self.model(sequence=sequence)
+            sequence_run_details.set_run_details(run_details)
+            sequence_run_details.save(force_insert=True, using=self.db, fast=True)
+        else:
+            sequence_run_details.set_run_details(run_details)
+            sequence_run_details.save(fast=True)
+        return sequence_run_details
+
+
+class SequenceRunDetails(OrcaBusBaseModel):
+    """
+    BSSH run details (`GET /v2/runs/{id}`) of a sequence run, zlib compressed JSON, kept aside of the
+    Sequence table as the document is large (run properties, QC thresholds, biosamples, libraries, ...)
+    and only read by the enrichments of the sequence run.
+    """
+
+    sequence = models.OneToOneField(
+        Sequence,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name="run_details",
+    )
+    content = models.BinaryField()
+    fetched_at = models.DateTimeField()
+    # sequence run status when the run details were fetched, they are fetched again once it has changed
+    fetched_status = models.CharField(max_length=255, null=True, blank=True)
+
+    objects = SequenceRunDetailsManager()
+
+    def __str__(self):
+        return f"Run details of {self.sequence_id}, fetched at {self.fetched_at} ({self.fetched_status})"
+
+    @property
+    def run_details(self) -> dict[str, Any]:
+        return json.loads(zlib.decompress(bytes(self.content)).decode("utf-8"))
+
+    def set_run_details(self, run_details: dict[str, Any]):
+        self.content = zlib.compress(
+            json.dumps(run_details, separators=(",", ":")).encode("utf-8")
+        )
+        self.fetched_at = timezone.now()
+        self.fetched_status = self.sequence.status
+
+    def is_fetched_at(self, status: Optional[str]) -> bool:
+        """Whether the run details were fetched at the given status of the sequence run"""
+        return self.fetched_status == status
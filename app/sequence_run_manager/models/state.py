@@ -10,6 +10,15 @@ class StateManager(OrcaBusBaseManager):
 
 
 class State(OrcaBusBaseModel):
+    class Meta:
+        constraints = [
+            # duplicate BSSH event (at-least-once delivery) detection, conflict target of the state upsert
+            models.UniqueConstraint(
+                fields=["sequence", "timestamp", "status"],
+                name="state_seq_ts_status_unique",
+            ),
+        ]
+
     orcabus_id = OrcaBusIdField(primary_key=True, prefix="sqs")
 
     status = models.CharField(max_length=255, null=False, blank=False)
@@ -5,6 +5,16 @@ from sequence_run_manager.serializers.base import (
 from sequence_run_manager.models.sample_sheet import SampleSheet
 from sequence_run_manager.serializers.comment import CommentSerializer
 
+# internal bookkeeping columns of SampleSheet, not part of the API
+SAMPLE_SHEET_INTERNAL_FIELDS = [
+    "checksum_sha256",
+    "checksum_md5",
+    "checksum_crc32",
+    "bssh_file_size",
+    "bssh_file_date_modified",
+    "bssh_file_etag",
+]
+
 
 class SampleSheetBaseSerializer(SerializersBase):
     pass
@@ -13,7 +23,7 @@ class SampleSheetBaseSerializer(SerializersBase):
 class SampleSheetSerializer(SampleSheetBaseSerializer):
     class Meta(OrcabusIdSerializerMetaMixin):
         model = SampleSheet
-        fields = "__all__"
+        exclude = SAMPLE_SHEET_INTERNAL_FIELDS
 
 
 class SampleSheetWithCommentSerializer(SampleSheetBaseSerializer):
@@ -21,5 +31,5 @@ class SampleSheetWithCommentSerializer(SampleSheetBaseSerializer):
 
     class Meta(OrcabusIdSerializerMetaMixin):
         model = SampleSheet
-        fields = "__all__"
+        exclude = SAMPLE_SHEET_INTERNAL_FIELDS
         include_comment = True
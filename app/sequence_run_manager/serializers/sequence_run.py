@@ -8,6 +8,11 @@ from sequence_run_manager.serializers.base import (
     OrcabusIdSerializerMetaMixin,
 )
 
+# internal bookkeeping columns of Sequence, not part of the API
+SEQUENCE_INTERNAL_FIELDS = [
+    "ghost_sample_sheet_checksum",
+]
+
 
 class SequenceBaseSerializer(SerializersBase):
     pass
@@ -129,7 +134,7 @@ class SequenceRunSerializer(SequenceBaseSerializer):
 
     class Meta(OrcabusIdSerializerMetaMixin):
         model = Sequence
-        fields = "__all__"
+        exclude = SEQUENCE_INTERNAL_FIELDS
         include_libraries = True
 
     def get_libraries(self, obj):
@@ -1,9 +1,23 @@
 import logging
 
+from django.core.exceptions import ValidationError
+from django.db import connection
 from django.db.models import Q
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.utils.timezone import now
 
-from sequence_run_manager.models.base import OrcaBusBaseManager, OrcaBusBaseModel
+from sequence_run_manager.fields import get_ulid
+from sequence_run_manager.models.base import (
+    JsonFingerprint,
+    LoadedJson,
+    OrcaBusBaseManager,
+    OrcaBusBaseModel,
+)
+from sequence_run_manager.models.comment import Comment
+from sequence_run_manager.models.sample_sheet import SampleSheet
+from sequence_run_manager.models.sequence import Sequence, SequenceStatus
+from sequence_run_manager.models.state import State
 
 logger = logging.getLogger()
 logger.setLevel(logging.INFO)
@@ -46,3 +60,186 @@ class OrcaBusBaseManagerTestCase(TestCase):
                 f"THIS ERROR EXCEPTION IS INTENTIONAL FOR TEST. NOT ACTUAL ERROR. \n{e}"
             )
         self.assertRaises(TypeError)
+
+
+class OrcaBusBaseModelTestCase(TestCase):
+    def build_sequence(self) -> Sequence:
+        return Sequence(
+            sequence_run_id="r.AAAAAA",
+            instrument_run_id="190101_A01052_0001_BH5LY7ACGT",
+            status=SequenceStatus.STARTED,
+            start_time=now(),
+        )
+
+    def test_save_sets_prefixed_id_without_reload(self):
+        """
+        python manage.py test sequence_run_manager.tests.test_base.OrcaBusBaseModelTestCase.test_save_sets_prefixed_id_without_reload
+        """
+        sequence = self.build_sequence()
+        # one SELECT each for the primary key and sequence_run_id uniqueness checks, one INSERT, no reload,
+        # and the upsert of the instrument run summary
+        with self.assertNumQueries(4):
+            sequence.save()
+        self.assertTrue(sequence.orcabus_id.startswith("seq."))
+        self.assertEqual(
+            sequence.orcabus_id, Sequence.objects.get(sequence_run_id="r.AAAAAA").pk
+        )
+
+    def test_save_fast(self):
+        """
+        python manage.py test sequence_run_manager.tests.test_base.OrcaBusBaseModelTestCase.test_save_fast
+        """
+        sequence = self.build_sequence()
+        # the INSERT, and the upsert of the instrument run summary
+        with self.assertNumQueries(2):
+            sequence.save(fast=True)
+        self.assertTrue(sequence.orcabus_id.startswith("seq."))
+
+        with self.assertNumQueries(1):
+            state = State.objects.fast_create(
+                sequence=sequence, status=SequenceStatus.STARTED, timestamp=now()
+            )
+        self.assertTrue(state.orcabus_id.startswith("sqs."))
+        self.assertEqual(state.sequence_id, sequence.orcabus_id)
+
+    def test_save_fast_still_validates(self):
+        """
+        python manage.py test sequence_run_manager.tests.test_base.OrcaBusBaseModelTestCase.test_save_fast_still_validates
+        """
+        sequence = self.build_sequence()
+        sequence.orcabus_id = "seq.invalid"
+        with self.assertRaises(ValidationError):
+            sequence.save(fast=True)
+
+    def test_bulk_create_prefixed(self):
+        """
+        python manage.py test sequence_run_manager.tests.test_base.OrcaBusBaseModelTestCase.test_bulk_create_prefixed
+        """
+        sequence = self.build_sequence()
+        sequence.save()
+        with self.assertNumQueries(1):
+            states = State.objects.bulk_create(
+                [
+                    State(sequence=sequence, status=status, timestamp=now())
+                    for status in (SequenceStatus.STARTED, SequenceStatus.SUCCEEDED)
+                ]
+            )
+        for state in states:
+            self.assertTrue(state.orcabus_id.startswith("sqs."))
+            self.assertEqual(state.sequence_id, sequence.orcabus_id)
+        self.assertCountEqual(
+            [state.orcabus_id for state in states],
+            State.objects.values_list("orcabus_id", flat=True),
+        )
+
+    def test_save_unchanged_issues_no_query(self):
+        """
+        python manage.py test sequence_run_manager.tests.test_base.OrcaBusBaseModelTestCase.test_save_unchanged_issues_no_query
+        """
+        self.build_sequence().save()
+
+        sequence = Sequence.objects.get(sequence_run_id="r.AAAAAA")
+        self.assertEqual(sequence.get_dirty_fields(), [])
+        with self.assertNumQueries(0):
+            sequence.save()
+
+        # same value in a different representation is not a change
+        sequence.start_time = sequence.start_time.isoformat()
+        with self.assertNumQueries(0):
+            sequence.save(fast=True)
+
+    def test_save_updates_dirty_fields_only(self):
+        """
+        python manage.py test sequence_run_manager.tests.test_base.OrcaBusBaseModelTestCase.test_save_updates_dirty_fields_only
+        """
+        self.build_sequence().save()
+
+        sequence = Sequence.objects.get(sequence_run_id="r.AAAAAA")
+        sequence.status = SequenceStatus.SUCCEEDED
+        self.assertEqual(sequence.get_dirty_fields(), ["status"])
+        with CaptureQueriesContext(connection) as ctx:
+            sequence.save(fast=True)
+        # the UPDATE, and the upsert of the instrument run summary as the status has changed
+        self.assertEqual(len(ctx.captured_queries), 2)
+        update_sql = ctx.captured_queries[0]["sql"]
+        self.assertIn('SET "status"', update_sql)
+        self.assertNotIn('"instrument_run_id" =', update_sql)
+
+        self.assertEqual(sequence.get_dirty_fields(), [])
+        self.assertEqual(
+            Sequence.objects.get(sequence_run_id="r.AAAAAA").status,
+            SequenceStatus.SUCCEEDED,
+        )
+
+    def test_save_dirty_json_field(self):
+        """
+        python manage.py test sequence_run_manager.tests.test_base.OrcaBusBaseModelTestCase.test_save_dirty_json_field
+        """
+        sequence = self.build_sequence()
+        sequence.save()
+        SampleSheet.objects.create(
+            sequence=sequence,
+            sample_sheet_name="SampleSheet.csv",
+            sample_sheet_content={"header": {"file_format_version": 2}},
+        )
+
+        sample_sheet = SampleSheet.objects.get(sequence=sequence)
+        # the loaded content is neither copied nor fingerprinted until it is accessed
+        self.assertIsInstance(
+            sample_sheet._loaded_field_values["sample_sheet_content"], LoadedJson
+        )
+        self.assertEqual(sample_sheet.get_dirty_fields(), [])
+        # an equal value is not a change
+        sample_sheet.sample_sheet_content = {"header": {"file_format_version": 2}}
+        self.assertEqual(sample_sheet.get_dirty_fields(), [])
+
+        sample_sheet = SampleSheet.objects.get(sequence=sequence)
+        sample_sheet_content = sample_sheet.sample_sheet_content
+        self.assertIsInstance(
+            sample_sheet._loaded_field_values["sample_sheet_content"], JsonFingerprint
+        )
+        sample_sheet_content["header"]["file_format_version"] = 3
+        self.assertEqual(sample_sheet.get_dirty_fields(), ["sample_sheet_content"])
+        sample_sheet.save(fast=True)
+        self.assertEqual(
+            SampleSheet.objects.get(sequence=sequence).sample_sheet_content,
+            {"header": {"file_format_version": 3}},
+        )
+
+    def test_save_dirty_includes_auto_now(self):
+        """
+        python manage.py test sequence_run_manager.tests.test_base.OrcaBusBaseModelTestCase.test_save_dirty_includes_auto_now
+        """
+        comment = Comment.objects.create(
+            target_id=get_ulid(), comment="Comment", created_by="test@example.com"
+        )
+        comment = Comment.objects.get(pk=comment.pk)
+        updated_at = comment.updated_at
+
+        comment.comment = "Comment updated"
+        comment.save()
+        comment = Comment.objects.get(pk=comment.pk)
+        self.assertEqual(comment.comment, "Comment updated")
+        self.assertGreater(comment.updated_at, updated_at)
+
+    def test_insert_or_ignore(self):
+        """
+        python manage.py test sequence_run_manager.tests.test_base.OrcaBusBaseModelTestCase.test_insert_or_ignore
+        """
+        sequence = self.build_sequence()
+        # the INSERT, and the upsert of the instrument run summary
+        with self.assertNumQueries(2):
+            created = Sequence.objects.insert_or_ignore(sequence, ["sequence_run_id"])
+        self.assertTrue(created)
+        self.assertTrue(sequence.orcabus_id.startswith("seq."))
+        self.assertFalse(sequence._state.adding)
+        self.assertEqual(sequence.get_dirty_fields(), [])
+
+        duplicate = self.build_sequence()
+        with self.assertNumQueries(1):
+            created = Sequence.objects.insert_or_ignore(duplicate, ["sequence_run_id"])
+        self.assertFalse(created)
+        self.assertEqual(
+            Sequence.objects.get(sequence_run_id="r.AAAAAA").orcabus_id,
+            sequence.orcabus_id,
+        )
@@ -1,246 +1,293 @@
 import json
 import os
+from datetime import timedelta
 from unittest.mock import patch
 
-from django.test import SimpleTestCase
+from django.core.management import call_command
+from django.db import connection
+from django.test import SimpleTestCase, TestCase
 from django.utils import timezone
 
-from sequence_run_manager.aws_event_bridge.event_srv import (
-    EventBridgePublishError,
-    emit_srllc_api_event,
-    emit_srsc_api_event,
-    emit_srssc_api_event,
+from sequence_run_manager.aws_event_bridge.event_srv import put_events_batch
+from sequence_run_manager.aws_event_bridge.outbox_srv import (
+    OUTBOX_CLAIM_TIMEOUT,
+    relay_outbox_events,
 )
-from sequence_run_manager.models.sample_sheet import SampleSheet
-
-
-class SrscApiEventTestCase(SimpleTestCase):
-    def build_event(self):
-        return {
-            "id": "seq.01J5M2JFE1JPYV62RYQEG99SEQ",
-            "instrumentRunId": "250328_A01052_0258_AHFGM7DSXF",
-            "runVolumeName": "bssh.example",
-            "runFolderPath": "/Runs/250328_A01052_0258_AHFGM7DSXF",
-            "runDataUri": "gds://bssh.example/Runs/250328_A01052_0258_AHFGM7DSXF",
-            "sampleSheetName": None,
-            "startTime": timezone.now().isoformat(),
-            "endTime": None,
-            "status": "RESOLVED",
+from sequence_run_manager.models.event_outbox import EventOutbox, EventOutboxStatus
+from sequence_run_manager.tests.factories import SequenceFactory
+
+
+class PutEventsBatchTestCase(SimpleTestCase):
+    def build_entries(self, count):
+        return [
+            {
+                "Source": "orcabus.sequencerunmanager",
+                "DetailType": f"Event{i}",
+                "Detail": "{}",
+                "EventBusName": "test-event-bus",
+            }
+            for i in range(count)
+        ]
+
+    @patch("sequence_run_manager.aws_event_bridge.event_srv.libeb.emit_events")
+    def test_put_events_batch_sends_one_request(self, mock_emit_events):
+        entries = self.build_entries(12)
+        mock_emit_events.side_effect = lambda entries: {
+            "FailedEntryCount": 0,
+            "Entries": [{"EventId": "id"} for _ in entries],
         }
 
-    @patch.dict(os.environ, {"EVENT_BUS_NAME": "test-event-bus"})
-    @patch("sequence_run_manager.aws_event_bridge.event_srv.libeb.emit_event")
-    def test_emit_srsc_api_event_emits_sequence_run_state_change(
-        self, mock_emit_event
-    ):
-        mock_emit_event.return_value = {"FailedEntryCount": 0, "Entries": [{}]}
-
-        emit_srsc_api_event(self.build_event(), attempt_count=2)
-
-        entry = mock_emit_event.call_args.args[0]
-        self.assertEqual(entry["Source"], "orcabus.sequencerunmanager")
-        self.assertEqual(entry["DetailType"], "SequenceRunStateChange")
-        self.assertEqual(entry["EventBusName"], "test-event-bus")
-        detail = json.loads(entry["Detail"])
-        self.assertEqual(detail["status"], "RESOLVED")
-        self.assertIn("sampleSheetName", detail)
-        self.assertIsNone(detail["sampleSheetName"])
-
-    @patch.dict(os.environ, {"EVENT_BUS_NAME": "test-event-bus"})
-    @patch("sequence_run_manager.aws_event_bridge.event_srv.libeb.emit_event")
-    def test_emit_srsc_api_event_raises_and_logs_partial_failure(
-        self, mock_emit_event
-    ):
-        mock_emit_event.return_value = {
+        batch, failed_entries = put_events_batch(entries)
+
+        mock_emit_events.assert_called_once_with(entries[:10])
+        self.assertEqual(entries[:10], batch)
+        self.assertEqual({}, failed_entries)
+
+    @patch("sequence_run_manager.aws_event_bridge.event_srv.libeb.emit_events")
+    def test_put_events_batch_returns_rejected_entries(self, mock_emit_events):
+        mock_emit_events.return_value = {
             "FailedEntryCount": 1,
             "Entries": [
-                {
-                    "ErrorCode": "InternalFailure",
-                    "ErrorMessage": "EventBridge failed",
-                }
+                {"EventId": "id0"},
+                {"ErrorCode": "ThrottlingException", "ErrorMessage": "slow"},
+                {"EventId": "id2"},
             ],
         }
 
-        with self.assertLogs(
-            "sequence_run_manager.aws_event_bridge.event_srv", level="ERROR"
-        ) as logs:
-            with self.assertRaises(EventBridgePublishError):
-                emit_srsc_api_event(self.build_event())
+        batch, failed_entries = put_events_batch(self.build_entries(3))
 
-        logged = " ".join(logs.output)
-        self.assertIn("seq.01J5M2JFE1JPYV62RYQEG99SEQ", logged)
-        self.assertIn("InternalFailure", logged)
-
-    @patch.dict(os.environ, {"EVENT_BUS_NAME": "test-event-bus"})
-    @patch("sequence_run_manager.aws_event_bridge.event_srv.libeb.emit_event")
-    def test_emit_srsc_api_event_reraises_sdk_exception(self, mock_emit_event):
-        mock_emit_event.side_effect = RuntimeError("network unavailable")
-
-        with self.assertLogs(
-            "sequence_run_manager.aws_event_bridge.event_srv", level="ERROR"
-        ) as logs:
-            with self.assertRaisesRegex(RuntimeError, "network unavailable"):
-                emit_srsc_api_event(self.build_event(), attempt_count=3)
+        self.assertEqual(3, len(batch))
+        self.assertEqual(
+            {1: {"error_code": "ThrottlingException", "error_message": "slow"}},
+            failed_entries,
+        )
 
-        logged = " ".join(logs.output)
-        self.assertIn("seq.01J5M2JFE1JPYV62RYQEG99SEQ", logged)
-        self.assertIn("attempt=3", logged)
+    @patch("sequence_run_manager.aws_event_bridge.event_srv.libeb.emit_events")
+    def test_put_events_batch_request_failure(self, mock_emit_events):
+        mock_emit_events.side_effect = RuntimeError("network unavailable")
 
-    @patch.dict(os.environ, {}, clear=True)
-    def test_emit_srsc_api_event_raises_when_event_bus_is_missing(self):
         with self.assertLogs(
             "sequence_run_manager.aws_event_bridge.event_srv", level="ERROR"
-        ) as logs:
-            with self.assertRaisesRegex(ValueError, "EVENT_BUS_NAME"):
-                emit_srsc_api_event(self.build_event())
+        ):
+            batch, failed_entries = put_events_batch(self.build_entries(2))
+
+        self.assertEqual(2, len(batch))
+        self.assertEqual(
+            {
+                index: {
+                    "error_code": "RuntimeError",
+                    "error_message": "network unavailable",
+                }
+                for index in range(2)
+            },
+            failed_entries,
+        )
 
-        logged = " ".join(logs.output)
-        self.assertIn("seq.01J5M2JFE1JPYV62RYQEG99SEQ", logged)
 
+@patch.dict(os.environ, {"EVENT_BUS_NAME": "test-event-bus"})
+class OutboxRelayTestCase(TestCase):
+    def setUp(self):
+        self.sequence_a = SequenceFactory(sequence_run_id="r.OUTBOXA")
+        self.sequence_b = SequenceFactory(sequence_run_id="r.OUTBOXB")
 
-class SrsscApiEventTestCase(SimpleTestCase):
-    def build_event(self, event_type="SequenceRunSampleSheetChange"):
-        sample_sheet = SampleSheet(
-            orcabus_id="ss.01J5M2JFE1JPYV62RYQEG99SS",
-            sample_sheet_name="SampleSheet.csv",
-            sample_sheet_content_original="sample,sheet\n",
-            association_timestamp=timezone.now(),
+    def add_event(self, sequence, name):
+        (outbox_event,) = EventOutbox.objects.add_events(
+            sequence,
+            [
+                {
+                    "Source": "orcabus.sequencerunmanager",
+                    "DetailType": "SequenceRunStateChange",
+                    "Detail": json.dumps({"name": name}),
+                    "EventBusName": "ignored",
+                }
+            ],
         )
-        return {
-            "eventType": event_type,
-            "instrumentRunId": "250328_A01052_0258_AHFGM7DSXF",
-            "sequenceRunId": "r.01J5M2JFE1JPYV62RYQEG99RUN",
-            "sampleSheet": sample_sheet,
-            "description": "Manual sample sheet update",
-        }
-
-    @patch.dict(
-        os.environ,
-        {
-            "EVENT_BUS_NAME": "test-event-bus",
-            "SEQUENCE_RUN_MANAGER_BASE_API_URL": "https://srm.example",
-        },
-    )
-    @patch("sequence_run_manager.aws_event_bridge.event_srv.libeb.emit_event")
-    def test_emit_srssc_api_event_emits_sample_sheet_change(self, mock_emit_event):
-        mock_emit_event.return_value = {"FailedEntryCount": 0, "Entries": [{}]}
-
-        response = emit_srssc_api_event(self.build_event())
-
-        self.assertEqual(response, {"FailedEntryCount": 0, "Entries": [{}]})
-        entry = mock_emit_event.call_args.args[0]
-        self.assertEqual(entry["DetailType"], "SequenceRunSampleSheetChange")
-        self.assertEqual(entry["EventBusName"], "test-event-bus")
-        detail = json.loads(entry["Detail"])
-        self.assertEqual(detail["instrumentRunId"], "250328_A01052_0258_AHFGM7DSXF")
-        self.assertEqual(detail["sampleSheetName"], "SampleSheet.csv")
-
-    @patch.dict(os.environ, {}, clear=True)
-    @patch("sequence_run_manager.aws_event_bridge.event_srv.libeb.emit_event")
-    def test_emit_srssc_api_event_returns_when_event_bus_is_missing(
-        self, mock_emit_event
-    ):
-        with self.assertLogs(
-            "sequence_run_manager.aws_event_bridge.event_srv", level="ERROR"
-        ) as logs:
-            response = emit_srssc_api_event(self.build_event())
-
-        self.assertIsNone(response)
-        mock_emit_event.assert_not_called()
-        self.assertIn("EVENT_BUS_NAME is not set", " ".join(logs.output))
+        return outbox_event
+
+    @staticmethod
+    def put_events(rejected_names=()):
+        def put_events(entries):
+            response_entries = [
+                (
+                    {"ErrorCode": "InternalFailure", "ErrorMessage": "failed"}
+                    if json.loads(entry["Detail"])["name"] in rejected_names
+                    else {"EventId": "id"}
+                )
+                for entry in entries
+            ]
+            return {
+                "FailedEntryCount": len(
+                    [e for e in response_entries if "ErrorCode" in e]
+                ),
+                "Entries": response_entries,
+            }
+
+        return put_events
+
+    @staticmethod
+    def sent_names(mock_emit_events) -> list[list[str]]:
+        return [
+            [json.loads(entry["Detail"])["name"] for entry in call.args[0]]
+            for call in mock_emit_events.call_args_list
+        ]
+
+    @patch("sequence_run_manager.aws_event_bridge.event_srv.libeb.emit_events")
+    def test_relay_outbox_events_publishes_in_batches(self, mock_emit_events):
+        """
+        python manage.py test sequence_run_manager.tests.test_event_bridge.OutboxRelayTestCase.test_relay_outbox_events_publishes_in_batches
+        """
+        mock_emit_events.side_effect = self.put_events()
+        for i in range(12):
+            self.add_event(self.sequence_a if i % 2 else self.sequence_b, f"e{i}")
+
+        result = relay_outbox_events()
+
+        self.assertEqual(12, result["published"])
+        self.assertEqual(
+            [[f"e{i}" for i in range(10)], ["e10", "e11"]],
+            self.sent_names(mock_emit_events),
+        )
+        entry = mock_emit_events.call_args.args[0][0]
+        self.assertEqual("test-event-bus", entry["EventBusName"])
+        self.assertFalse(
+            EventOutbox.objects.exclude(status=EventOutboxStatus.PUBLISHED).exists()
+        )
+        self.assertFalse(EventOutbox.objects.filter(published_at__isnull=True).exists())
+        self.assertEqual(0, relay_outbox_events()["published"])
+
+    @patch("sequence_run_manager.aws_event_bridge.event_srv.libeb.emit_events")
+    def test_relay_outbox_events_keeps_sequence_run_order(self, mock_emit_events):
+        """
+        python manage.py test sequence_run_manager.tests.test_event_bridge.OutboxRelayTestCase.test_relay_outbox_events_keeps_sequence_run_order
+        """
+        a1 = self.add_event(self.sequence_a, "a1")
+        for i in range(9):
+            self.add_event(self.sequence_b, f"b{i}")
+        a2 = self.add_event(self.sequence_a, "a2")
+        self.add_event(self.sequence_b, "b9")
+
+        # a1 is rejected in the first request, a2 is held back from the second one
+        mock_emit_events.side_effect = self.put_events(rejected_names={"a1"})
+        result = relay_outbox_events()
+
+        self.assertEqual(
+            {"published": 9 + 1, "rejected": 1, "failed": 0, "held_back": 1}, result
+        )
+        self.assertEqual(["b9"], self.sent_names(mock_emit_events)[-1])
+        a1.refresh_from_db()
+        a2.refresh_from_db()
+        self.assertEqual((EventOutboxStatus.PENDING, 1), (a1.status, a1.attempt_count))
+        self.assertEqual("InternalFailure: failed", a1.last_error)
+        self.assertEqual((EventOutboxStatus.PENDING, 0), (a2.status, a2.attempt_count))
+
+        # only the rejected event and the held back one are sent, in order, by the next relay
+        mock_emit_events.reset_mock()
+        mock_emit_events.side_effect = self.put_events()
+        result = relay_outbox_events()
+
+        self.assertEqual(2, result["published"])
+        self.assertEqual([["a1", "a2"]], self.sent_names(mock_emit_events))
+
+    @patch("sequence_run_manager.aws_event_bridge.event_srv.libeb.emit_events")
+    def test_relay_outbox_events_gives_up_after_max_attempts(self, mock_emit_events):
+        """
+        python manage.py test sequence_run_manager.tests.test_event_bridge.OutboxRelayTestCase.test_relay_outbox_events_gives_up_after_max_attempts
+        """
+        mock_emit_events.side_effect = RuntimeError("network unavailable")
+        outbox_event = self.add_event(self.sequence_a, "a1")
 
-    @patch.dict(os.environ, {"EVENT_BUS_NAME": "test-event-bus"})
-    @patch("sequence_run_manager.aws_event_bridge.event_srv.libeb.emit_event")
-    def test_emit_srssc_api_event_returns_for_wrong_event_type(
-        self, mock_emit_event
-    ):
         with self.assertLogs(
-            "sequence_run_manager.aws_event_bridge.event_srv", level="ERROR"
+            "sequence_run_manager.aws_event_bridge.outbox_srv", level="ERROR"
         ) as logs:
-            response = emit_srssc_api_event(
-                self.build_event(event_type="SequenceRunLibraryLinkingChange")
+            result = relay_outbox_events(max_attempts=2)
+            self.assertEqual(1, result["rejected"])
+            result = relay_outbox_events(max_attempts=2)
+            self.assertEqual(1, result["failed"])
+
+        outbox_event.refresh_from_db()
+        self.assertEqual(EventOutboxStatus.FAILED, outbox_event.status)
+        self.assertEqual("RuntimeError: network unavailable", outbox_event.last_error)
+        self.assertIn("Giving up on outbox event", " ".join(logs.output))
+
+        # the later events of the sequence run are no longer held back
+        mock_emit_events.side_effect = self.put_events()
+        self.add_event(self.sequence_a, "a2")
+        self.assertEqual(1, relay_outbox_events()["published"])
+
+    @patch("sequence_run_manager.aws_event_bridge.event_srv.libeb.emit_events")
+    def test_relay_outbox_events_publishes_outside_transaction(self, mock_emit_events):
+        """
+        python manage.py test sequence_run_manager.tests.test_event_bridge.OutboxRelayTestCase.test_relay_outbox_events_publishes_outside_transaction
+        """
+        # atomic blocks of the test case itself
+        test_atomic_blocks = len(connection.atomic_blocks)
+        put_events = self.put_events()
+        publishing = []
+
+        def put_events_in_flight(entries):
+            publishing.append(
+                (
+                    len(connection.atomic_blocks),
+                    EventOutbox.objects.filter(claimed_at__isnull=False).count(),
+                )
             )
-
-        self.assertIsNone(response)
-        mock_emit_event.assert_not_called()
-        self.assertIn("Unsupported event type", " ".join(logs.output))
-
-    @patch.dict(
-        os.environ,
-        {
-            "EVENT_BUS_NAME": "test-event-bus",
-            "SEQUENCE_RUN_MANAGER_BASE_API_URL": "https://srm.example",
-        },
-    )
-    @patch("sequence_run_manager.aws_event_bridge.event_srv.libeb.emit_event")
-    def test_emit_srssc_api_event_logs_and_returns_on_emit_exception(
-        self, mock_emit_event
-    ):
-        mock_emit_event.side_effect = RuntimeError("event bus unavailable")
-
-        with self.assertLogs(
-            "sequence_run_manager.aws_event_bridge.event_srv", level="ERROR"
-        ) as logs:
-            response = emit_srssc_api_event(self.build_event())
-
-        self.assertIsNone(response)
-        self.assertIn(
-            "Failed to emit SequenceRunSampleSheetChange", " ".join(logs.output)
+            return put_events(entries)
+
+        mock_emit_events.side_effect = put_events_in_flight
+        for i in range(3):
+            self.add_event(self.sequence_a, f"a{i}")
+
+        self.assertEqual(3, relay_outbox_events()["published"])
+        # no transaction open while publishing, the events claimed as in flight
+        self.assertEqual([(test_atomic_blocks, 3)], publishing)
+        self.assertFalse(EventOutbox.objects.filter(claimed_at__isnull=False).exists())
+
+    @patch("sequence_run_manager.aws_event_bridge.event_srv.libeb.emit_events")
+    def test_relay_outbox_events_skips_claimed(self, mock_emit_events):
+        """
+        python manage.py test sequence_run_manager.tests.test_event_bridge.OutboxRelayTestCase.test_relay_outbox_events_skips_claimed
+        """
+        mock_emit_events.side_effect = self.put_events()
+        a1 = self.add_event(self.sequence_a, "a1")
+        self.add_event(self.sequence_a, "a2")
+        b1 = self.add_event(self.sequence_b, "b1")
+        self.add_event(self.sequence_b, "b2")
+
+        # a1 is in flight in a concurrent relay, b1 claimed by a relay that died
+        EventOutbox.objects.filter(id=a1.id).update(claimed_at=timezone.now())
+        EventOutbox.objects.filter(id=b1.id).update(
+            claimed_at=timezone.now() - OUTBOX_CLAIM_TIMEOUT - timedelta(seconds=1)
         )
+        result = relay_outbox_events()
 
+        self.assertEqual(
+            {"published": 2, "rejected": 0, "failed": 0, "held_back": 1}, result
+        )
+        self.assertEqual([["b1", "b2"]], self.sent_names(mock_emit_events))
+        self.assertEqual(
+            [None, None],
+            list(
+                EventOutbox.objects.filter(sequence=self.sequence_a)
+                .exclude(id=a1.id)
+                .values_list("claimed_at", "published_at")
+                .get()
+            ),
+        )
 
-class SrllcApiEventTestCase(SimpleTestCase):
-    def build_event(self, event_type="SequenceRunLibraryLinkingChange"):
-        return {
-            "eventType": event_type,
-            "instrumentRunId": "250328_A01052_0258_AHFGM7DSXF",
-            "sequenceRunId": "r.01J5M2JFE1JPYV62RYQEG99RUN",
-            "linkedLibraries": ["L2000001", "L2000002"],
-        }
-
-    @patch.dict(os.environ, {"EVENT_BUS_NAME": "test-event-bus"})
-    @patch("sequence_run_manager.aws_event_bridge.event_srv.libeb.emit_event")
-    def test_emit_srllc_api_event_emits_library_linking_change(
-        self, mock_emit_event
-    ):
-        mock_emit_event.return_value = {"FailedEntryCount": 0, "Entries": [{}]}
-
-        response = emit_srllc_api_event(self.build_event())
-
-        self.assertEqual(response, {"FailedEntryCount": 0, "Entries": [{}]})
-        entry = mock_emit_event.call_args.args[0]
-        self.assertEqual(entry["DetailType"], "SequenceRunLibraryLinkingChange")
-        self.assertEqual(entry["EventBusName"], "test-event-bus")
-        detail = json.loads(entry["Detail"])
-        self.assertEqual(detail["instrumentRunId"], "250328_A01052_0258_AHFGM7DSXF")
-        self.assertEqual(detail["linkedLibraries"], ["L2000001", "L2000002"])
-
-    @patch.dict(os.environ, {}, clear=True)
-    @patch("sequence_run_manager.aws_event_bridge.event_srv.libeb.emit_event")
-    def test_emit_srllc_api_event_returns_when_event_bus_is_missing(
-        self, mock_emit_event
-    ):
-        with self.assertLogs(
-            "sequence_run_manager.aws_event_bridge.event_srv", level="ERROR"
-        ) as logs:
-            response = emit_srllc_api_event(self.build_event())
-
-        self.assertIsNone(response)
-        mock_emit_event.assert_not_called()
-        self.assertIn("EVENT_BUS_NAME is not set", " ".join(logs.output))
+    @patch("sequence_run_manager.aws_event_bridge.event_srv.libeb.emit_events")
+    def test_relay_event_outbox_command(self, mock_emit_events):
+        """
+        python manage.py test sequence_run_manager.tests.test_event_bridge.OutboxRelayTestCase.test_relay_event_outbox_command
+        """
+        mock_emit_events.side_effect = self.put_events()
+        for i in range(5):
+            self.add_event(self.sequence_a, f"a{i}")
 
-    @patch.dict(os.environ, {"EVENT_BUS_NAME": "test-event-bus"})
-    @patch("sequence_run_manager.aws_event_bridge.event_srv.libeb.emit_event")
-    def test_emit_srllc_api_event_returns_for_wrong_event_type(
-        self, mock_emit_event
-    ):
-        with self.assertLogs(
-            "sequence_run_manager.aws_event_bridge.event_srv", level="ERROR"
-        ) as logs:
-            response = emit_srllc_api_event(
-                self.build_event(event_type="SequenceRunSampleSheetChange")
-            )
+        call_command("relay_event_outbox", "--limit", "2")
 
-        self.assertIsNone(response)
-        mock_emit_event.assert_not_called()
-        self.assertIn("Unsupported event type", " ".join(logs.output))
+        self.assertEqual(
+            [["a0", "a1"], ["a2", "a3"], ["a4"]], self.sent_names(mock_emit_events)
+        )
+        self.assertEqual(
+            5, EventOutbox.objects.filter(status=EventOutboxStatus.PUBLISHED).count()
+        )
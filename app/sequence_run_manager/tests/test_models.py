@@ -1,10 +1,26 @@
+import hashlib
 import logging
+import zlib
+from datetime import timedelta
+from unittest.mock import patch
 
 from django.core.exceptions import ObjectDoesNotExist
+from django.core.management import call_command
+from django.db import connection
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
 from django.utils.timezone import now
 
-from sequence_run_manager.models.sequence import Sequence, SequenceStatus
+from sequence_run_manager.models.sequence import (
+    Sequence,
+    SequenceStatus,
+    LibraryAssociation,
+)
+from sequence_run_manager.models.sample_sheet import SampleSheet
+from sequence_run_manager.models.instrument_run import (
+    InstrumentRun,
+    instrument_run_groups_queryset,
+)
 
 logger = logging.getLogger()
 logger.setLevel(logging.INFO)
@@ -101,3 +117,287 @@ class SequenceTestCase(TestCase):
             )
 
         self.assertRaises(ValueError)
+
+    def test_get_or_create_ghost(self):
+        """
+        python manage.py test sequence_run_manager.tests.test_models.SequenceTestCase.test_get_or_create_ghost
+        """
+        ghost_key = ("190101_A01052_0003_BH5LY7ACGT", "SampleSheet.csv", "a" * 64)
+
+        ghost, created = Sequence.objects.get_or_create_ghost(*ghost_key)
+        self.assertTrue(created)
+        self.assertTrue(ghost.sequence_run_id.startswith("r."))
+        self.assertIsNone(ghost.status)
+
+        with CaptureQueriesContext(connection) as ctx:
+            same_ghost, created = Sequence.objects.get_or_create_ghost(*ghost_key)
+        self.assertFalse(created)
+        self.assertEqual(ghost.orcabus_id, same_ghost.orcabus_id)
+        # a single lookup
+        self.assertEqual(1, len(ctx.captured_queries))
+
+        # another content of the sample sheet, another ghost
+        other_ghost, created = Sequence.objects.get_or_create_ghost(
+            *ghost_key[:2], "b" * 64
+        )
+        self.assertTrue(created)
+        self.assertNotEqual(ghost.orcabus_id, other_ghost.orcabus_id)
+        self.assertEqual(
+            2, Sequence.objects.filter(instrument_run_id=ghost_key[0]).count()
+        )
+
+    def test_get_or_create_ghost_conflict(self):
+        """
+        python manage.py test sequence_run_manager.tests.test_models.SequenceTestCase.test_get_or_create_ghost_conflict
+        """
+        ghost_key = ("190101_A01052_0003_BH5LY7ACGT", "SampleSheet.csv", "a" * 64)
+        ghost, _ = Sequence.objects.get_or_create_ghost(*ghost_key)
+
+        # created concurrently, after the lookup
+        with patch.object(
+            Sequence.objects, "filter", return_value=Sequence.objects.none()
+        ):
+            same_ghost, created = Sequence.objects.get_or_create_ghost(*ghost_key)
+
+        self.assertFalse(created)
+        self.assertEqual(ghost.orcabus_id, same_ghost.orcabus_id)
+        self.assertEqual(1, Sequence.objects.count())
+
+
+class SampleSheetTestCase(TestCase):
+    content = "[Header]\nFileFormatVersion,2\n"
+
+    def setUp(self) -> None:
+        build_mock()
+        self.sequence = Sequence.objects.get(sequence_run_id="r.AAAAAA")
+
+    def assert_checksums(self, sample_sheet: SampleSheet):
+        content_bytes = self.content.encode("utf-8")
+        self.assertEqual(
+            sample_sheet.checksum_sha256, hashlib.sha256(content_bytes).hexdigest()
+        )
+        self.assertEqual(
+            sample_sheet.checksum_md5, hashlib.md5(content_bytes).hexdigest()
+        )
+        self.assertEqual(
+            sample_sheet.checksum_crc32,
+            format(zlib.crc32(content_bytes) & 0xFFFFFFFF, "08x"),
+        )
+
+    def test_checksums_on_save(self):
+        """
+        python manage.py test sequence_run_manager.tests.test_models.SampleSheetTestCase.test_checksums_on_save
+        """
+        sample_sheet = SampleSheet.objects.create(
+            sequence=self.sequence,
+            sample_sheet_name="SampleSheet.csv",
+            sample_sheet_content_original=self.content,
+        )
+        self.assert_checksums(sample_sheet)
+
+    def test_checksums_on_bulk_create(self):
+        """
+        python manage.py test sequence_run_manager.tests.test_models.SampleSheetTestCase.test_checksums_on_bulk_create
+        """
+        SampleSheet.objects.bulk_create(
+            [
+                SampleSheet(
+                    sequence=self.sequence,
+                    sample_sheet_name="SampleSheet.csv",
+                    sample_sheet_content_original=self.content,
+                )
+            ]
+        )
+        self.assert_checksums(SampleSheet.objects.get(sequence=self.sequence))
+
+    def test_backfill_sample_sheet_checksums(self):
+        """
+        python manage.py test sequence_run_manager.tests.test_models.SampleSheetTestCase.test_backfill_sample_sheet_checksums
+        """
+        for i in range(3):
+            SampleSheet.objects.create(
+                sequence=self.sequence,
+                sample_sheet_name=f"SampleSheet.{i}.csv",
+                sample_sheet_content_original=self.content,
+            )
+        # simulate rows written before the checksum columns existed
+        SampleSheet.objects.update(
+            checksum_sha256=None, checksum_md5=None, checksum_crc32=None
+        )
+
+        call_command("backfill_sample_sheet_checksums", chunk_size=2)
+
+        for sample_sheet in SampleSheet.objects.all():
+            self.assert_checksums(sample_sheet)
+
+
+class LibraryAssociationTestCase(TestCase):
+    def setUp(self) -> None:
+        build_mock()
+        self.sequence = Sequence.objects.get(sequence_run_id="r.AAAAAA")
+
+    def test_link_libraries(self):
+        """
+        python manage.py test sequence_run_manager.tests.test_models.LibraryAssociationTestCase.test_link_libraries
+        """
+        added, removed = LibraryAssociation.objects.link_libraries(
+            self.sequence, ["L2400001", "L2400002", "L2400003"]
+        )
+        self.assertEqual({"L2400001", "L2400002", "L2400003"}, added)
+        self.assertEqual(set(), removed)
+        kept_orcabus_id = LibraryAssociation.objects.get(
+            library_id="L2400001"
+        ).orcabus_id
+
+        def link_libraries(library_ids) -> tuple[tuple[set, set], list[str]]:
+            with CaptureQueriesContext(connection) as ctx:
+                result = LibraryAssociation.objects.link_libraries(
+                    self.sequence, library_ids
+                )
+            statements = [
+                q["sql"].split()[0]
+                for q in ctx.captured_queries
+                if "SAVEPOINT" not in q["sql"].upper()
+            ]
+            return result, statements
+
+        # one SELECT for the current associations, one DELETE and one INSERT for the difference
+        (added, removed), statements = link_libraries(
+            ["L2400001", "L2400002", "L2400004"]
+        )
+        self.assertEqual(["SELECT", "DELETE", "INSERT"], statements)
+        self.assertEqual({"L2400004"}, added)
+        self.assertEqual({"L2400003"}, removed)
+        self.assertEqual(
+            {"L2400001", "L2400002", "L2400004"}, set(self.sequence.libraries())
+        )
+        # unchanged associations are kept, not recreated
+        self.assertEqual(
+            kept_orcabus_id,
+            LibraryAssociation.objects.get(library_id="L2400001").orcabus_id,
+        )
+
+        # no change, no write
+        result, statements = link_libraries(["L2400004", "L2400002", "L2400001"])
+        self.assertEqual(["SELECT"], statements)
+        self.assertEqual((set(), set()), result)
+
+
+class InstrumentRunTestCase(TestCase):
+    instrument_run_id = "190101_A01052_0001_BH5LY7ACGT"
+
+    def create_sequence(self, sequence_run_id: str, **kwargs) -> Sequence:
+        return Sequence.objects.create(
+            **{
+                "sequence_run_id": sequence_run_id,
+                "instrument_run_id": self.instrument_run_id,
+                "status": SequenceStatus.STARTED,
+                "start_time": now(),
+                **kwargs,
+            }
+        )
+
+    def assert_summary_matches_sequences(self):
+        """The summaries are those aggregated from the sequence runs"""
+        self.assertEqual(
+            list(
+                instrument_run_groups_queryset(
+                    Sequence.objects.filter(status__isnull=False)
+                ).order_by("instrument_run_id")
+            ),
+            list(InstrumentRun.objects.groups().order_by("instrument_run_id")),
+        )
+
+    def test_maintained_on_save(self):
+        """
+        python manage.py test sequence_run_manager.tests.test_models.InstrumentRunTestCase.test_maintained_on_save
+        """
+        first = self.create_sequence("r.AAAAAA", start_time=now() - timedelta(hours=2))
+        second = self.create_sequence("r.BBBBBB")
+        summary = InstrumentRun.objects.get(pk=self.instrument_run_id)
+        self.assertEqual(2, summary.sequence_count)
+        self.assertEqual(first.start_time, summary.start_time)
+        self.assertEqual(SequenceStatus.STARTED, summary.status)
+
+        second.status = SequenceStatus.SUCCEEDED
+        second.end_time = now()
+        second.save(fast=True)
+        summary = InstrumentRun.objects.get(pk=self.instrument_run_id)
+        self.assertEqual(SequenceStatus.SUCCEEDED, summary.status)
+        self.assertEqual(second.end_time, summary.end_time)
+        self.assert_summary_matches_sequences()
+
+        # moved to another instrument run, the emptied summary is removed
+        first.instrument_run_id = "190101_A01052_0002_BH5LY7ACGT"
+        first.save()
+        second.instrument_run_id = "190101_A01052_0002_BH5LY7ACGT"
+        second.save(update_fields=["instrument_run_id"])
+        self.assertEqual(
+            ["190101_A01052_0002_BH5LY7ACGT"],
+            list(InstrumentRun.objects.values_list("instrument_run_id", flat=True)),
+        )
+        self.assert_summary_matches_sequences()
+
+        second.delete()
+        self.assertEqual(1, InstrumentRun.objects.get().sequence_count)
+        first.delete()
+        self.assertFalse(InstrumentRun.objects.exists())
+
+    def test_not_refreshed_on_unrelated_change(self):
+        """
+        python manage.py test sequence_run_manager.tests.test_models.InstrumentRunTestCase.test_not_refreshed_on_unrelated_change
+        """
+        sequence = self.create_sequence("r.AAAAAA")
+
+        sequence.experiment_name = "ExperimentName"
+        with self.assertNumQueries(1):
+            sequence.save(fast=True)
+
+        # fake sequence runs are not summarised: the ghost lookup and insert only
+        with self.assertNumQueries(2):
+            ghost, _ = Sequence.objects.get_or_create_ghost(
+                self.instrument_run_id, "SampleSheet.csv", "a" * 64
+            )
+        self.assertEqual(1, InstrumentRun.objects.get().sequence_count)
+
+    def test_maintained_on_queryset_update_and_delete(self):
+        """
+        python manage.py test sequence_run_manager.tests.test_models.InstrumentRunTestCase.test_maintained_on_queryset_update_and_delete
+        """
+        self.create_sequence("r.AAAAAA")
+        self.create_sequence(
+            "r.BBBBBB", instrument_run_id="190101_A01052_0002_BH5LY7ACGT"
+        )
+
+        Sequence.objects.filter(sequence_run_id="r.AAAAAA").update(
+            status=SequenceStatus.FAILED
+        )
+        self.assertEqual(
+            SequenceStatus.FAILED,
+            InstrumentRun.objects.get(pk=self.instrument_run_id).status,
+        )
+        Sequence.objects.update(instrument_run_id=self.instrument_run_id)
+        self.assertEqual(2, InstrumentRun.objects.get().sequence_count)
+        self.assert_summary_matches_sequences()
+
+        Sequence.objects.all().delete()
+        self.assertFalse(InstrumentRun.objects.exists())
+
+    def test_rebuild_instrument_runs(self):
+        """
+        python manage.py test sequence_run_manager.tests.test_models.InstrumentRunTestCase.test_rebuild_instrument_runs
+        """
+        build_mock()
+        self.create_sequence("r.CCCCCC")
+        # out of date summaries, e.g. of concurrent writes
+        InstrumentRun.objects.filter(pk=self.instrument_run_id).update(
+            sequence_count=10, status=None
+        )
+        InstrumentRun.objects.create(
+            instrument_run_id="STALE", sequence_count=1, last_updated=now()
+        )
+
+        call_command("rebuild_instrument_runs")
+
+        self.assertEqual(2, InstrumentRun.objects.count())
+        self.assert_summary_matches_sequences()
@@ -0,0 +1,229 @@
+import logging
+from datetime import timedelta
+
+from django.db import connection
+from django.db.models import QuerySet
+from django.http import QueryDict
+from django.test import TestCase
+from django.utils.timezone import now
+from rest_framework.test import APIClient
+
+from sequence_run_manager.models.comment import Comment, TargetType
+from sequence_run_manager.models.sample_sheet import SampleSheet
+from sequence_run_manager.models.sequence import (
+    LibraryAssociation,
+    Sequence,
+    SequenceStatus,
+)
+from sequence_run_manager.models.state import State
+from sequence_run_manager.urls.base import api_base
+from sequence_run_manager.viewsets.utils import filtered_sequence_runs_queryset
+
+logger = logging.getLogger()
+logger.setLevel(logging.INFO)
+
+
+class QueryRecorder:
+    """
+    Database execute wrapper that records every (sql, params) executed within its context.
+    """
+
+    def __init__(self):
+        self.queries = []
+
+    def __call__(self, execute, sql, params, many, context):
+        self.queries.append((sql, params))
+        return execute(sql, params, many, context)
+
+
+class QueryPlanTestCase(TestCase):
+    """
+    Regression tests for the indexes backing the hot lookups of the viewsets and services.
+
+    Each test captures the SQL the code path actually executes, then asks the database for its plan
+    and asserts the expected index is used. Sequential scans are disabled on PostgreSQL, as planner
+    costs on a near-empty test database would otherwise always favour them.
+    """
+
+    sequence_run_endpoint = f"/{api_base}sequence_run"
+    sequence_endpoint = f"/{api_base}sequence"
+    sample_sheet_endpoint = f"/{api_base}sample_sheet"
+
+    instrument_run_id = "190101_A01052_0001_BH5LY7ACGT"
+
+    def setUp(self):
+        if connection.vendor not in ("sqlite", "postgresql"):
+            self.skipTest(f"Query plan assertions not supported on {connection.vendor}")
+
+        self.client = APIClient()
+        self.sequence = Sequence.objects.create(
+            instrument_run_id=self.instrument_run_id,
+            status=SequenceStatus.SUCCEEDED,
+            start_time=now() - timedelta(days=1),
+            sample_sheet_name="SampleSheet.csv",
+            sequence_run_id="r.AAAAAA",
+            sequence_run_name=self.instrument_run_id,
+        )
+        LibraryAssociation.objects.create(
+            sequence=self.sequence,
+            library_id="L2400001",
+            association_date=now(),
+        )
+        State.objects.create(
+            sequence=self.sequence,
+            status=SequenceStatus.SUCCEEDED,
+            timestamp=now(),
+        )
+        self.sample_sheet = SampleSheet.objects.create(
+            sequence=self.sequence,
+            sample_sheet_name="SampleSheet.csv",
+            sample_sheet_content_original="[Header]\nFileFormatVersion,2\n",
+        )
+        Comment.objects.create(
+            target_id=self.sequence.orcabus_id,
+            target_type=TargetType.SEQUENCE,
+            comment="Test comment",
+            created_by="test@example.com",
+        )
+
+    def explain(self, sql: str, params) -> str:
+        with connection.cursor() as cursor:
+            if connection.vendor == "postgresql":
+                cursor.execute("SET LOCAL enable_seqscan = off")
+                cursor.execute(f"EXPLAIN {sql}", params)
+            else:
+                cursor.execute(f"EXPLAIN QUERY PLAN {sql}", params)
+            plan = "\n".join(str(row[-1]) for row in cursor.fetchall())
+        if connection.vendor == "postgresql":
+            with connection.cursor() as cursor:
+                cursor.execute("RESET enable_seqscan")
+        return plan
+
+    def unique_constraint_index(self, model, constraint_name: str) -> str:
+        """
+        Name of the index backing a unique constraint. On sqlite, it is created inline with the table
+        and so gets an automatic index name.
+        """
+        if connection.vendor == "sqlite":
+            return f"sqlite_autoindex_{model._meta.db_table}"
+        return constraint_name
+
+    def assertQuerySetUsesIndex(self, qs: QuerySet, index_name: str):
+        sql, params = qs.query.sql_with_params()
+        plan = self.explain(sql, params)
+        self.assertIn(index_name, plan, f"{sql}\n{plan}")
+
+    def assertAnyQueryUsesIndex(self, recorder: QueryRecorder, index_name: str):
+        plans = []
+        for sql, params in recorder.queries:
+            if not sql.lstrip().upper().startswith("SELECT"):
+                continue
+            plan = self.explain(sql, params)
+            if index_name in plan:
+                return
+            plans.append(f"{sql}\n{plan}")
+        self.fail(f"No captured query used index {index_name}:\n" + "\n\n".join(plans))
+
+    def record(self, url: str) -> QueryRecorder:
+        recorder = QueryRecorder()
+        with connection.execute_wrapper(recorder):
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200, response.content)
+        return recorder
+
+    # --- service / model lookups ---
+
+    def test_sequence_by_sequence_run_id(self):
+        """
+        python manage.py test sequence_run_manager.tests.test_query_plans.QueryPlanTestCase.test_sequence_by_sequence_run_id
+        """
+        self.assertQuerySetUsesIndex(
+            Sequence.objects.filter(sequence_run_id="r.AAAAAA"),
+            self.unique_constraint_index(Sequence, "seq_sequence_run_id_unique"),
+        )
+
+    def test_sequences_by_instrument_run_id(self):
+        """
+        python manage.py test sequence_run_manager.tests.test_query_plans.QueryPlanTestCase.test_sequences_by_instrument_run_id
+        """
+        self.assertQuerySetUsesIndex(
+            Sequence.objects.filter(instrument_run_id=self.instrument_run_id).order_by(
+                "start_time"
+            ),
+            "seq_instrument_run_start_idx",
+        )
+
+    def test_filtered_sequence_runs_by_start_time(self):
+        """
+        python manage.py test sequence_run_manager.tests.test_query_plans.QueryPlanTestCase.test_filtered_sequence_runs_by_start_time
+        """
+        query_params = QueryDict(mutable=True)
+        query_params["start_time"] = (now() - timedelta(days=7)).isoformat()
+        qs = filtered_sequence_runs_queryset(query_params)
+        self.assertQuerySetUsesIndex(qs, "seq_start_time_real_run_idx")
+
+    def test_sequence_libraries(self):
+        """
+        python manage.py test sequence_run_manager.tests.test_query_plans.QueryPlanTestCase.test_sequence_libraries
+        """
+        self.assertQuerySetUsesIndex(
+            LibraryAssociation.objects.filter(library_id__in=["L2400001"]),
+            "libassoc_library_id_idx",
+        )
+
+    def test_latest_state(self):
+        """
+        python manage.py test sequence_run_manager.tests.test_query_plans.QueryPlanTestCase.test_latest_state
+        """
+        self.assertQuerySetUsesIndex(
+            self.sequence.states.order_by("-timestamp"),
+            self.unique_constraint_index(State, "state_seq_ts_status_unique"),
+        )
+
+    def test_sample_sheet_by_sequence_and_name(self):
+        """
+        python manage.py test sequence_run_manager.tests.test_query_plans.QueryPlanTestCase.test_sample_sheet_by_sequence_and_name
+        """
+        self.assertQuerySetUsesIndex(
+            SampleSheet.objects.filter(
+                sequence=self.sequence, sample_sheet_name="SampleSheet.csv"
+            ).order_by("-association_timestamp"),
+            "samplesheet_seq_name_ts_idx",
+        )
+
+    # --- viewset queries ---
+
+    def test_list_sequence_runs_by_library_id(self):
+        """
+        python manage.py test sequence_run_manager.tests.test_query_plans.QueryPlanTestCase.test_list_sequence_runs_by_library_id
+        """
+        recorder = self.record(f"{self.sequence_run_endpoint}?libraryId=L2400001")
+        self.assertAnyQueryUsesIndex(recorder, "libassoc_library_id_idx")
+
+    def test_sequence_run_comments(self):
+        """
+        python manage.py test sequence_run_manager.tests.test_query_plans.QueryPlanTestCase.test_sequence_run_comments
+        """
+        recorder = self.record(
+            f"{self.sequence_run_endpoint}/{self.sequence.orcabus_id}/comment/"
+        )
+        self.assertAnyQueryUsesIndex(recorder, "comment_active_target_idx")
+
+    def test_sample_sheets_by_instrument_run_id(self):
+        """
+        python manage.py test sequence_run_manager.tests.test_query_plans.QueryPlanTestCase.test_sample_sheets_by_instrument_run_id
+        """
+        recorder = self.record(
+            f"{self.sequence_endpoint}/{self.instrument_run_id}/sample_sheets/"
+        )
+        self.assertAnyQueryUsesIndex(recorder, "seq_instrument_run_start_idx")
+        self.assertAnyQueryUsesIndex(recorder, "comment_active_target_idx")
+
+    def test_sample_sheet_by_checksum(self):
+        """
+        python manage.py test sequence_run_manager.tests.test_query_plans.QueryPlanTestCase.test_sample_sheet_by_checksum
+        """
+        recorder = self.record(
+            f"{self.sample_sheet_endpoint}?checksum={self.sample_sheet.checksum_sha256}&checksumType=sha256"
+        )
+        self.assertAnyQueryUsesIndex(recorder, "samplesheet_sha256_idx")
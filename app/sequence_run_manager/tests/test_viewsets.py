@@ -1,12 +1,14 @@
 import logging
+import os
 from pathlib import Path
 from threading import Barrier, Thread
 from unittest.mock import Mock, patch
 import base64
 import json
 
-from django.db import DatabaseError, close_old_connections
+from django.db import DatabaseError, close_old_connections, connection
 from django.test import TestCase, TransactionTestCase, skipUnlessDBFeature
+from django.test.utils import CaptureQueriesContext
 from django.core.files.uploadedfile import SimpleUploadedFile
 from django.utils.timezone import now
 from datetime import timedelta
@@ -21,7 +23,12 @@ from sequence_run_manager.models.sequence import (
 from sequence_run_manager.models.sample_sheet import SampleSheet
 from sequence_run_manager.models.comment import Comment, TargetType
 from sequence_run_manager.models.state import State
+from sequence_run_manager.models.event_outbox import EventOutbox, EventOutboxStatus
 
+from sequence_run_manager.serializers.sample_sheet import (
+    SAMPLE_SHEET_INTERNAL_FIELDS,
+)
+from sequence_run_manager.serializers.sequence_run import SEQUENCE_INTERNAL_FIELDS
 from sequence_run_manager.urls.base import api_base
 from sequence_run_manager.viewsets.state import StateTransitionMixin
 from v2_samplesheet_parser.functions.parser import parse_samplesheet
@@ -209,6 +216,86 @@ class SequenceViewSetTestCase(TestCase):
         self.assertEqual(r.data.get("succeeded"), 1)
         self.assertEqual(r.data.get("failed"), 0)
 
+    def test_instrument_run_groups_served_from_summary(self):
+        """
+        python manage.py test sequence_run_manager.tests.test_viewsets.SequenceViewSetTestCase.test_instrument_run_groups_served_from_summary
+        """
+        for i, status in enumerate(
+            [SequenceStatus.FAILED, SequenceStatus.SUCCEEDED, SequenceStatus.STARTED]
+        ):
+            Sequence.objects.create(
+                instrument_run_id=f"190101_A01052_000{i + 2}_BH5LY7ACGT",
+                status=status,
+                start_time=now() - timedelta(hours=i + 1),
+                end_time=now(),
+                sequence_run_id=f"r.SUMMARY{i}",
+            )
+        # a filter matching every sequence run, so that the groups are aggregated from them instead
+        aggregated = "start_time=2000-01-01T00:00:00Z"
+
+        for query in ["", "status=SUCCEEDED", "ordering=-status", "ordering=end_time"]:
+            for endpoint in [
+                f"{self.sequence_run_endpoint}/list_by_instrument_run_id/",
+                f"{self.stats_instrument_run_status_counts_endpoint}/",
+            ]:
+                with CaptureQueriesContext(connection) as ctx:
+                    from_summary = self.client.get(f"{endpoint}?{query}")
+                # the groups are not aggregated from the sequence runs
+                self.assertFalse(
+                    any(
+                        "GROUP BY" in q["sql"]
+                        and "sequence_run_manager_sequence" in q["sql"]
+                        for q in ctx.captured_queries
+                    )
+                )
+                from_sequences = self.client.get(f"{endpoint}?{query}&{aggregated}")
+                self.assertEqual(200, from_summary.status_code)
+                self.assertEqual(from_sequences.data, from_summary.data)
+
+        grouped = self.client.get(
+            f"{self.sequence_run_endpoint}/list_by_instrument_run_id/"
+            "?instrument_run_id=190101_a01052_0002_bh5ly7acgt"
+        )
+        self.assertEqual(
+            ["r.SUMMARY0"],
+            [item["sequence_run_id"] for item in grouped.data["results"][0]["items"]],
+        )
+
+    def test_list_by_instrument_run_id_statements(self):
+        """
+        python manage.py test sequence_run_manager.tests.test_viewsets.SequenceViewSetTestCase.test_list_by_instrument_run_id_statements
+        """
+        for i in range(10):
+            for j in range(3):
+                Sequence.objects.create(
+                    instrument_run_id=f"190101_A01052_{i + 2:04}_BH5LY7ACGT",
+                    status=SequenceStatus.SUCCEEDED,
+                    start_time=now() - timedelta(days=i, hours=j),
+                    sequence_run_id=f"r.PAGE{i}{j}",
+                )
+        # summary and aggregated groups
+        for query in ["", "start_time=2000-01-01T00:00:00Z"]:
+            for rows_per_page in [1, 11]:
+                with CaptureQueriesContext(connection) as ctx:
+                    response = self.client.get(
+                        f"{self.sequence_run_endpoint}/list_by_instrument_run_id/"
+                        f"?rowsPerPage={rows_per_page}&{query}"
+                    )
+                self.assertEqual(200, response.status_code)
+                groups = response.data["results"]
+                self.assertEqual(rows_per_page, len(groups))
+                # count and page of groups, then the sequences of all the groups on the page
+                self.assertEqual(3, len(ctx.captured_queries))
+
+                for group in groups:
+                    self.assertEqual(group["count"], len(group["items"]))
+                    start_times = [item["start_time"] for item in group["items"]]
+                    self.assertEqual(sorted(start_times), start_times)
+                    self.assertEqual(
+                        {group["instrument_run_id"]},
+                        {item["instrument_run_id"] for item in group["items"]},
+                    )
+
     def test_stats_sequence_run_status_counts_matches_list_start_time_filter(self):
         """
         ``sequence_run_status_counts`` must apply the same ``start_time`` (gte) semantics as the list API
@@ -289,6 +376,8 @@ class SequenceViewSetTestCase(TestCase):
         )
         self.assertEqual(response.status_code, 200, "Ok status response is expected")
         self.assertEqual(len(response.data), 1, "At least one result is expected")
+        for internal_field in SEQUENCE_INTERNAL_FIELDS:
+            self.assertNotIn(internal_field, response.data[0])
 
     def test_get_sequence_states(self):
         """
@@ -302,6 +391,84 @@ class SequenceViewSetTestCase(TestCase):
         self.assertEqual(response.status_code, 200, "Ok status response is expected")
         self.assertEqual(len(response.data), 2, "Two states are expected")
 
+    def test_sequence_endpoints_statements(self):
+        """
+        python manage.py test sequence_run_manager.tests.test_viewsets.SequenceViewSetTestCase.test_sequence_endpoints_statements
+        """
+        instrument_run_id = "190101_A01052_0002_BH5LY7ACGT"
+        for i in range(5):
+            sequence = Sequence.objects.create(
+                instrument_run_id=instrument_run_id,
+                status=SequenceStatus.SUCCEEDED,
+                start_time=now() - timedelta(hours=i),
+                sequence_run_id=f"r.MANY{i}",
+            )
+            State.objects.create(sequence=sequence, status="Complete", timestamp=now())
+            for j in range(3):
+                LibraryAssociation.objects.create(
+                    sequence=sequence,
+                    library_id=f"L{i}{j}",
+                    association_date=now(),
+                    status="active",
+                )
+                sample_sheet = SampleSheet.objects.create(
+                    sequence=sequence,
+                    sample_sheet_name=f"SampleSheet{j}.csv",
+                    sample_sheet_content={},
+                )
+                for k in range(2):
+                    Comment.objects.create(
+                        target_id=sample_sheet.orcabus_id,
+                        target_type=TargetType.SAMPLE_SHEET,
+                        comment=f"{sample_sheet.sample_sheet_name} comment {k}",
+                        created_by="TestUser",
+                    )
+            Comment.objects.create(
+                target_id=sequence.orcabus_id,
+                target_type=TargetType.SEQUENCE,
+                comment="TestComment",
+                created_by="TestUser",
+            )
+
+        # the same statements for one sequence (with one of each) as for many
+        for endpoint, statements in [
+            ("sequence_run", 2),
+            ("states", 1),
+            ("comments", 3),
+            ("sample_sheets", 2),
+        ]:
+            for instrument_run in ["190101_A01052_0001_BH5LY7ACGT", instrument_run_id]:
+                with CaptureQueriesContext(connection) as ctx:
+                    response = self.client.get(
+                        f"{self.sequence_endpoint}/{instrument_run}/{endpoint}/"
+                    )
+                self.assertEqual(200, response.status_code)
+                self.assertEqual(statements, len(ctx.captured_queries), endpoint)
+
+        response = self.client.get(
+            f"{self.sequence_endpoint}/{instrument_run_id}/sequence_run/"
+        )
+        self.assertEqual(
+            {f"r.MANY{i}": {f"L{i}{j}" for j in range(3)} for i in range(5)},
+            {
+                sequence["sequence_run_id"]: set(sequence["libraries"])
+                for sequence in response.data
+            },
+        )
+        response = self.client.get(
+            f"{self.sequence_endpoint}/{instrument_run_id}/comments/"
+        )
+        self.assertEqual(5 * 3 * 2 + 5, len(response.data))
+        response = self.client.get(
+            f"{self.sequence_endpoint}/{instrument_run_id}/sample_sheets/"
+        )
+        self.assertEqual(15, len(response.data))
+        for sample_sheet in response.data:
+            self.assertEqual(
+                f"{sample_sheet['sample_sheet_name']} comment 0",
+                sample_sheet["comment"]["comment"],
+            )
+
     def test_get_sequence_comments_excludes_soft_deleted_comments(self):
         instrument_run_id = "190101_A01052_0001_BH5LY7ACGT"
         sequence = Sequence.objects.get(instrument_run_id=instrument_run_id)
@@ -470,6 +637,17 @@ class SequenceViewSetTestCase(TestCase):
             {"RESOLVED": ["FAILED"], "DEPRECATED": ["SUCCEEDED"]},
         )
 
+    def srsc_outbox_events(self, sequence: Sequence) -> list[dict]:
+        """Details of the SRSC events recorded in the event outbox for the sequence run"""
+        return [
+            json.loads(detail)
+            for detail in EventOutbox.objects.filter(
+                sequence=sequence, detail_type="SequenceRunStateChange"
+            )
+            .order_by("id")
+            .values_list("detail", flat=True)
+        ]
+
     def test_state_transition_mixin_validation_rules(self):
         mixin = StateTransitionMixin()
 
@@ -570,10 +748,7 @@ class SequenceViewSetTestCase(TestCase):
         )
         self.assertEqual(response.status_code, 400)
 
-    @patch("sequence_run_manager.viewsets.state.emit_srsc_api_event")
-    def test_create_state_revalidates_locked_sequence_status(
-        self, mock_emit_srsc_event
-    ):
+    def test_create_state_revalidates_locked_sequence_status(self):
         sequence_run = Sequence.objects.get(sequence_run_id="r.AAAAAA")
         sequence_run.status = SequenceStatus.FAILED
         sequence_run.save(update_fields=["status"])
@@ -603,7 +778,7 @@ class SequenceViewSetTestCase(TestCase):
             State.objects.filter(sequence=sequence_run, status="RESOLVED").exists()
         )
         mock_select_for_update.assert_called_once_with()
-        mock_emit_srsc_event.assert_not_called()
+        self.assertEqual(self.srsc_outbox_events(sequence_run), [])
 
     @patch(
         "sequence_run_manager.viewsets.state.StateViewSet.create_state_and_build_srsc",
@@ -636,8 +811,7 @@ class SequenceViewSetTestCase(TestCase):
         )
         mock_create_state_and_build_srsc.assert_called_once()
 
-    @patch("sequence_run_manager.viewsets.state.emit_srsc_api_event")
-    def test_create_state_resolved_after_failed(self, mock_emit_srsc_event):
+    def test_create_state_resolved_after_failed(self):
         sequence_run = Sequence.objects.get(sequence_run_id="r.AAAAAA")
         sequence_run.status = SequenceStatus.FAILED
         sequence_run.save(update_fields=["status"])
@@ -647,12 +821,11 @@ class SequenceViewSetTestCase(TestCase):
             timestamp=now(),
             comment="stale detail status",
         )
-        with self.captureOnCommitCallbacks(execute=True):
-            response = self.client.post(
-                f"{self.sequence_run_endpoint}/{sequence_run.orcabus_id}/state/",
-                {"status": "RESOLVED", "comment": "Handled"},
-                format="json",
-            )
+        response = self.client.post(
+            f"{self.sequence_run_endpoint}/{sequence_run.orcabus_id}/state/",
+            {"status": "RESOLVED", "comment": "Handled"},
+            format="json",
+        )
         self.assertEqual(response.status_code, 201)
         self.assertEqual(response.data["status"], "RESOLVED")
         self.assertEqual(response.data["comment"], "Handled")
@@ -662,8 +835,7 @@ class SequenceViewSetTestCase(TestCase):
             "RESOLVED",
             "Sequence status should be updated to RESOLVED",
         )
-        mock_emit_srsc_event.assert_called_once()
-        srsc_event = mock_emit_srsc_event.call_args.args[0]
+        (srsc_event,) = self.srsc_outbox_events(sequence_run)
         self.assertEqual(srsc_event["id"], sequence_run.orcabus_id)
         self.assertEqual(srsc_event["instrumentRunId"], sequence_run.instrument_run_id)
         self.assertEqual(srsc_event["runVolumeName"], sequence_run.run_volume_name)
@@ -672,8 +844,7 @@ class SequenceViewSetTestCase(TestCase):
         self.assertEqual(srsc_event["sampleSheetName"], sequence_run.sample_sheet_name)
         self.assertEqual(srsc_event["status"], "RESOLVED")
 
-    @patch("sequence_run_manager.viewsets.state.emit_srsc_api_event")
-    def test_create_state_deprecated_after_succeeded(self, mock_emit_srsc_event):
+    def test_create_state_deprecated_after_succeeded(self):
         sequence_run = Sequence.objects.get(sequence_run_id="r.AAAAAA")
         State.objects.create(
             sequence=sequence_run,
@@ -681,12 +852,11 @@ class SequenceViewSetTestCase(TestCase):
             timestamp=now(),
             comment="stale detail status",
         )
-        with self.captureOnCommitCallbacks(execute=True):
-            response = self.client.post(
-                f"{self.sequence_run_endpoint}/{sequence_run.orcabus_id}/state/",
-                {"status": "DEPRECATED", "comment": "No longer used"},
-                format="json",
-            )
+        response = self.client.post(
+            f"{self.sequence_run_endpoint}/{sequence_run.orcabus_id}/state/",
+            {"status": "DEPRECATED", "comment": "No longer used"},
+            format="json",
+        )
         self.assertEqual(response.status_code, 201)
         self.assertEqual(response.data["status"], "DEPRECATED")
         sequence_run.refresh_from_db()
@@ -695,71 +865,63 @@ class SequenceViewSetTestCase(TestCase):
             "DEPRECATED",
             "Sequence status should be updated to DEPRECATED",
         )
-        mock_emit_srsc_event.assert_called_once()
-        srsc_event = mock_emit_srsc_event.call_args.args[0]
+        (srsc_event,) = self.srsc_outbox_events(sequence_run)
         self.assertEqual(srsc_event["id"], sequence_run.orcabus_id)
         self.assertEqual(srsc_event["status"], "DEPRECATED")
 
-    @patch("sequence_run_manager.viewsets.state.emit_srsc_api_event")
-    def test_create_state_publish_failure_is_logged_after_commit(
-        self, mock_emit_srsc_event
-    ):
-        mock_emit_srsc_event.side_effect = RuntimeError("event bus unavailable")
-        sequence_run = Sequence.objects.get(sequence_run_id="r.AAAAAA")
-        sequence_run.status = SequenceStatus.FAILED
-        sequence_run.save(update_fields=["status"])
-        State.objects.create(
-            sequence=sequence_run,
-            status="FAILED",
-            timestamp=now(),
-            comment="failed",
-        )
-        with self.assertLogs(
-            "sequence_run_manager.viewsets.state", level="ERROR"
-        ) as logs:
-            with self.captureOnCommitCallbacks(execute=True):
-                response = self.client.post(
-                    f"{self.sequence_run_endpoint}/{sequence_run.orcabus_id}/state/",
-                    {"status": "RESOLVED", "comment": "Handled"},
-                    format="json",
-                )
-
-        self.assertEqual(response.status_code, 201)
-        state = State.objects.get(sequence=sequence_run, status="RESOLVED")
-        sequence_run.refresh_from_db()
-        self.assertEqual(sequence_run.status, "RESOLVED")
-        mock_emit_srsc_event.assert_called_once()
-        logged = " ".join(logs.output)
-        self.assertIn("failed after database commit", logged)
-        self.assertIn(str(sequence_run.orcabus_id), logged)
-        self.assertIn(str(state.orcabus_id), logged)
-        self.assertIn("recoverable=true", logged)
-
-    @patch("sequence_run_manager.viewsets.state.emit_srsc_api_event")
-    def test_create_state_defers_srsc_publication_until_commit(
-        self, mock_emit_srsc_event
+    @patch("sequence_run_manager.aws_event_bridge.event_srv.libeb.emit_events")
+    def test_create_state_records_srsc_in_outbox_without_publishing(
+        self, mock_emit_events
     ):
+        """
+        python manage.py test sequence_run_manager.tests.test_viewsets.SequenceViewSetTestCase.test_create_state_records_srsc_in_outbox_without_publishing
+        """
         sequence_run = Sequence.objects.get(sequence_run_id="r.AAAAAA")
         sequence_run.status = SequenceStatus.FAILED
         sequence_run.save(update_fields=["status"])
 
-        with self.captureOnCommitCallbacks(execute=False) as callbacks:
+        with self.captureOnCommitCallbacks(execute=True) as callbacks:
             response = self.client.post(
                 f"{self.sequence_run_endpoint}/{sequence_run.orcabus_id}/state/",
                 {"status": "RESOLVED", "comment": "Handled"},
                 format="json",
             )
-            mock_emit_srsc_event.assert_not_called()
 
         self.assertEqual(response.status_code, 201)
-        self.assertEqual(len(callbacks), 1)
-        callbacks[0]()
-        mock_emit_srsc_event.assert_called_once()
+        self.assertEqual(len(callbacks), 0)
+        mock_emit_events.assert_not_called()
+        outbox_event = EventOutbox.objects.get(sequence=sequence_run)
+        self.assertEqual(outbox_event.status, EventOutboxStatus.PENDING)
+        self.assertEqual(outbox_event.source, "orcabus.sequencerunmanager")
+        self.assertEqual(outbox_event.detail_type, "SequenceRunStateChange")
 
-    @patch("sequence_run_manager.viewsets.state.emit_srsc_api_event")
-    def test_create_state_only_deprecated_when_no_current_sequence_status(
-        self, mock_emit_srsc_event
-    ):
+    @patch(
+        "sequence_run_manager.viewsets.state.EventOutbox.objects.add_events",
+        side_effect=DatabaseError("database unavailable"),
+    )
+    def test_create_state_outbox_failure_rolls_back_state(self, mock_add_events):
+        """
+        python manage.py test sequence_run_manager.tests.test_viewsets.SequenceViewSetTestCase.test_create_state_outbox_failure_rolls_back_state
+        """
+        sequence_run = Sequence.objects.get(sequence_run_id="r.AAAAAA")
+        sequence_run.status = SequenceStatus.FAILED
+        sequence_run.save(update_fields=["status"])
+
+        response = self.client.post(
+            f"{self.sequence_run_endpoint}/{sequence_run.orcabus_id}/state/",
+            {"status": "RESOLVED", "comment": "Handled"},
+            format="json",
+        )
+
+        self.assertEqual(response.status_code, 500)
+        mock_add_events.assert_called_once()
+        self.assertFalse(
+            State.objects.filter(sequence=sequence_run, status="RESOLVED").exists()
+        )
+        sequence_run.refresh_from_db()
+        self.assertEqual(sequence_run.status, SequenceStatus.FAILED)
+
+    def test_create_state_only_deprecated_when_no_current_sequence_status(self):
         orphan = Sequence.objects.create(
             instrument_run_id="orphan_run_001",
             run_volume_name="vol",
@@ -781,30 +943,26 @@ class SequenceViewSetTestCase(TestCase):
             format="json",
         )
         self.assertEqual(bad.status_code, 400)
-        mock_emit_srsc_event.assert_not_called()
-        with self.captureOnCommitCallbacks(execute=True):
-            good = self.client.post(
-                f"{self.sequence_run_endpoint}/{orphan.orcabus_id}/state/",
-                {"status": "DEPRECATED", "comment": "initial"},
-                format="json",
-            )
+        self.assertEqual(self.srsc_outbox_events(orphan), [])
+        good = self.client.post(
+            f"{self.sequence_run_endpoint}/{orphan.orcabus_id}/state/",
+            {"status": "DEPRECATED", "comment": "initial"},
+            format="json",
+        )
         self.assertEqual(good.status_code, 201)
         self.assertEqual(good.data["status"], "DEPRECATED")
-        mock_emit_srsc_event.assert_called_once()
-        srsc_event = mock_emit_srsc_event.call_args.args[0]
+        (srsc_event,) = self.srsc_outbox_events(orphan)
         self.assertEqual(srsc_event["id"], orphan.orcabus_id)
         self.assertEqual(srsc_event["status"], "DEPRECATED")
 
-    @patch("sequence_run_manager.viewsets.sequence_run_action.emit_srllc_api_event")
-    @patch("sequence_run_manager.viewsets.sequence_run_action.emit_srssc_api_event")
-    def test_add_samplesheet_action(self, mock_emit_srssc_event, mock_emit_srllc_event):
+    @patch.dict(
+        os.environ, {"SEQUENCE_RUN_MANAGER_BASE_API_URL": "https://srm.example"}
+    )
+    def test_add_samplesheet_action(self):
         """
         python manage.py test sequence_run_manager.tests.test_viewsets.SequenceViewSetTestCase.test_add_samplesheet_action
         """
         logger.info("Add samplesheet action")
-        # Mock the event emission to avoid actual EventBridge calls
-        mock_emit_srssc_event.return_value = None
-        mock_emit_srllc_event.return_value = None
 
         # Read the file content from ./examples/standard-sheet-with-settings.csv
         samplesheet_path = (
@@ -843,8 +1001,6 @@ class SequenceViewSetTestCase(TestCase):
             "Samplesheet added successfully",
             "Detail is expected",
         )
-        mock_emit_srssc_event.assert_called_once()
-        mock_emit_srllc_event.assert_called_once()
 
         # Get the created sequence_run (it's created by the add_samplesheet action)
         sequence_run = (
@@ -856,6 +1012,34 @@ class SequenceViewSetTestCase(TestCase):
             sequence_run, "Sequence run should be created by add_samplesheet action"
         )
 
+        # events are recorded in the event outbox along with the records, in order
+        self.assertEqual(
+            list(
+                EventOutbox.objects.filter(sequence=sequence_run)
+                .order_by("id")
+                .values_list("detail_type", flat=True)
+            ),
+            [
+                "SequenceRunSampleSheetChange",
+                "SequenceRunLibraryLinkingChange",
+                "SequenceRunLibraryLinkingDelta",
+            ],
+        )
+        # all the libraries are added to the new sequence run
+        srllc_event = json.loads(
+            EventOutbox.objects.get(
+                sequence=sequence_run, detail_type="SequenceRunLibraryLinkingChange"
+            ).detail
+        )
+        linked_libraries = sorted(
+            LibraryAssociation.objects.filter(sequence=sequence_run).values_list(
+                "library_id", flat=True
+            )
+        )
+        self.assertTrue(linked_libraries)
+        self.assertEqual(srllc_event["addedLibraries"], linked_libraries)
+        self.assertEqual(srllc_event["removedLibraries"], [])
+
         # test get samplesheet
         get_samplesheet_response = self.client.get(
             f"{self.sequence_run_endpoint}/{sequence_run.orcabus_id}/sample_sheet/"
@@ -875,6 +1059,8 @@ class SequenceViewSetTestCase(TestCase):
             samplesheet_content.decode("utf-8"),
             "Sample sheet content is expected",
         )
+        for internal_field in SAMPLE_SHEET_INTERNAL_FIELDS:
+            self.assertNotIn(internal_field, get_samplesheet_response.data)
 
         # test get samplesheet by ss orcabus_id
         ss_orcabus_id = get_samplesheet_response.data["orcabus_id"]
@@ -967,10 +1153,7 @@ class StateTransitionConcurrencyTestCase(TransactionTestCase):
             api_url="https://bssh.dev/api/v1/runs/r.CONCURRENT01",
         )
 
-    @patch("sequence_run_manager.viewsets.state.emit_srsc_api_event")
-    def test_competing_resolved_transitions_create_one_state(
-        self, mock_emit_srsc_event
-    ):
+    def test_competing_resolved_transitions_create_one_state(self):
         initial_read_barrier = Barrier(2)
         original_get = Sequence.objects.get
         responses = []
@@ -1014,4 +1197,4 @@ class StateTransitionConcurrencyTestCase(TransactionTestCase):
             State.objects.filter(sequence=self.sequence, status="RESOLVED").count(),
             1,
         )
-        mock_emit_srsc_event.assert_called_once()
+        self.assertEqual(EventOutbox.objects.filter(sequence=self.sequence).count(), 1)
@@ -1,4 +1,5 @@
 from sequence_run_manager.models import SampleSheet, Sequence
+from sequence_run_manager.models.sample_sheet import SAMPLE_SHEET_CHECKSUM_TYPES
 from sequence_run_manager.serializers.sample_sheet import SampleSheetSerializer
 from rest_framework.viewsets import ViewSet
 from django.shortcuts import get_object_or_404
@@ -7,8 +8,6 @@ from rest_framework import status
 from rest_framework.decorators import action
 from drf_spectacular.utils import extend_schema, OpenApiResponse, OpenApiParameter
 from drf_spectacular.types import OpenApiTypes
-import hashlib
-import zlib
 
 import logging
 
@@ -24,7 +23,7 @@ class SampleSheetViewSet(ViewSet):
     lookup_value_regex = "[^/]+"  # to allow id prefix
     lookup_field = "orcabus_id"
 
-    supported_checksum_types = ["md5", "crc32", "sha256"]
+    supported_checksum_types = list(SAMPLE_SHEET_CHECKSUM_TYPES)
 
     def _validate_checksum_type(self, checksum_type: str) -> bool:
         """
@@ -36,35 +35,6 @@ class SampleSheetViewSet(ViewSet):
         """
         return checksum_type in self.supported_checksum_types
 
-    def _calculate_checksum(
-        self, sample_sheet_content_original: str, checksum_type: str = "sha256"
-    ) -> str:
-        """
-        Calculate checksum from sample sheet content.
-        Args:
-            sample_sheet_content_original: Original CSV content of the sample sheet
-            checksum_type: Type of checksum to calculate ('sha256', 'md5', or 'crc32')
-        Returns:
-            str: Checksum as hexadecimal string, or empty string if content is None/empty
-        """
-        if not sample_sheet_content_original:
-            return ""
-        try:
-            content_bytes = sample_sheet_content_original.encode("utf-8")
-            if checksum_type.lower() == "md5":
-                return hashlib.md5(content_bytes).hexdigest()
-            elif checksum_type.lower() == "crc32":
-                # CRC32 returns a signed integer, convert to unsigned and then to hex
-                crc32_value = zlib.crc32(content_bytes) & 0xFFFFFFFF
-                return format(crc32_value, "08x")
-            else:  # default to sha256
-                return hashlib.sha256(content_bytes).hexdigest()
-        except Exception as e:
-            logger.warning(
-                f"Failed to calculate {checksum_type} checksum from sample sheet content: {str(e)}"
-            )
-            return ""
-
     @extend_schema(
         parameters=[
             OpenApiParameter(
@@ -137,16 +107,10 @@ class SampleSheetViewSet(ViewSet):
                     status=status.HTTP_400_BAD_REQUEST,
                 )
 
-            # Filter sample sheets by matching checksum
-            matching_sample_sheets = []
-            for sample_sheet in queryset:
-                calculated_checksum = self._calculate_checksum(
-                    sample_sheet.sample_sheet_content_original or "", checksum_type
-                )
-                if calculated_checksum.lower() == checksum.lower():
-                    matching_sample_sheets.append(sample_sheet)
-
-            queryset = matching_sample_sheets
+            # Checksums are stored (and indexed) as lowercase hex at write time
+            queryset = queryset.filter(
+                **{f"checksum_{checksum_type}": checksum.lower()}
+            )
 
         if sequence_run_id:
             try:
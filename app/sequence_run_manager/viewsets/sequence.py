@@ -4,8 +4,15 @@ from rest_framework.decorators import action
 from rest_framework.response import Response
 from rest_framework import status
 from rest_framework.viewsets import GenericViewSet
-from django.db.models import Q
-from sequence_run_manager.models import Sequence, State, Comment, SampleSheet
+from django.db.models import Prefetch
+from sequence_run_manager.fields import sanitize_orcabus_id
+from sequence_run_manager.models import (
+    Sequence,
+    State,
+    Comment,
+    SampleSheet,
+    LibraryAssociation,
+)
 from sequence_run_manager.serializers.sequence_run import SequenceRunSerializer
 from sequence_run_manager.serializers.state import StateSerializer
 from sequence_run_manager.serializers.comment import CommentSerializer
@@ -39,7 +46,15 @@ class SequenceViewSet(GenericViewSet):
         Get all sequence data by instrument run id
         """
         instrument_run_id = kwargs.get("instrument_run_id")
-        sequences = Sequence.objects.filter(instrument_run_id=instrument_run_id)
+        # the libraries of all the sequences in a second query
+        sequences = Sequence.objects.filter(
+            instrument_run_id=instrument_run_id
+        ).prefetch_related(
+            Prefetch(
+                "libraryassociation_set",
+                queryset=LibraryAssociation.objects.only("sequence", "library_id"),
+            )
+        )
         serializer = SequenceRunSerializer(sequences, many=True)
         return Response(serializer.data, status=status.HTTP_200_OK)
 
@@ -58,8 +73,7 @@ class SequenceViewSet(GenericViewSet):
         Get all states by instrument run id
         """
         instrument_run_id = kwargs.get("instrument_run_id")
-        sequences = Sequence.objects.filter(instrument_run_id=instrument_run_id)
-        states = State.objects.filter(sequence__in=sequences)
+        states = State.objects.filter(sequence__instrument_run_id=instrument_run_id)
         serializer = StateSerializer(states, many=True)
         return Response(serializer.data, status=status.HTTP_200_OK)
 
@@ -96,15 +110,20 @@ class SequenceViewSet(GenericViewSet):
         Get all comments by instrument run id
         """
         instrument_run_id = kwargs.get("instrument_run_id")
-        sequences_orcabus_ids = Sequence.objects.filter(
-            instrument_run_id=instrument_run_id
-        ).values_list("orcabus_id", flat=True)
-        sample_sheets_orcabus_ids = SampleSheet.objects.filter(
-            sequence__in=sequences_orcabus_ids
-        ).values_list("orcabus_id", flat=True)
+        # the IDs of the sequences and of their sample sheets, then their comments by the (indexed)
+        # target ID: one query each, rather than nested subqueries
+        sequences_orcabus_ids = list(
+            Sequence.objects.filter(instrument_run_id=instrument_run_id).values_list(
+                "orcabus_id", flat=True
+            )
+        )
+        sample_sheets_orcabus_ids = list(
+            SampleSheet.objects.filter(
+                sequence_id__in=sequences_orcabus_ids
+            ).values_list("orcabus_id", flat=True)
+        )
         comments = Comment.objects.active().filter(
-            Q(target_id__in=sequences_orcabus_ids)
-            | Q(target_id__in=sample_sheets_orcabus_ids)
+            target_id__in=sequences_orcabus_ids + sample_sheets_orcabus_ids
         )
         serializer = CommentSerializer(comments, many=True)
         return Response(serializer.data, status=status.HTTP_200_OK)
@@ -124,14 +143,24 @@ class SequenceViewSet(GenericViewSet):
         Get all sample sheets by instrument run id
         """
         instrument_run_id = kwargs.get("instrument_run_id")
-        sequences = Sequence.objects.filter(instrument_run_id=instrument_run_id)
-        sample_sheets = SampleSheet.objects.filter(sequence__in=sequences)
-        comments = Comment.objects.active().filter(
-            target_id__in=sample_sheets.values_list("orcabus_id", flat=True)
+        sample_sheets = list(
+            SampleSheet.objects.filter(sequence__instrument_run_id=instrument_run_id)
         )
+        # the comments of all the sample sheets in a single query, the first (oldest) one of each is kept
+        comments_by_target_id = {}
+        for comment in (
+            Comment.objects.active()
+            .filter(
+                target_id__in=[
+                    sample_sheet.orcabus_id for sample_sheet in sample_sheets
+                ]
+            )
+            .order_by("created_at", "orcabus_id")
+        ):
+            comments_by_target_id.setdefault(comment.target_id, comment)
         for sample_sheet in sample_sheets:
-            sample_sheet.comment = comments.filter(
-                target_id=sample_sheet.orcabus_id
-            ).first()
+            sample_sheet.comment = comments_by_target_id.get(
+                sanitize_orcabus_id(sample_sheet.orcabus_id)
+            )
         serializer = SampleSheetWithCommentSerializer(sample_sheets, many=True)
         return Response(serializer.data, status=status.HTTP_200_OK)
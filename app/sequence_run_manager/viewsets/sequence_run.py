@@ -1,3 +1,5 @@
+from collections import defaultdict
+
 from drf_spectacular.utils import extend_schema, OpenApiResponse
 from rest_framework.decorators import action
 from rest_framework.response import Response
@@ -18,8 +20,8 @@ from sequence_run_manager.serializers.sample_sheet import SampleSheetSerializer
 from sequence_run_manager.models.sample_sheet import SampleSheet
 from sequence_run_manager.viewsets.base import BaseViewSet
 from sequence_run_manager.viewsets.utils import (
+    filtered_instrument_run_groups_queryset,
     filtered_sequence_runs_queryset,
-    instrument_run_groups_queryset,
 )
 
 # Allowed ordering fields for ongoing/unresolved actions (with optional - prefix)
@@ -150,10 +152,9 @@ class SequenceRunViewSet(BaseViewSet):
             apply_sequence_status_param=False,
         )
 
-        grouped_data = instrument_run_groups_queryset(sequence_set)
-        status_filter = (self.request.query_params.get("status") or "").strip()
-        if status_filter:
-            grouped_data = grouped_data.filter(group_status=status_filter)
+        grouped_data = filtered_instrument_run_groups_queryset(
+            self.request.query_params, sequence_set
+        )
 
         # Apply ordering to grouped_data; ``status`` maps to the annotated ``group_status``
         # field.  Fields absent from the grouped queryset (e.g. ``orcabus_id``) are ignored
@@ -164,16 +165,27 @@ class SequenceRunViewSet(BaseViewSet):
         paginator = StandardResultsSetPagination()
         paginated_groups = paginator.paginate_queryset(grouped_data, request)
 
+        # the sequences of every instrument run on the page in a single query, grouped here
+        instrument_run_ids = [
+            group["instrument_run_id"]
+            for group in paginated_groups
+            if group["instrument_run_id"]
+        ]
+        sequences_by_instrument_run_id = defaultdict(list)
+        for sequence in sequence_set.filter(
+            instrument_run_id__in=instrument_run_ids
+        ).order_by("start_time", "orcabus_id"):
+            sequences_by_instrument_run_id[sequence.instrument_run_id].append(sequence)
+
         result = []
         for group in paginated_groups:
             instrument_run_id = group["instrument_run_id"]
             if not instrument_run_id:
                 continue
-            sequences = sequence_set.filter(
-                instrument_run_id=instrument_run_id
-            ).order_by("start_time")
             sequence_status = group.get("group_status")
-            sequence_items = SequenceRunMinSerializer(sequences, many=True).data
+            sequence_items = SequenceRunMinSerializer(
+                sequences_by_instrument_run_id[instrument_run_id], many=True
+            ).data
 
             result.append(
                 {
@@ -1,4 +1,5 @@
 import ulid
+from django.db import transaction
 from django.utils import timezone
 import logging
 from rest_framework import status
@@ -16,18 +17,19 @@ from sequence_run_manager.models import (
     SampleSheet,
     LibraryAssociation,
     Comment,
+    EventOutbox,
 )
 from sequence_run_manager.models.comment import TargetType
 from sequence_run_manager.aws_event_bridge.event_srv import (
-    emit_srllc_api_event,
-    emit_srssc_api_event,
+    srllc_api_event_entries,
+    srssc_api_event_entries,
 )
+from sequence_run_manager_proc.domain.putevents import EventEntryTooLargeError
 
 from v2_samplesheet_parser.functions.parser import parse_samplesheet
 
 logger = logging.getLogger(__name__)
 logger.setLevel(logging.INFO)
-ASSOCIATION_STATUS = "ACTIVE"
 
 
 class SequenceRunActionViewSet(ViewSet):
@@ -47,7 +49,7 @@ class SequenceRunActionViewSet(ViewSet):
             ),
             500: OpenApiResponse(description="Internal server error"),
         },
-        description="Creating a fake sequence run and associate a samplesheet to it by emitting an SRSSC and/or SRLLC event to EventBridge (Orcabus)",
+        description="Creating a fake sequence run and associate a samplesheet to it, emitting an SRSSC and/or SRLLC event to EventBridge (Orcabus) through the event outbox",
         tags=["Sequence Run Actions"],
     )
     @action(
@@ -68,16 +70,7 @@ class SequenceRunActionViewSet(ViewSet):
         created_by = serializer.validated_data["created_by"]
         comment = serializer.validated_data["comment"]
 
-        # step 1: create a fake sequence run
-        sequence_run = Sequence.objects.create(
-            instrument_run_id=instrument_run_id,
-            sequence_run_id="r." + ulid.new().str,
-            sample_sheet_name=samplesheet_name,
-            start_time=timezone.now(),  # add start time to record the time when the (ghost) sequence run is created
-        )
-        logger.info(f"Sequence run created for instrument run {instrument_run_id}")
-
-        # step 2: read the uploaded samplesheet
+        # step 1: read the uploaded samplesheet
         samplesheet_content = b""
         with uploaded_samplesheet.open("rb") as f:
             samplesheet_content = f.read()
@@ -94,100 +87,89 @@ class SequenceRunActionViewSet(ViewSet):
                 status=status.HTTP_400_BAD_REQUEST,
             )
 
-        # step 3: save samplesheet to database
-        sample_sheet = SampleSheet.objects.create(
-            sequence=sequence_run,
-            sample_sheet_name=samplesheet_name,
-            sample_sheet_content=samplesheet_content_json,
-            sample_sheet_content_original=samplesheet_content_str,  # Store original CSV as UTF-8 string
-        )
-
-        comment_obj = Comment.objects.create(
-            target_id=sample_sheet.orcabus_id,
-            target_type=TargetType.SAMPLE_SHEET,
-            comment=comment,
-            created_by=created_by,
-        )
-        logger.info(
-            f"Samplesheet saved for sequence run {sequence_run.sequence_run_id}, and comment {comment_obj.orcabus_id} saved"
-        )
-
-        # step 4: construct event bridge detail and emit event to event bridge
-        samplesheet_change_eb_payload = construct_samplesheet_change_eb_payload(
-            sequence_run, sample_sheet, comment_obj
-        )
+        # the records and their events (in the event outbox, published by the outbox relay) are committed together
+        with transaction.atomic():
+            # step 2: create a fake sequence run
+            sequence_run = Sequence.objects.create(
+                instrument_run_id=instrument_run_id,
+                sequence_run_id="r." + ulid.new().str,
+                sample_sheet_name=samplesheet_name,
+                start_time=timezone.now(),  # add start time to record the time when the (ghost) sequence run is created
+            )
+            logger.info(f"Sequence run created for instrument run {instrument_run_id}")
+
+            # step 3: save samplesheet to database
+            sample_sheet = SampleSheet.objects.create(
+                sequence=sequence_run,
+                sample_sheet_name=samplesheet_name,
+                sample_sheet_content=samplesheet_content_json,
+                sample_sheet_content_original=samplesheet_content_str,  # Store original CSV as UTF-8 string
+            )
 
-        try:
-            emit_srssc_api_event(samplesheet_change_eb_payload)
-            logger.info(
-                f"Samplesheet change event emitted for sequence run {sequence_run.sequence_run_id}"
+            comment_obj = Comment.objects.create(
+                target_id=sample_sheet.orcabus_id,
+                target_type=TargetType.SAMPLE_SHEET,
+                comment=comment,
+                created_by=created_by,
             )
-        except Exception as e:
-            logger.error(f"Failed to emit samplesheet change event: {e}")
-            # Continue processing even if event emission fails
-
-        # step 5: check if there is library linking change, if there is any change, create library associations and emit event to event bridge
-        linking_libraries = list(
-            dict.fromkeys(
-                entry["sample_id"]
-                for entry in samplesheet_content_json.get("bclconvert_data", [])
+            logger.info(
+                f"Samplesheet saved for sequence run {sequence_run.sequence_run_id}, and comment {comment_obj.orcabus_id} saved"
             )
-        )
-        if linking_libraries:
-            existing_libraries = LibraryAssociation.objects.filter(
-                sequence=sequence_run
-            ).values_list("library_id", flat=True)
-
-            if not existing_libraries or set(existing_libraries) != set(
-                linking_libraries
-            ):
-                # step 6: create library associations if there is any change
-                if not existing_libraries:
-                    logger.info(
-                        f"No library associations found for sequence run {sequence_run.sequence_run_id}, linked libraries: {linking_libraries}"
-                    )
-                else:
-                    LibraryAssociation.objects.filter(sequence=sequence_run).delete()
-                    logger.info(
-                        f"Library associations deleted for sequence run {sequence_run.sequence_run_id}, linked libraries: {linking_libraries}"
-                    )
 
-                for library_id in linking_libraries:
-                    LibraryAssociation.objects.create(
-                        sequence=sequence_run,
-                        library_id=library_id,
-                        association_date=timezone.now(),  # Use timezone-aware datetime
-                        status=ASSOCIATION_STATUS,
-                    )
+            # step 4: construct event bridge detail and record the samplesheet change event
+            samplesheet_change_eb_payload = construct_samplesheet_change_eb_payload(
+                sequence_run, sample_sheet, comment_obj
+            )
+            try:
+                EventOutbox.objects.add_events(
+                    sequence_run, srssc_api_event_entries(samplesheet_change_eb_payload)
+                )
+                logger.info(
+                    f"Samplesheet change event recorded for sequence run {sequence_run.sequence_run_id}"
+                )
+            except EventEntryTooLargeError as e:
+                logger.error(f"Failed to record samplesheet change event: {e}")
+                # Continue processing even if the event can not be sent
+
+            # step 5: link the libraries of the samplesheet to the new (ghost) sequence run, which has none yet
+            linking_libraries = list(
+                dict.fromkeys(
+                    entry["sample_id"]
+                    for entry in samplesheet_content_json.get("bclconvert_data", [])
+                )
+            )
+            if linking_libraries:
+                # step 6: link the libraries, all of them are added
+                added, removed = LibraryAssociation.objects.link_libraries(
+                    sequence_run, linking_libraries, existing_library_ids=[]
+                )
                 logger.info(
-                    f"Library associations created for sequence run {sequence_run.sequence_run_id}, linked libraries: {linking_libraries}"
+                    f"Library associations created for sequence run {sequence_run.sequence_run_id}, added libraries: {sorted(added)}"
                 )
 
-                # step 7: emit library linking change event to event bridge
+                # step 7: record library linking change event, with the added (and no removed) libraries
                 library_linking_change_eb_payload = (
                     construct_library_linking_change_eb_payload(
-                        sequence_run, linking_libraries
+                        sequence_run, linking_libraries, added, removed
                     )
                 )
                 try:
-                    emit_srllc_api_event(library_linking_change_eb_payload)
+                    EventOutbox.objects.add_events(
+                        sequence_run,
+                        srllc_api_event_entries(library_linking_change_eb_payload),
+                    )
                     logger.info(
-                        f"Library linking change event emitted for sequence run {sequence_run.sequence_run_id}"
+                        f"Library linking change event recorded for sequence run {sequence_run.sequence_run_id}"
                     )
-                except Exception as e:
-                    logger.error(f"Failed to emit library linking change event: {e}")
-                    # Continue processing even if event emission fails
+                except EventEntryTooLargeError as e:
+                    logger.error(f"Failed to record library linking change event: {e}")
+                    # Continue processing even if the event can not be sent
 
             else:
                 logger.info(
-                    f"Library associations already exist for sequence run {sequence_run.sequence_run_id}, linked libraries: {linking_libraries}"
+                    f"No library linking found in samplesheet for sequence run {sequence_run.sequence_run_id}"
                 )
 
-        else:
-            logger.info(
-                f"No library linking found in samplesheet for sequence run {sequence_run.sequence_run_id}"
-            )
-
         return Response(
             {"detail": "Samplesheet added successfully"}, status=status.HTTP_200_OK
         )
@@ -209,15 +191,23 @@ def construct_samplesheet_change_eb_payload(
 
 
 def construct_library_linking_change_eb_payload(
-    sequence_run: Sequence, linked_libraries: list
+    sequence_run: Sequence,
+    linked_libraries: list,
+    added_libraries: set = None,
+    removed_libraries: set = None,
 ) -> dict:
     """
-    Construct event bridge detail for library linking change based on the sequence run and linked libraries
+    Construct event bridge detail for library linking change based on the sequence run and linked libraries,
+    and the libraries added and removed by the change if known
     """
-    return {
+    payload = {
         "eventType": "SequenceRunLibraryLinkingChange",
         "instrumentRunId": sequence_run.instrument_run_id,
         "sequenceRunId": sequence_run.sequence_run_id,
         "timeStamp": timezone.now(),
         "linkedLibraries": linked_libraries,
     }
+    if added_libraries is not None and removed_libraries is not None:
+        payload["addedLibraries"] = sorted(added_libraries)
+        payload["removedLibraries"] = sorted(removed_libraries)
+    return payload
@@ -5,8 +5,8 @@ from rest_framework.response import Response
 from rest_framework.viewsets import GenericViewSet
 
 from sequence_run_manager.viewsets.utils import (
+    filtered_instrument_run_groups_queryset,
     filtered_sequence_runs_queryset,
-    instrument_run_groups_queryset,
 )
 from sequence_run_manager.serializers.sequence_run import (
     SequenceRunCountByStatusSerializer,
@@ -79,10 +79,9 @@ class SequenceStatsViewSet(GenericViewSet):
             request.query_params,
             apply_sequence_status_param=False,
         )
-        grouped = instrument_run_groups_queryset(sequence_set)
-        status_filter = request.query_params.get("status", "").strip()
-        if status_filter:
-            grouped = grouped.filter(group_status=status_filter)
+        grouped = filtered_instrument_run_groups_queryset(
+            request.query_params, sequence_set
+        )
 
         counts = {
             "all": grouped.count(),
@@ -97,8 +96,11 @@ class SequenceStatsViewSet(GenericViewSet):
         # Count distinct instrument runs per group_status. Without ``distinct=True``, a second
         # ``values().annotate`` can join ``Sequence`` again and count one row per *sequence*,
         # inflating e.g. SUCCEEDED when one instrument run has several sequence rows.
-        per_status = grouped.values("group_status").annotate(
-            count=models.Count("instrument_run_id", distinct=True)
+        # The ordering is cleared, an ordering on a column (of the summary table) would be grouped by.
+        per_status = (
+            grouped.order_by()
+            .values("group_status")
+            .annotate(count=models.Count("instrument_run_id", distinct=True))
         )
         for item in per_status:
             if item["group_status"] is not None:
@@ -1,5 +1,4 @@
 import logging
-from functools import partial
 
 from drf_spectacular.utils import extend_schema, extend_schema_view
 from drf_spectacular.types import OpenApiTypes
@@ -9,8 +8,8 @@ from rest_framework.response import Response
 from rest_framework.decorators import action
 from django.db import DatabaseError, transaction
 from django.utils import timezone
-from sequence_run_manager.aws_event_bridge.event_srv import emit_srsc_api_event
-from sequence_run_manager.models import State, Sequence
+from sequence_run_manager.aws_event_bridge.event_srv import srsc_api_event_entry
+from sequence_run_manager.models import State, Sequence, EventOutbox
 from sequence_run_manager.serializers.state import (
     StateSerializer,
     StateCreateRequestSerializer,
@@ -127,36 +126,23 @@ class StateTransitionMixin:
 
         return instance, srsc_event
 
-    def publish_srsc_after_commit(
+    def add_srsc_to_outbox(
         self,
         *,
+        sequence: Sequence,
         srsc_event: dict,
-        sequence_id: str,
         state_id: str,
         request_status: str,
     ) -> None:
-        """Publish a committed transition, logging enough context for recovery."""
-        try:
-            emit_srsc_api_event(srsc_event)
-        except Exception:
-            # Publication is best-effort until a transactional outbox is added.
-            # Keep this message queryable so CloudWatch can alarm on it and the
-            # event can be reconstructed from sequence_id/state_id.
-            logger.exception(
-                "Manual SRSC publication failed after database commit: "
-                "sequence_id=%s state_id=%s event_id=%s status=%s "
-                "recoverable=true",
-                sequence_id,
-                state_id,
-                srsc_event.get("id"),
-                request_status,
-            )
-            return
-
+        """
+        Record the SRSC event of a transition in the event outbox, to be called within the transaction of
+        the transition so that the event is published (by the outbox relay) if and only if it is committed.
+        """
+        EventOutbox.objects.add_events(sequence, [srsc_api_event_entry(srsc_event)])
         logger.info(
-            "Manual SRSC event emitted after database commit: "
+            "Manual SRSC event recorded in the event outbox: "
             "sequence_id=%s state_id=%s event_id=%s status=%s",
-            sequence_id,
+            sequence.orcabus_id,
             state_id,
             srsc_event.get("id"),
             request_status,
@@ -279,15 +265,11 @@ class StateViewSet(
                     request_status,
                     request_comment,
                 )
-                transaction.on_commit(
-                    partial(
-                        self.publish_srsc_after_commit,
-                        srsc_event=srsc_event,
-                        sequence_id=str(sequence.orcabus_id),
-                        state_id=str(instance.orcabus_id),
-                        request_status=request_status,
-                    ),
-                    robust=True,
+                self.add_srsc_to_outbox(
+                    sequence=sequence,
+                    srsc_event=srsc_event,
+                    state_id=str(instance.orcabus_id),
+                    request_status=request_status,
                 )
         except InvalidStateTransition as exc:
             return Response(
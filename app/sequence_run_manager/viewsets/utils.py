@@ -9,13 +9,19 @@ from datetime import datetime
 from typing import Any, Optional
 
 import jwt
-from django.db.models import Count, Max, Min, OuterRef, Q, QuerySet, Subquery
+from django.db.models import Q, QuerySet
 from django.utils.dateparse import parse_datetime
 from rest_framework.exceptions import AuthenticationFailed, ValidationError
 from rest_framework.settings import api_settings
 
 from sequence_run_manager.pagination import PaginationConstant
-from sequence_run_manager.models import Sequence, SequenceStatus, LibraryAssociation
+from sequence_run_manager.models import (
+    InstrumentRun,
+    Sequence,
+    SequenceStatus,
+    LibraryAssociation,
+)
+from sequence_run_manager.models.instrument_run import instrument_run_groups_queryset
 
 logger = logging.getLogger(__name__)
 
@@ -199,30 +205,58 @@ def filtered_sequence_runs_queryset(
     return qs
 
 
-def instrument_run_groups_queryset(sequence_set: QuerySet) -> QuerySet:
+# Query params of the grouped list / instrument-run stats the InstrumentRun summary can answer: none of
+# them restricts which sequence runs of an instrument run are aggregated.
+INSTRUMENT_RUN_SUMMARY_QUERY_PARAMS = frozenset(
+    {
+        "instrument_run_id",
+        "status",
+        api_settings.ORDERING_PARAM,
+        PaginationConstant.PAGE,
+        PaginationConstant.ROWS_PER_PAGE,
+        "sortCol",
+        "sortAsc",
+    }
+)
+
+
+def _instrument_run_summary_groups_queryset(query_params) -> Optional[QuerySet]:
     """
-    One row per non-empty ``instrument_run_id`` in ``sequence_set``, with the same aggregates as
-    ``list_by_instrument_run_id`` plus ``group_status``: ``status`` of the row with latest
-    ``start_time`` (ties broken by ``orcabus_id`` desc), among rows with non-null ``status``.
+    Rows of ``instrument_run_groups_queryset`` read from the ``InstrumentRun`` summary table, with the
+    ``instrument_run_id`` keyword filter applied, if the query params are limited to
+    ``INSTRUMENT_RUN_SUMMARY_QUERY_PARAMS`` (blank ones are ignored); None otherwise.
     """
-    latest_status_sq = Subquery(
-        sequence_set.filter(
-            instrument_run_id=OuterRef("instrument_run_id"),
-            status__isnull=False,
-        )
-        .order_by("-start_time", "-orcabus_id")
-        .values("status")[:1]
-    )
-    return (
-        sequence_set.filter(instrument_run_id__isnull=False)
-        .exclude(instrument_run_id="")
-        .values("instrument_run_id")
-        .annotate(
-            # Distinct sequence rows (avoids duplicate joins); matches rows in ``items``.
-            count=Count("orcabus_id", distinct=True),
-            start_time=Min("start_time"),
-            end_time=Max("end_time"),
-            group_status=latest_status_sq,
+    for k in query_params:
+        if k in INSTRUMENT_RUN_SUMMARY_QUERY_PARAMS:
+            continue
+        if any(str(v).strip() for v in query_params.getlist(k)):
+            return None
+
+    groups = InstrumentRun.objects.groups()
+    keyword_params = build_keyword_params(query_params)
+    if "instrument_run_id" in keyword_params:
+        groups = InstrumentRun.objects.get_model_fields_query(
+            groups, instrument_run_id=keyword_params["instrument_run_id"]
         )
-        .order_by("-start_time")
-    )
+    return groups
+
+
+def filtered_instrument_run_groups_queryset(
+    query_params, sequence_set: QuerySet
+) -> QuerySet:
+    """
+    Instrument-run groups of ``list_by_instrument_run_id`` / instrument-run stats (see
+    ``instrument_run_groups_queryset``), ``status`` filtering the **group** status.
+
+    Unfiltered, or filtered by ``instrument_run_id`` / ``status`` only, the groups are read from the
+    ``InstrumentRun`` summary table; otherwise they are aggregated from ``sequence_set``, the
+    ``filtered_sequence_runs_queryset`` of the query params (with ``apply_sequence_status_param=False``).
+    """
+    groups = _instrument_run_summary_groups_queryset(query_params)
+    if groups is None:
+        groups = instrument_run_groups_queryset(sequence_set)
+
+    status_filter = (query_params.get("status") or "").strip()
+    if status_filter:
+        groups = groups.filter(group_status=status_filter)
+    return groups
@@ -15,6 +15,21 @@ class SequenceRunLibraryLinkingChange(BaseModel):
     sequenceRunId: str
     timeStamp: datetime
     linkedLibraries: List[str]
+    addedLibraries: Optional[List[str]] = Field(
+        None,
+        description="Libraries linked by this change, computed against the previous linking. Optional.",
+    )
+    removedLibraries: Optional[List[str]] = Field(
+        None,
+        description="Libraries unlinked by this change, computed against the previous linking. Optional.",
+    )
+    chunkIndex: Optional[int] = Field(
+        None,
+        description="Number (1-based) of this chunk, when the event is too large for EventBridge and is split into chunks each carrying a slice of the library lists. Optional.",
+    )
+    chunkCount: Optional[int] = Field(
+        None, description="Total number of chunks the event is split into. Optional."
+    )
 
 
 class AWSEvent(BaseModel):
@@ -0,0 +1,43 @@
+# generated by datamodel-codegen:
+#   filename:  SequenceRunLibraryLinkingDelta.schema.json
+#   timestamp: 2026-10-17T01:25:41+00:00
+
+from __future__ import annotations
+
+from datetime import datetime
+from typing import List, Optional
+
+from pydantic import BaseModel, Field
+
+
+class SequenceRunLibraryLinkingDelta(BaseModel):
+    instrumentRunId: str
+    sequenceRunId: str
+    timeStamp: datetime
+    addedLibraries: List[str] = Field(
+        ...,
+        description="Libraries linked by this change, computed against the previous linking.",
+    )
+    removedLibraries: List[str] = Field(
+        ...,
+        description="Libraries unlinked by this change, computed against the previous linking.",
+    )
+    chunkIndex: Optional[int] = Field(
+        None,
+        description="Number (1-based) of this chunk, when the event is too large for EventBridge and is split into chunks each carrying a slice of the library lists. Optional.",
+    )
+    chunkCount: Optional[int] = Field(
+        None, description="Total number of chunks the event is split into. Optional."
+    )
+
+
+class AWSEvent(BaseModel):
+    id: Optional[str] = None
+    region: Optional[str] = None
+    resources: Optional[List[str]] = None
+    source: str
+    time: Optional[datetime] = None
+    version: Optional[str] = None
+    account: Optional[str] = None
+    detail_type: str = Field(..., alias="detail_type")
+    detail: SequenceRunLibraryLinkingDelta
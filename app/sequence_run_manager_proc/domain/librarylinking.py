@@ -1,10 +1,24 @@
 import logging
-from dataclasses import dataclass
+from dataclasses import dataclass, replace
 from datetime import datetime
+from typing import Callable, Optional
+
+from pydantic import BaseModel
+
 from sequence_run_manager_proc.domain.events.srllc import (
     SequenceRunLibraryLinkingChange,
     AWSEvent,
 )
+from sequence_run_manager_proc.domain.events.srlld import (
+    SequenceRunLibraryLinkingDelta,
+    AWSEvent as DeltaAWSEvent,
+)
+from sequence_run_manager_proc.domain.putevents import (
+    MAX_PUT_EVENTS_ENTRY_SIZE,
+    chunk_slice,
+    put_events_entry_size,
+    split_put_events_entry,
+)
 from django.utils import timezone
 
 logger = logging.getLogger(__name__)
@@ -22,6 +36,14 @@ class LibraryLinkingDomain:
     # flag to indicate if library linking changed
     library_linking_has_changed: bool = False
 
+    # libraries added and removed against the previous linking, None if not computed
+    added_libraries: Optional[list[str]] = None
+    removed_libraries: Optional[list[str]] = None
+
+    # set on the chunk events of an event too large to be emitted at once
+    chunk_index: Optional[int] = None
+    chunk_count: Optional[int] = None
+
     @property
     def namespace(self) -> str:
         return self._namespace
@@ -30,12 +52,24 @@ class LibraryLinkingDomain:
     def event_type(self) -> str:
         return SequenceRunLibraryLinkingChange.__name__
 
+    @property
+    def delta_event_type(self) -> str:
+        return SequenceRunLibraryLinkingDelta.__name__
+
+    @property
+    def has_delta(self) -> bool:
+        return self.added_libraries is not None and self.removed_libraries is not None
+
     def to_event(self) -> SequenceRunLibraryLinkingChange:
         return SequenceRunLibraryLinkingChange(
             instrumentRunId=self.instrument_run_id,
             sequenceRunId=self.sequence_run_id,
             timeStamp=self.timestamp,
             linkedLibraries=self.linked_libraries,
+            addedLibraries=self.added_libraries,
+            removedLibraries=self.removed_libraries,
+            chunkIndex=self.chunk_index,
+            chunkCount=self.chunk_count,
         )
 
     def to_event_with_envelope(self) -> AWSEvent:
@@ -45,13 +79,119 @@ class LibraryLinkingDomain:
             detail=self.to_event(),
         )
 
+    def to_delta_event(self) -> SequenceRunLibraryLinkingDelta:
+        return SequenceRunLibraryLinkingDelta(
+            instrumentRunId=self.instrument_run_id,
+            sequenceRunId=self.sequence_run_id,
+            timeStamp=self.timestamp,
+            addedLibraries=self.added_libraries,
+            removedLibraries=self.removed_libraries,
+            chunkIndex=self.chunk_index,
+            chunkCount=self.chunk_count,
+        )
+
+    def to_delta_event_with_envelope(self) -> DeltaAWSEvent:
+        return DeltaAWSEvent(
+            source=self.namespace,
+            detail_type=self.delta_event_type,
+            detail=self.to_delta_event(),
+        )
+
     def to_put_events_request_entry(
         self, event_bus_name: str, trace_header: str = ""
     ) -> dict:
         """Convert Domain event with envelope to Entry dict struct of PutEvent API"""
-        domain_event_with_envelope = self.to_event_with_envelope()
+        return self._put_events_request_entry(
+            self.to_event_with_envelope(), event_bus_name, trace_header
+        )
+
+    def to_delta_put_events_request_entry(
+        self, event_bus_name: str, trace_header: str = ""
+    ) -> dict:
+        """Convert Domain delta event with envelope to Entry dict struct of PutEvent API"""
+        return self._put_events_request_entry(
+            self.to_delta_event_with_envelope(), event_bus_name, trace_header
+        )
+
+    def to_put_events_request_entries(
+        self,
+        event_bus_name: str,
+        trace_header: str = "",
+        max_entry_size: int = MAX_PUT_EVENTS_ENTRY_SIZE,
+    ) -> list[dict]:
+        """
+        PutEvent API entries of the library linking change event, followed by the delta event if
+        known. An event over the EventBridge entry size limit is split into numbered chunk events,
+        each carrying a slice of the library lists.
+        """
+        entries = self._to_sized_entries(
+            lambda domain: domain.to_put_events_request_entry(
+                event_bus_name, trace_header
+            ),
+            max_entry_size,
+        )
+        if self.has_delta:
+            entries += self._to_sized_entries(
+                lambda domain: domain.to_delta_put_events_request_entry(
+                    event_bus_name, trace_header
+                ),
+                max_entry_size,
+            )
+        return entries
+
+    def _to_sized_entries(
+        self, to_entry: Callable[["LibraryLinkingDomain"], dict], max_entry_size: int
+    ) -> list[dict]:
+        entry = to_entry(self)
+        if put_events_entry_size(entry) <= max_entry_size:
+            return [entry]
+
+        def to_chunk_entry(chunk_index: int, chunk_count: int) -> dict:
+            return to_entry(
+                replace(
+                    self,
+                    linked_libraries=chunk_slice(
+                        self.linked_libraries, chunk_index, chunk_count
+                    ),
+                    added_libraries=(
+                        chunk_slice(self.added_libraries, chunk_index, chunk_count)
+                        if self.added_libraries is not None
+                        else None
+                    ),
+                    removed_libraries=(
+                        chunk_slice(self.removed_libraries, chunk_index, chunk_count)
+                        if self.removed_libraries is not None
+                        else None
+                    ),
+                    chunk_index=chunk_index + 1,
+                    chunk_count=chunk_count,
+                )
+            )
+
+        entries = split_put_events_entry(
+            to_chunk_entry,
+            max_chunk_count=max(
+                len(self.linked_libraries),
+                len(self.added_libraries or []),
+                len(self.removed_libraries or []),
+            ),
+            max_entry_size=max_entry_size,
+        )
+        logger.warning(
+            f"{entry['DetailType']} event of sequence run {self.sequence_run_id} is over "
+            f"{max_entry_size} bytes, split into {len(entries)} chunk events"
+        )
+        return entries
+
+    @staticmethod
+    def _put_events_request_entry(
+        domain_event_with_envelope: BaseModel, event_bus_name: str, trace_header: str
+    ) -> dict:
         entry = {
-            "Detail": domain_event_with_envelope.detail.model_dump_json(),
+            # optional fields not computed are left out rather than sent as null
+            "Detail": domain_event_with_envelope.detail.model_dump_json(
+                exclude_none=True
+            ),
             "DetailType": domain_event_with_envelope.detail_type,
             "Resources": [],
             "Source": domain_event_with_envelope.source,
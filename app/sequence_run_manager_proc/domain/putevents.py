@@ -0,0 +1,93 @@
+import logging
+import math
+from typing import Callable, Iterator, TypeVar
+
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.INFO)
+
+# https://docs.aws.amazon.com/eventbridge/latest/userguide/eb-putevent-size.html
+MAX_PUT_EVENTS_ENTRY_SIZE = 256 * 1024  # also the limit of a whole PutEvents request
+MAX_PUT_EVENTS_BATCH_SIZE = 10
+
+T = TypeVar("T")
+
+
+class EventEntryTooLargeError(ValueError):
+    pass
+
+
+def put_events_entry_size(entry: dict) -> int:
+    """
+    Size of a PutEvents request entry as counted by EventBridge against the entry size limit.
+    """
+    size = 0
+    if entry.get("Time") is not None:
+        size += 14
+    for key in ("Source", "DetailType", "Detail"):
+        if entry.get(key):
+            size += len(entry[key].encode("utf-8"))
+    for resource in entry.get("Resources") or []:
+        size += len(resource.encode("utf-8"))
+    return size
+
+
+def chunk_slice(items: list[T], chunk_index: int, chunk_count: int) -> list[T]:
+    """The chunk_index-th (0-based) of chunk_count contiguous, evenly sized slices of items"""
+    start = len(items) * chunk_index // chunk_count
+    end = len(items) * (chunk_index + 1) // chunk_count
+    return items[start:end]
+
+
+def split_put_events_entry(
+    build_chunk_entry: Callable[[int, int], dict],
+    max_chunk_count: int,
+    max_entry_size: int = MAX_PUT_EVENTS_ENTRY_SIZE,
+) -> list[dict]:
+    """
+    Split an oversized event into the fewest chunk entries that each fit within max_entry_size.
+
+    `build_chunk_entry(chunk_index, chunk_count)` builds the entry of a chunk (0-based index), and
+    `max_chunk_count` is the number of chunks beyond which the event can not be split any further
+    (e.g. one item per chunk).
+    """
+    chunk_count = 2
+    while chunk_count <= max_chunk_count:
+        entries = [build_chunk_entry(i, chunk_count) for i in range(chunk_count)]
+        largest_entry_size = max(put_events_entry_size(entry) for entry in entries)
+        if largest_entry_size <= max_entry_size:
+            return entries
+
+        # scale up by how far the largest chunk is over the limit
+        next_chunk_count = max(
+            chunk_count + 1,
+            math.ceil(chunk_count * largest_entry_size / max_entry_size),
+        )
+        if chunk_count < max_chunk_count < next_chunk_count:
+            next_chunk_count = max_chunk_count
+        chunk_count = next_chunk_count
+
+    raise EventEntryTooLargeError(
+        f"Event can not be split into entries of at most {max_entry_size} bytes"
+    )
+
+
+def batch_put_events_entries(
+    entries: list[dict],
+    max_batch_size: int = MAX_PUT_EVENTS_BATCH_SIZE,
+    max_request_size: int = MAX_PUT_EVENTS_ENTRY_SIZE,
+) -> Iterator[list[dict]]:
+    """
+    Group entries, in order, into PutEvents requests within the entry count and total size limits.
+    """
+    batch, batch_size = [], 0
+    for entry in entries:
+        entry_size = put_events_entry_size(entry)
+        if batch and (
+            len(batch) >= max_batch_size or batch_size + entry_size > max_request_size
+        ):
+            yield batch
+            batch, batch_size = [], 0
+        batch.append(entry)
+        batch_size += entry_size
+    if batch:
+        yield batch
@@ -1,7 +1,7 @@
 import os
 import json
 import logging
-from dataclasses import dataclass
+from dataclasses import dataclass, replace
 from typing import Optional
 import hashlib
 
@@ -10,6 +10,11 @@ from sequence_run_manager_proc.domain.events.srssc import (
     SequenceRunSampleSheetChange,
     AWSEvent,
 )
+from sequence_run_manager_proc.domain.putevents import (
+    MAX_PUT_EVENTS_ENTRY_SIZE,
+    EventEntryTooLargeError,
+    put_events_entry_size,
+)
 from sequence_run_manager.settings.base import API_VERSION
 
 logger = logging.getLogger(__name__)
@@ -82,8 +87,12 @@ class SampleSheetDomain:
         sequenceRunManagerBaseApiUrl = os.environ["SEQUENCE_RUN_MANAGER_BASE_API_URL"]
         api_base = f"/api/{API_VERSION}/"
         api_url = f"{sequenceRunManagerBaseApiUrl}{api_base}sample_sheet/{self.sample_sheet.orcabus_id}/"
-        checksum = self._generate_sample_sheet_checksum(
-            self.sample_sheet.sample_sheet_content_original
+        # use the checksum stored at write time, falling back for unsaved instances
+        checksum = (
+            self.sample_sheet.checksum_sha256
+            or self._generate_sample_sheet_checksum(
+                self.sample_sheet.sample_sheet_content_original
+            )
         )
         return SequenceRunSampleSheetChange(
             instrumentRunId=self.instrument_run_id,
@@ -118,3 +127,31 @@ class SampleSheetDomain:
         if trace_header:
             entry.update(TraceHeader=trace_header)
         return entry
+
+    def to_put_events_request_entries(
+        self,
+        event_bus_name: str,
+        trace_header: str = "",
+        max_entry_size: int = MAX_PUT_EVENTS_ENTRY_SIZE,
+    ) -> list[dict]:
+        """
+        PutEvent API entries of the sample sheet change event. The free text description is the only
+        unbounded field; an event over the EventBridge entry size limit is emitted as a compact pointer
+        event without it, the sample sheet being referenced by `apiUrl`.
+        """
+        entry = self.to_put_events_request_entry(event_bus_name, trace_header)
+        if put_events_entry_size(entry) <= max_entry_size:
+            return [entry]
+
+        pointer_entry = replace(self, description=None).to_put_events_request_entry(
+            event_bus_name, trace_header
+        )
+        if put_events_entry_size(pointer_entry) > max_entry_size:
+            raise EventEntryTooLargeError(
+                f"{self.event_type} event of sequence run {self.sequence_run_id} is over {max_entry_size} bytes"
+            )
+        logger.warning(
+            f"{self.event_type} event of sequence run {self.sequence_run_id} is over {max_entry_size} bytes, "
+            f"emitting a pointer event without description"
+        )
+        return [pointer_entry]
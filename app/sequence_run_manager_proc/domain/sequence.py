@@ -1,6 +1,10 @@
 import json
 import logging
+import os
+import threading
+import time
 from dataclasses import dataclass
+from typing import Callable, List, Optional
 
 from libumccr import libjson
 from libumccr.aws import libssm
@@ -17,6 +21,9 @@ logger.setLevel(logging.INFO)
 
 ICA_WORKFLOW_PREFIX = "/iap/workflow"  # FIXME update this
 
+# how long the emergency stop list is used before being read again from SSM
+DEFAULT_EMERGENCY_STOP_LIST_TTL_SECONDS = 30
+
 
 @dataclass
 class SequenceDomain:
@@ -32,6 +39,9 @@ class SequenceDomain:
         False  # reference to Sequence model (STARTED, SUCCEEDED, FAILED, ABORTED)
     )
 
+    # flag to indicate if this sequence run has been created by the event
+    is_new_sequence: bool = False
+
     # flag to indicate if this sequence run is a reconversion (detected via BSSH event and SampleSheet update)
     is_reconversion: bool = False
 
@@ -103,10 +113,95 @@ class SequenceRuleError(ValueError):
     pass
 
 
+class EmergencyStopList:
+    """
+    In-process, TTL-bounded cache of the emergency stop list SSM parameter, shared across warm Lambda
+    invocations so that a burst of BSSH events does not hit (and get throttled by) SSM on each event.
+
+    Once expired, the parameter is read again along with its version; the list is only parsed again when
+    the version has changed. If SSM cannot be read, the last known list keeps being used (an empty list if
+    it was never read) until the next refresh.
+    """
+
+    def __init__(
+        self,
+        parameter_name: str,
+        ttl_seconds: float = DEFAULT_EMERGENCY_STOP_LIST_TTL_SECONDS,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.parameter_name = parameter_name
+        self.ttl_seconds = ttl_seconds
+        self._clock = clock
+        self._instrument_run_ids: List[str] = []
+        self._version: Optional[int] = None
+        self._expires_at: Optional[float] = None
+        self._lock = threading.Lock()
+
+    def _is_fresh(self) -> bool:
+        return self._expires_at is not None and self._expires_at > self._clock()
+
+    def get(self) -> List[str]:
+        if self._is_fresh():
+            return self._instrument_run_ids
+
+        with self._lock:
+            # refreshed by another thread while waiting for the lock
+            if self._is_fresh():
+                return self._instrument_run_ids
+
+            try:
+                # not through libssm.get_ssm_param, which caches the value for the process lifetime
+                parameter = libssm.ssm_client().get_parameter(Name=self.parameter_name)[
+                    "Parameter"
+                ]
+                version = parameter.get("Version")
+                if self._version is None or version != self._version:
+                    self._instrument_run_ids = libjson.loads(parameter["Value"])
+                    self._version = version
+                    logger.info(
+                        f"Loaded emergency_stop_list version {version}: {self._instrument_run_ids}"
+                    )
+            except Exception as e:
+                # If any exception found, log warning and proceed with the last known list
+                logger.warning(
+                    f"Cannot read emergency_stop_list from SSM param. Exception: {e}"
+                )
+
+            self._expires_at = self._clock() + self.ttl_seconds
+            return self._instrument_run_ids
+
+    def clear(self):
+        with self._lock:
+            self._instrument_run_ids = []
+            self._version = None
+            self._expires_at = None
+
+
+emergency_stop_list = EmergencyStopList(
+    parameter_name=f"{ICA_WORKFLOW_PREFIX}/emergency_stop_list",
+    ttl_seconds=float(
+        os.environ.get(
+            "EMERGENCY_STOP_LIST_TTL_SECONDS", DEFAULT_EMERGENCY_STOP_LIST_TTL_SECONDS
+        )
+    ),
+)
+
+
 class SequenceRule:
     def __init__(self, sequence: Sequence):
         self._sequence = sequence
 
+    @staticmethod
+    def instrument_run_must_not_emergency_stop(instrument_run_id: str):
+        """
+        Same as `must_not_emergency_stop`, given the instrument run id only, so that it can be checked
+        before the sequence run is loaded or created.
+        """
+        if instrument_run_id in emergency_stop_list.get():
+            raise SequenceRuleError(
+                f"Sequence {instrument_run_id} is marked for emergency stop."
+            )
+
     def must_not_emergency_stop(self):
         """
         emergency_stop_list - is simple registry list that
@@ -127,22 +222,9 @@ class SequenceRule:
               --value "[\"200612_A01052_0017_BH5LYWDSXY\"]" \
               --overwrite \
               --profile dev
-        """
-        try:
-            emergency_stop_list_json = libssm.get_ssm_param(
-                f"{ICA_WORKFLOW_PREFIX}/emergency_stop_list"
-            )
-            emergency_stop_list = libjson.loads(emergency_stop_list_json)
-        except Exception as e:
-            # If any exception found, log warning and proceed
-            logger.warning(
-                f"Cannot read emergency_stop_list from SSM param. Exception: {e}"
-            )
-            emergency_stop_list = []
-
-        if self._sequence.instrument_run_id in emergency_stop_list:
-            raise SequenceRuleError(
-                f"Sequence {self._sequence.instrument_run_id} is marked for emergency stop."
-            )
 
+        The list is cached in-process for EMERGENCY_STOP_LIST_TTL_SECONDS (see `EmergencyStopList`), so an
+        update takes up to that long to apply.
+        """
+        self.instrument_run_must_not_emergency_stop(self._sequence.instrument_run_id)
         return self
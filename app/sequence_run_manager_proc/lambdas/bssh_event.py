@@ -8,6 +8,9 @@ django.setup()
 
 import logging
 from typing import Optional
+
+from django.db import transaction
+
 from sequence_run_manager_proc.domain.sequence import (
     SequenceDomain,
     SequenceRule,
@@ -19,13 +22,14 @@ from sequence_run_manager_proc.domain.librarylinking import LibraryLinkingDomain
 
 from sequence_run_manager_proc.services import (
     sequence_srv,
-    sequence_state_srv,
     sequence_library_srv,
     sample_sheet_srv,
 )
+from sequence_run_manager_proc.services.sequence_run_context import SequenceRunContext
+from sequence_run_manager.aws_event_bridge import outbox_srv
+from sequence_run_manager.models.event_outbox import EventOutbox
 
 from libumccr import libjson
-from libumccr.aws import libeb
 
 logger = logging.getLogger()
 logger.setLevel(logging.INFO)
@@ -80,7 +84,10 @@ def event_handler(event, context):
             - we parse these `ica-event` payload, transform and persist them into our internal OrcaBus SRM `Sequence` entity model
             - after persisted into database, we again transform into our internal `SequenceRunStateChange` domain event
             - this domain event schema is what we consented and published in our EventBus event schema registry
-            - we then dispatch our domain events into the channel in batching manner for efficiency
+            - the domain events are recorded in the event outbox, in the same transaction as the database changes
+            - BSSH API calls are made in between these transactions, so the sequence run is never locked during one
+            - we then dispatch our domain events into the channel in batching manner for efficiency,
+              all events of one BSSH event in a single PutEvents request
         - challenge:
             - upstream ICA ENS may deliver multiple duplicated `bssh.runs` events of the same `statuschanged`
             - at upstream end, their service guarantee that -- at-least-once delivery -- distributed computing semantic
@@ -102,40 +109,118 @@ def event_handler(event, context):
     # Extract relevant fields from the event payload
     event_details = event.get("detail", {}).get("ica-event", {})
 
-    srsc_entry = None
-    srssc_entry = None
-    srllc_entry = None
+    # check if the sequence run is in emergency stop list, if so, abort the pipeline before any database
+    # write or BSSH API call
+    try:
+        if event_details.get("instrumentRunId"):
+            SequenceRule.instrument_run_must_not_emergency_stop(
+                event_details["instrumentRunId"]
+            )
+    except SequenceRuleError as se:
+        return emergency_stop_response(se)
+
+    # The sequence run is locked only for the short transactions recording the event and its changes, BSSH
+    # API calls (run details, run files and sample sheets) are made in between, with no transaction open
+    with transaction.atomic():
+        # Create or update Sequence record and record its SequenceRunState from BSSH Run event payload
+        sequence_domain: SequenceDomain = (
+            sequence_srv.create_or_update_sequence_from_bssh_event(event_details)
+        )
+
+        # events of the early stages of a run may not carry the instrument run id, check the recorded one
+        try:
+            SequenceRule(sequence_domain.sequence).must_not_emergency_stop()
+        except SequenceRuleError as se:
+            return emergency_stop_response(se)
+
+        # Collect the domain events of this BSSH event, in order, and record them in the outbox within the
+        # same transaction as the changes they describe
+        event_entries = []
+
+        # Detect SequenceRunStatusChange
+        if sequence_domain.status_has_changed:
+            event_entries.append(
+                sequence_domain.to_put_events_request_entry(
+                    event_bus_name=event_bus_name,
+                )
+            )
+            EventOutbox.objects.add_events(sequence_domain.sequence, event_entries)
 
-    # Create or update Sequence record from BSSH Run event payload
-    sequence_domain: SequenceDomain = (
-        sequence_srv.create_or_update_sequence_from_bssh_event(event_details)
+    # unit of work of this event: the sequence run, its sample sheets and linked libraries are
+    # loaded at most once and the writes are flushed together at the end
+    ctx = SequenceRunContext(
+        sequence_domain.sequence,
+        run_details_recorded=not sequence_domain.is_new_sequence,
+    )
+    if sequence_domain.status_has_changed:
+        sequence_srv.enrich_sequence_with_run_details(ctx)
+    sample_sheet_domain, library_linking_domain = (
+        check_sample_sheet_and_libraries_linking(event_details, sequence_domain, ctx)
     )
 
-    # check if the sequence run is in emergency stop list, if so, abort the pipeline
-    try:
-        SequenceRule(sequence_domain.sequence).must_not_emergency_stop()
-    except SequenceRuleError as se:
-        # FIXME emit custom event for this? something to tackle later. log & skip for now
-        resp_msg = {
-            "message": f"Aborted pipeline due to Emergency Stop: {se}",
-        }
-        logger.warning(libjson.dumps(resp_msg))
-        return resp_msg
+    with transaction.atomic():
+        ctx.flush()
 
-    # Create SequenceRunState record from BSSH Run event payload
-    if sequence_domain.state_has_changed:
-        sequence_state_srv.create_sequence_state_from_bssh_event(event_details)
+        change_entries = []
 
+        # Detect SequenceRunSampleSheetChange
+        if sample_sheet_domain and sample_sheet_domain.sample_sheet_has_changed:
+            change_entries.extend(
+                sample_sheet_domain.to_put_events_request_entries(
+                    event_bus_name=event_bus_name,
+                )
+            )
+
+        # Detect SequenceRunLibraryLinkingChange, along with its delta variant for consumers only
+        # interested in the added and removed libraries
+        if (
+            library_linking_domain
+            and library_linking_domain.library_linking_has_changed
+        ):
+            change_entries.extend(
+                library_linking_domain.to_put_events_request_entries(
+                    event_bus_name=event_bus_name,
+                )
+            )
+
+        if change_entries:
+            EventOutbox.objects.add_events(sequence_domain.sequence, change_entries)
+            event_entries.extend(change_entries)
+
+    if event_entries:
+        # publish straight away, in a single PutEvents request for up to 10 entries; the events left
+        # pending (e.g. rejected by EventBridge) are published by the scheduled outbox relay
+        relay_result = outbox_srv.relay_outbox_events(sequence=sequence_domain.sequence)
+        logger.info(
+            f"Relayed {[entry['DetailType'] for entry in event_entries]} events: {relay_result}"
+        )
+
+    resp_msg = {
+        "message": f"BSSH ENS event processing complete",
+    }
+    logger.info(libjson.dumps(resp_msg))
+    return resp_msg
+
+
+def check_sample_sheet_and_libraries_linking(
+    event_details: dict, sequence_domain: SequenceDomain, ctx: SequenceRunContext
+) -> tuple[Optional[SampleSheetDomain], Optional[LibraryLinkingDomain]]:
+    """
+    Sample sheet and library linking changes of the event, buffered in ctx (not flushed here)
+    """
     sample_sheet_domain: Optional[SampleSheetDomain] = None
     library_linking_domain: Optional[LibraryLinkingDomain] = None
 
     # Check or create sequence run libraries linking and sample sheet when we get new event
     if sequence_domain.state_has_changed and sequence_domain.sample_sheet_ready:
         sample_sheet_domain = (
-            sample_sheet_srv.create_sequence_sample_sheet_from_bssh_event(event_details)
+            sample_sheet_srv.create_sequence_sample_sheet_from_bssh_event(
+                event_details, ctx
+            )
         )
         library_linking_domain = sequence_library_srv.check_sequence_run_libraries_linking_from_bssh_event(
             event_details,
+            ctx,
             force_check=(
                 sample_sheet_domain is not None
             ),  # if sample sheet domain is not None, we will always check the libraries linking
@@ -150,50 +235,33 @@ def event_handler(event, context):
             )
             sample_sheet_domain = (
                 sample_sheet_srv.check_sequence_sample_sheet_from_bssh_event(
-                    event_details
+                    event_details, ctx
                 )
             )
             library_linking_domain = sequence_library_srv.check_sequence_run_libraries_linking_from_bssh_event(
-                event_details, force_check=(sample_sheet_domain is not None)
+                event_details, ctx, force_check=(sample_sheet_domain is not None)
             )
 
     # Check or create sequence run libraries linking and sample sheet for reconversion
     if sequence_domain.is_reconversion:
         sample_sheet_domain = (
-            sample_sheet_srv.check_sequence_sample_sheet_from_bssh_event(event_details)
+            sample_sheet_srv.check_sequence_sample_sheet_from_bssh_event(
+                event_details, ctx
+            )
         )
         library_linking_domain = (
             sequence_library_srv.check_sequence_run_libraries_linking_from_bssh_event(
-                event_details, force_check=(sample_sheet_domain is not None)
+                event_details, ctx, force_check=(sample_sheet_domain is not None)
             )
         )
 
-    # Detect SequenceRunStatusChange and emit event
-    if sequence_domain and sequence_domain.status_has_changed:
-        srsc_entry = sequence_domain.to_put_events_request_entry(
-            event_bus_name=event_bus_name,
-        )
-        libeb.emit_event(srsc_entry)
-        logger.info(f"Emitted SequenceRunStateChange event: {srsc_entry}")
-
-    # Detect SequenceRunSampleSheetChange and emit event
-    if sample_sheet_domain and sample_sheet_domain.sample_sheet_has_changed:
-        srssc_entry = sample_sheet_domain.to_put_events_request_entry(
-            event_bus_name=event_bus_name,
-        )
-        libeb.emit_event(srssc_entry)
-        logger.info(f"Emitted SequenceRunSampleSheetChange event: {srssc_entry}")
+    return sample_sheet_domain, library_linking_domain
 
-    # Detect SequenceRunLibraryLinkingChange and emit event
-    if library_linking_domain and library_linking_domain.library_linking_has_changed:
-        srllc_entry = library_linking_domain.to_put_events_request_entry(
-            event_bus_name=event_bus_name,
-        )
-        libeb.emit_event(srllc_entry)
-        logger.info(f"Emitted SequenceRunLibraryLinkingChange event: {srllc_entry}")
 
+def emergency_stop_response(se: SequenceRuleError) -> dict:
+    # FIXME emit custom event for this? something to tackle later. log & skip for now
     resp_msg = {
-        "message": f"BSSH ENS event processing complete",
+        "message": f"Aborted pipeline due to Emergency Stop: {se}",
     }
-    logger.info(libjson.dumps(resp_msg))
+    logger.warning(libjson.dumps(resp_msg))
     return resp_msg
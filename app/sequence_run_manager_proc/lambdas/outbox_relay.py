@@ -0,0 +1,39 @@
+import os
+
+import django
+
+django.setup()
+
+# --- keep ^^^ at top of the module
+
+import logging
+
+from sequence_run_manager.aws_event_bridge.outbox_srv import drain_outbox_events
+from libumccr import libjson
+
+logger = logging.getLogger()
+logger.setLevel(logging.INFO)
+
+# time to leave for the last relay in flight
+REMAINING_TIME_MARGIN_MILLIS = 30 * 1000
+
+
+def handler(event, context):
+    """
+    Publish the pending events of the event outbox to EventBridge. Scheduled, as a safety net for the events
+    not published straight after being recorded (e.g. rejected by EventBridge, or recorded by the API).
+
+    :param event: scheduled event, not used
+    :param context: Lambda context, to stop relaying before the Lambda times out
+    :return: number of events published, rejected (to be retried), given up on and held back
+    """
+    assert os.environ["EVENT_BUS_NAME"] is not None, "EVENT_BUS_NAME must be set"
+
+    def should_continue() -> bool:
+        if context is None:
+            return True
+        return context.get_remaining_time_in_millis() > REMAINING_TIME_MARGIN_MILLIS
+
+    result = drain_outbox_events(should_continue=should_continue)
+    logger.info(libjson.dumps(result))
+    return result
@@ -9,6 +9,9 @@ django.setup()
 import logging
 
 from sequence_run_manager_proc.services import sample_sheet_srv
+from sequence_run_manager_proc.services.sample_sheet_stream import (
+    SampleSheetTooLargeError,
+)
 from libumccr import libjson
 
 logger = logging.getLogger()
@@ -71,13 +74,23 @@ def event_handler(event, context):
         }
     }
     """
-    logger.info(f"Received event: {event}")
+    # logged once, without the sample sheet content
+    logger.info(f"Received event: {libjson.dumps(loggable_event(event))}")
     logger.info(f"Received context: {context}")
-    logger.info(libjson.dumps(event))
     logger.info("Start processing sample sheet event ....")
 
     if event["detail-type"] == "SequenceRunSampleSheetChange":
-        sample_sheet_srv.create_sequence_sample_sheet_from_srssc_event(event["detail"])
+        try:
+            sample_sheet_srv.create_sequence_sample_sheet_from_srssc_event(
+                event["detail"]
+            )
+        except SampleSheetTooLargeError as e:
+            logger.error(
+                f"Sample sheet {event['detail'].get('sampleSheetName')} rejected: {e}"
+            )
+            return {
+                "message": f"Sample sheet rejected: {e}",
+            }
     elif event["detail-type"] == "WorkflowRunStateChange":
         sample_sheet_srv.validate_sample_sheet_from_wrsc_event(event["detail"])
     else:
@@ -88,3 +101,17 @@ def event_handler(event, context):
     return {
         "message": "Sample sheet event processed successfully",
     }
+
+
+def loggable_event(event: dict) -> dict:
+    """The event with the (base64 gzip) sample sheet content replaced by its length"""
+    detail = event.get("detail") or {}
+    if "samplesheetBase64gz" not in detail:
+        return event
+    return {
+        **event,
+        "detail": {
+            **detail,
+            "samplesheetBase64gz": f"<{len(detail['samplesheetBase64gz'] or '')} characters>",
+        },
+    }
@@ -1,36 +1,130 @@
 import logging
 import os
-from typing import Dict, Any, Optional, List
-from libumccr.aws import libsm
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, Any, Iterable, Optional, List, TypeVar
 import requests
 
+from sequence_run_manager_proc.services.http_session import get_session
+from sequence_run_manager_proc.services.sample_sheet_stream import (
+    SampleSheetTooLargeError,
+    read_response_text,
+)
+from sequence_run_manager_proc.services.secret_cache import (
+    get_cached_secret,
+    invalidate_secret,
+)
+
 logger = logging.getLogger(__name__)
 
 DEFAULT_BSSH_BASE_URL = "https://api.aps2.sh.basespace.illumina.com/v2/"
 
+# concurrent BSSH requests of a service instance (e.g. sample sheet downloads), below the pool size of
+# the shared HTTP session
+DEFAULT_BSSH_MAX_CONCURRENCY = 4
+
+# largest page size accepted by the BSSH v2 list endpoints
+BSSH_MAX_PAGE_LIMIT = 1000
+
+T = TypeVar("T")
+R = TypeVar("R")
+
+_bssh_service: Optional["BSSHService"] = None
+_bssh_service_lock = threading.Lock()
+
+
+def get_bssh_service() -> "BSSHService":
+    """Process-wide BSSHService, kept (with its cached token) across warm Lambda invocations"""
+    global _bssh_service
+    if _bssh_service is None:
+        with _bssh_service_lock:
+            if _bssh_service is None:
+                _bssh_service = BSSHService()
+    return _bssh_service
+
+
+def reset_bssh_service():
+    """Drop the process-wide BSSHService, the next `get_bssh_service()` builds a new one"""
+    global _bssh_service
+    with _bssh_service_lock:
+        _bssh_service = None
+
 
 class BSSHService:
     """Service class for BSSH (BaseSpace Sequence Hub) operations"""
 
-    def __init__(self):
+    def __init__(self, max_concurrency: Optional[int] = None):
         assert os.environ.get(
             "BASESPACE_ACCESS_TOKEN_SECRET_ID", None
         ), "BASESPACE_ACCESS_TOKEN_SECRET_ID is not set"
+        self.token_secret_id = os.environ.get("BASESPACE_ACCESS_TOKEN_SECRET_ID")
+        # fail fast when the token cannot be retrieved
+        self._get_access_token()
+        self.base_url = os.environ.get("BSSH_BASE_URL", DEFAULT_BSSH_BASE_URL)
+        self.max_concurrency = max(
+            1,
+            max_concurrency
+            or int(
+                os.environ.get("BSSH_MAX_CONCURRENCY", DEFAULT_BSSH_MAX_CONCURRENCY)
+            ),
+        )
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._executor_lock = threading.Lock()
+
+    def _get_executor(self) -> ThreadPoolExecutor:
+        """Bounded pool of the service, created on first use and kept with the service"""
+        if self._executor is None:
+            with self._executor_lock:
+                if self._executor is None:
+                    self._executor = ThreadPoolExecutor(
+                        max_workers=self.max_concurrency,
+                        thread_name_prefix="bssh",
+                    )
+        return self._executor
+
+    def map_concurrently(self, fn: Callable[[T], R], items: Iterable[T]) -> List[R]:
+        """
+        Apply fn to the items, at most max_concurrency at a time, and return the results in the order of
+        the items. If fn raises, the exception of the first failed item is raised.
+        """
+        items = list(items)
+        if len(items) <= 1 or self.max_concurrency == 1:
+            return [fn(item) for item in items]
+        return list(self._get_executor().map(fn, items))
+
+    def _get_access_token(self) -> str:
+        """BSSH access token, from the process-wide secret cache"""
         try:
-            BASESPACE_ACCESS_TOKEN = libsm.get_secret(
-                os.environ.get("BASESPACE_ACCESS_TOKEN_SECRET_ID")
-            )
+            BASESPACE_ACCESS_TOKEN = get_cached_secret(self.token_secret_id)
         except Exception as e:
             logger.error(f"Error retrieving BSSH token from the Secret Manager: {e}")
             raise e
 
         if not BASESPACE_ACCESS_TOKEN:
             raise ValueError("BSSH_TOKEN is not set")
-        self.headers = {
-            "Authorization": f"Bearer {BASESPACE_ACCESS_TOKEN}",
+        return BASESPACE_ACCESS_TOKEN
+
+    @property
+    def headers(self) -> Dict[str, str]:
+        return {
+            "Authorization": f"Bearer {self._get_access_token()}",
             "Content-Type": "application/json",
         }
-        self.base_url = os.environ.get("BSSH_BASE_URL", DEFAULT_BSSH_BASE_URL)
+
+    def _get(self, url: str, **kwargs) -> requests.Response:
+        """
+        GET through the shared session. On a 401 the token is read again from the Secret Manager (it may
+        have been rotated since it was cached) and the request retried once.
+        """
+        response = get_session().get(url, headers=self.headers, **kwargs)
+        if response.status_code == 401:
+            logger.warning(
+                f"BSSH request unauthorized, refreshing the access token and retrying: {url}"
+            )
+            response.close()
+            invalidate_secret(self.token_secret_id)
+            response = get_session().get(url, headers=self.headers, **kwargs)
+        return response
 
     def handle_request_error(self, e: Exception, operation: str):
         """
@@ -57,6 +151,10 @@ class BSSHService:
             logger.error(f"Request error occurred: {str(e)}")
             raise ValueError(f"Error making request to BSSH: {str(e)}")
 
+        elif isinstance(e, SampleSheetTooLargeError):
+            logger.error(f"Rejected {operation}: {str(e)}")
+            raise e
+
         else:
             logger.error(f"Unexpected error: {str(e)}")
             raise ValueError(f"Unexpected error {operation}: {str(e)}")
@@ -184,7 +282,7 @@ class BSSHService:
         """
 
         try:
-            response = requests.get(api_url, headers=self.headers)
+            response = self._get(api_url)
 
             # Raise error for bad status codes
             response.raise_for_status()
@@ -211,7 +309,10 @@ class BSSHService:
         return libraries
 
     def get_sample_sheet_from_bssh_run_files(
-        self, api_url: str, sample_sheet_name: str
+        self,
+        api_url: str,
+        sample_sheet_name: str,
+        run_files: Optional[List[Dict[str, Any]]] = None,
     ) -> Optional[str]:
         """
         Retrieve sample sheet from ICA project
@@ -219,6 +320,7 @@ class BSSHService:
         Args:
             api_url: BSSH run URL
             sample_sheet_name: Name of the sample sheet file
+            run_files: Files of the run from `list_run_files`, listed if not given
 
         Returns:
             Base64 encoded gzip string containing sample sheet data or None if not found
@@ -252,6 +354,7 @@ class BSSHService:
             ],
             "Paging": {
                 "DisplayedCount": 3,
+                "TotalCount": 3,
                 "Offset": 0,
                 "Limit": 10,
                 "SortDir": "Asc",
@@ -265,7 +368,16 @@ class BSSHService:
             f"Bssh run api url: {api_url} , sample sheet name: {sample_sheet_name}"
         )
         try:
-            file_content_url = self._find_sample_sheet_url(api_url, sample_sheet_name)
+            if run_files is None:
+                run_files = self.list_run_files(api_url)
+            file_content_url = next(
+                (
+                    file["HrefContent"]
+                    for file in run_files
+                    if file["Name"] == sample_sheet_name
+                ),
+                None,
+            )
 
             if not file_content_url:
                 logger.warning(
@@ -284,131 +396,107 @@ class BSSHService:
     def get_all_sample_sheet_from_bssh_run_files(
         self,
         api_url: str,
+        run_files: Optional[List[Dict[str, Any]]] = None,
     ) -> Optional[List[Dict[str, str]]]:
         """
         Get all sample sheet from BSSH run files, Sample sheet name will be start with SampleSheet.XXXXX.csv, and is csv file
+        run_files: Files of the run from `list_run_files`, listed if not given
+        Returns the name, content and run file (listing item, with Size, DateModified and ETag) of each sample sheet
         """
         try:
-            sample_sheet_urls = self._find_all_sample_sheet_urls(api_url)
-            sample_sheet_contents = []
-            for url in sample_sheet_urls:
-                if not url:
-                    continue
-                content = self._fetch_and_decode_file_content(url["url"])
-                sample_sheet_contents.append({"name": url["name"], "content": content})
-            return sample_sheet_contents
+            if run_files is None:
+                run_files = self.list_run_files(api_url)
+            sample_sheet_urls = [
+                {"name": file["Name"], "url": file["HrefContent"], "file": file}
+                for file in run_files
+                if self.is_sample_sheet_file_name(file["Name"])
+            ]
+            logger.info(f"Found {len(sample_sheet_urls)} sample sheet urls")
+            # downloaded concurrently, the latency of a run with several sample sheets is the one of
+            # its slowest download
+            contents = self.map_concurrently(
+                lambda url: self._fetch_and_decode_file_content(url["url"]),
+                sample_sheet_urls,
+            )
+            return [
+                {"name": url["name"], "content": content, "file": url["file"]}
+                for url, content in zip(sample_sheet_urls, contents)
+            ]
         except Exception as e:
             self.handle_request_error(
                 e, "when getting all sample sheet from BSSH run files"
             )
 
-    def _find_sample_sheet_url(
-        self, api_url: str, sample_sheet_name: str
-    ) -> Optional[str]:
-        """
-        Find the URL of the sample sheet file in the BSSH run files
-        Args:
-            api_url: BSSH run URL
-            sample_sheet_name: Name of the sample sheet file
-        Returns:
-            URL of the sample sheet file or None if not found
-        """
-        try:
-            bssh_run_files_url = f"{api_url}/files"
-            offset = 0
-            limit = 100
-
-            while True:
-                params = {
-                    "extension": "csv",
-                    "directory": "/",
-                    "offset": offset,
-                    "limit": limit,
-                }
-
-                response = requests.get(
-                    bssh_run_files_url, params=params, headers=self.headers
-                )
-                response.raise_for_status()
-
-                files = response.json().get("Items", [])
-
-                if not files:
-                    break
-
-                for file in files:
-                    if file["Name"] == sample_sheet_name:
-                        return file["HrefContent"]
-
-                if len(files) < limit:
-                    break
-
-                offset += limit
-
-            return None
-        except Exception as e:
-            self.handle_request_error(e, "when getting sample sheet file content url")
+    @staticmethod
+    def is_sample_sheet_file_name(name: str) -> bool:
+        return name.endswith(".csv") and (
+            "samplesheet" in name.lower() or "sample_sheet" in name.lower()
+        )
 
-    def _find_all_sample_sheet_urls(
-        self,
-        api_url: str,
-    ) -> Optional[List[Dict[str, str]]]:
+    def list_run_files(
+        self, api_url: str, page_limit: int = BSSH_MAX_PAGE_LIMIT
+    ) -> List[Dict[str, Any]]:
         """
-        Get all sample sheet from BSSH run files, Sample sheet name will be start with SampleSheet.XXXXX.csv, and is csv file
+        List the csv files at the root of the BSSH run (sample sheet candidates), see the example of
+        `get_sample_sheet_from_bssh_run_files`.
+
+        The extension and directory are filtered by BSSH, the run files API has no file name pattern
+        filter. Pages are of the largest size BSSH allows; once the first page gives the total count, the
+        remaining pages are fetched concurrently.
         """
-        try:
-            sample_sheet_urls = []
-            bssh_run_files_url = f"{api_url}/files"
-            offset = 0
-            limit = 100
+        bssh_run_files_url = f"{api_url}/files"
 
-            while True:
-                params = {
+        def get_page(offset: int) -> Dict[str, Any]:
+            response = self._get(
+                bssh_run_files_url,
+                params={
                     "extension": "csv",
                     "directory": "/",
                     "offset": offset,
-                    "limit": limit,
-                }
-
-                response = requests.get(
-                    bssh_run_files_url, params=params, headers=self.headers
-                )
-                response.raise_for_status()
-
-                files = response.json().get("Items", [])
-
-                if not files:
-                    break
-
-                for file in files:
-                    if file["Name"].endswith(".csv") and (
-                        "samplesheet" in file["Name"].lower()
-                        or "sample_sheet" in file["Name"].lower()
-                    ):
-                        sample_sheet_urls.append(
-                            {"name": file["Name"], "url": file["HrefContent"]}
-                        )
-
-                if len(files) < limit:
-                    break
+                    "limit": page_limit,
+                },
+            )
+            response.raise_for_status()
+            return response.json()
 
-                offset += limit
-            logger.info(f"Found {len(sample_sheet_urls)} sample sheet urls")
-            return sample_sheet_urls
+        try:
+            first_page = get_page(0)
+            files = list(first_page.get("Items", []))
+            total_count = first_page.get("Paging", {}).get("TotalCount")
+
+            if total_count is not None:
+                for page in self.map_concurrently(
+                    get_page, range(page_limit, total_count, page_limit)
+                ):
+                    files.extend(page.get("Items", []))
+            else:
+                # no total count, page through until a short page
+                page_items = files
+                offset = 0
+                while len(page_items) == page_limit:
+                    offset += page_limit
+                    page_items = get_page(offset).get("Items", [])
+                    files.extend(page_items)
+
+            logger.info(f"Listed {len(files)} csv files of BSSH run {api_url}")
+            return files
         except Exception as e:
-            self.handle_request_error(e, "when getting sample sheet file content url")
+            self.handle_request_error(e, "when listing run files")
 
     def _fetch_and_decode_file_content(self, content_url: str) -> Optional[str]:
-        """Fetch file content and return as Jsonb format to persist in DB"""
+        """
+        Fetch file content and return as Jsonb format to persist in DB
+        The content is streamed, and rejected (SampleSheetTooLargeError) beyond SAMPLE_SHEET_MAX_BYTES
+        """
         try:
-            response = requests.get(content_url, headers=self.headers, stream=True)
+            response = self._get(content_url, stream=True)
             response.raise_for_status()
 
-            content = response.content
+            content = read_response_text(response)
             if not content:
                 raise ValueError("Empty content received from BSSH")
 
-            return content.decode("utf-8")
+            return content
 
         except Exception as e:
             self.handle_request_error(e, "when fetching and encoding file content")
@@ -0,0 +1,123 @@
+import logging
+import threading
+from typing import Optional
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+logger = logging.getLogger(__name__)
+
+# (connect, read) timeouts in seconds, a hung endpoint must not burn the whole Lambda timeout
+DEFAULT_TIMEOUT = (5, 30)
+
+DEFAULT_RETRIES = 3
+DEFAULT_BACKOFF_FACTOR = 0.5  # 0.5s, 1s, 2s, ...
+DEFAULT_BACKOFF_MAX = 10
+# longest Retry-After honoured, longer ones are capped so that a retry still fits in the Lambda run
+DEFAULT_RETRY_AFTER_MAX = 30
+RETRY_STATUS_FORCELIST = frozenset({429, 500, 502, 503, 504})
+
+DEFAULT_POOL_MAXSIZE = 10
+
+_session: Optional[requests.Session] = None
+_session_lock = threading.Lock()
+
+
+class CappedRetry(Retry):
+    """Retry honouring the Retry-After header of 429 and 503 responses, up to max_retry_after seconds"""
+
+    def __init__(
+        self, *args, max_retry_after: float = DEFAULT_RETRY_AFTER_MAX, **kwargs
+    ):
+        self.max_retry_after = max_retry_after
+        super().__init__(*args, **kwargs)
+
+    def new(self, **kwargs):
+        retry = super().new(**kwargs)
+        retry.max_retry_after = self.max_retry_after
+        return retry
+
+    def get_retry_after(self, response) -> Optional[float]:
+        retry_after = super().get_retry_after(response)
+        if retry_after is None:
+            return None
+        return min(retry_after, self.max_retry_after)
+
+
+class TimeoutHTTPAdapter(HTTPAdapter):
+    """HTTPAdapter applying a default timeout to the requests made without one"""
+
+    def __init__(self, *args, timeout=DEFAULT_TIMEOUT, **kwargs):
+        self.timeout = timeout
+        super().__init__(*args, **kwargs)
+
+    def send(self, request, **kwargs):
+        if kwargs.get("timeout") is None:
+            kwargs["timeout"] = self.timeout
+        return super().send(request, **kwargs)
+
+
+def build_session(
+    timeout=DEFAULT_TIMEOUT,
+    retries: int = DEFAULT_RETRIES,
+    backoff_factor: float = DEFAULT_BACKOFF_FACTOR,
+    backoff_max: float = DEFAULT_BACKOFF_MAX,
+    retry_after_max: float = DEFAULT_RETRY_AFTER_MAX,
+    pool_maxsize: int = DEFAULT_POOL_MAXSIZE,
+) -> requests.Session:
+    """
+    Build a requests Session with pooled keep-alive connections, default connect/read timeouts, and
+    retries with exponential backoff on connection errors and 429/5xx responses of idempotent requests.
+
+    Once retries are exhausted the last response is returned (not raised), so `raise_for_status()`
+    applies as without retries.
+    """
+    retry = CappedRetry(
+        total=retries,
+        connect=retries,
+        read=retries,
+        status=retries,
+        backoff_factor=backoff_factor,
+        backoff_max=backoff_max,
+        status_forcelist=RETRY_STATUS_FORCELIST,
+        allowed_methods=frozenset({"GET", "HEAD", "OPTIONS"}),
+        respect_retry_after_header=True,
+        raise_on_status=False,
+        max_retry_after=retry_after_max,
+    )
+    adapter = TimeoutHTTPAdapter(
+        timeout=timeout,
+        max_retries=retry,
+        pool_connections=pool_maxsize,
+        pool_maxsize=pool_maxsize,
+    )
+
+    session = requests.Session()
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    # compressed transfer, decoded transparently by requests
+    session.headers["Accept-Encoding"] = "gzip, deflate"
+    return session
+
+
+def get_session() -> requests.Session:
+    """
+    Module-level pooled session, shared by all services and across warm Lambda invocations so that
+    connections (and their TLS handshake) are reused.
+    """
+    global _session
+    if _session is None:
+        with _session_lock:
+            if _session is None:
+                _session = build_session()
+    return _session
+
+
+def reset_session():
+    """Close and drop the shared session, the next `get_session()` builds a new one"""
+    global _session
+    with _session_lock:
+        if _session is not None:
+            _session.close()
+        _session = None
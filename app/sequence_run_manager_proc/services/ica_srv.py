@@ -31,7 +31,8 @@ Key changes from wrapica:
        making it thread-safe and easier to test.
     2. Token from Secret Manager: wrapica reads ICAV2_ACCESS_TOKEN from env var
        or a session file. This service retrieves the token from AWS Secrets
-       Manager via the ICAV2_ACCESS_TOKEN_SECRET_ID env var and libsm.
+       Manager via the ICAV2_ACCESS_TOKEN_SECRET_ID env var and libsm, through
+       the process-wide TTL secret cache (refreshed on expiry or on a 401).
     3. ApiClient context manager fix: wrapica creates ProjectDataApi inside a
        `with ApiClient(...) as api_client:` block but makes the actual API call
        outside it (after __exit__). This service keeps API calls inside the
@@ -46,30 +47,121 @@ Key changes from wrapica:
        icav2://<project-uuid>/... read-only access.
     7. Simplified read_icav2_file_contents: removed the output_path/TextIOWrapper
        parameters since we only need string return for samplesheet content.
+    8. Caching: resolved URIs (to project and data IDs) are kept for
+       ICA_URI_CACHE_TTL_SECONDS and presigned download URLs until shortly before
+       they expire, so that resolving the same URI again (e.g. the sample sheet of
+       repeated WRSC events) makes no or one ICA API call instead of three.
 
 Dependencies:
     - libica (ICA SDK)
-    - requests
-    - libsm (internal secret manager client)
+    - requests (through the shared pooled session of http_session)
+    - libsm (internal secret manager client, through secret_cache)
 """
 
 import os
 import logging
+import threading
+import time
+from datetime import datetime, timezone
 from pathlib import Path
-from typing import List
-from urllib.parse import urlparse
+from typing import Any, Callable, Dict, Hashable, List, Optional, Tuple, TypeVar
+from urllib.parse import parse_qs, urlparse
 from uuid import UUID
 
 import requests
-from libumccr.aws import libsm
+
 from libica.openapi.v3 import ApiClient, Configuration, ApiException
 from libica.openapi.v3.api.project_data_api import ProjectDataApi
 from libica.openapi.v3.models import ProjectData, Download
 
+from sequence_run_manager_proc.services.http_session import get_session
+from sequence_run_manager_proc.services.sample_sheet_stream import read_response_text
+from sequence_run_manager_proc.services.secret_cache import (
+    get_cached_secret,
+    invalidate_secret,
+)
+
 logger = logging.getLogger(__name__)
 
 DEFAULT_ICAV2_BASE_URL = "https://ica.illumina.com/ica/rest"
 
+# how long an icav2:// URI resolved to its project and data IDs is reused
+DEFAULT_ICA_URI_CACHE_TTL_SECONDS = 300
+# a presigned download URL is not reused within this margin of its expiry
+PRESIGNED_URL_EXPIRY_MARGIN_SECONDS = 60
+
+T = TypeVar("T")
+
+_ica_service: Optional["ICAService"] = None
+_ica_service_lock = threading.Lock()
+
+
+def get_ica_service() -> "ICAService":
+    """Process-wide ICAService, kept (with its cached token) across warm Lambda invocations"""
+    global _ica_service
+    if _ica_service is None:
+        with _ica_service_lock:
+            if _ica_service is None:
+                _ica_service = ICAService()
+    return _ica_service
+
+
+def reset_ica_service():
+    """Drop the process-wide ICAService, the next `get_ica_service()` builds a new one"""
+    global _ica_service
+    with _ica_service_lock:
+        _ica_service = None
+
+
+class ExpiringCache:
+    """Thread-safe cache of values, each kept until its own expiry time (of the given clock)"""
+
+    def __init__(self, clock: Callable[[], float] = time.time):
+        self._clock = clock
+        self._entries: Dict[Hashable, Tuple[Any, float]] = {}
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if entry[1] <= self._clock():
+                del self._entries[key]
+                return None
+            return entry[0]
+
+    def put(self, key: Hashable, value: Any, expires_at: float):
+        with self._lock:
+            self._entries[key] = (value, expires_at)
+
+    def invalidate(self, key: Hashable):
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+def get_presigned_url_expiry(url: str) -> Optional[float]:
+    """
+    Expiry (epoch seconds) of an S3 presigned URL, from its X-Amz-Date and X-Amz-Expires (SigV4) or
+    Expires (SigV2) query parameters; None if it cannot be told.
+    """
+    query = parse_qs(urlparse(url).query)
+    try:
+        if "X-Amz-Date" in query and "X-Amz-Expires" in query:
+            signed_at = datetime.strptime(
+                query["X-Amz-Date"][0], "%Y%m%dT%H%M%SZ"
+            ).replace(tzinfo=timezone.utc)
+            return signed_at.timestamp() + int(query["X-Amz-Expires"][0])
+        if "Expires" in query:
+            return float(query["Expires"][0])
+    except ValueError:
+        logger.warning("Unexpected presigned URL expiry parameters")
+    return None
+
 
 class ICAService:
     """
@@ -86,20 +178,43 @@ class ICAService:
       `set_icav2_configuration()`. This class stores the Configuration as an instance
       attribute (`self._configuration`), avoiding global mutable state.
     - wrapica reads the token from ICAV2_ACCESS_TOKEN env var or falls back to
-      ~/.icav2/.session.*.yaml. This class reads from Secrets Manager via libsm.
+      ~/.icav2/.session.*.yaml. This class reads from Secrets Manager via libsm,
+      through the process-wide secret cache: the token of `self._configuration`
+      is brought up to date before each API call, and read again from Secrets
+      Manager on a 401.
     - wrapica reads the base URL from ICAV2_BASE_URL env var or falls back to
       ~/.icav2/config.yaml. This class reads from ICAV2_BASE_URL env var or
       falls back to the default URL constant.
+    - Resolved URIs and presigned download URLs are cached by the instance (see
+      `get_file_contents_from_uri`).
     """
 
-    def __init__(self):
+    def __init__(self, clock: Callable[[], float] = time.time):
         assert os.environ.get(
             "ICAV2_ACCESS_TOKEN_SECRET_ID", None
         ), "ICAV2_ACCESS_TOKEN_SECRET_ID is not set"
-        try:
-            ICAV2_ACCESS_TOKEN = libsm.get_secret(
-                os.environ.get("ICAV2_ACCESS_TOKEN_SECRET_ID")
+        self.token_secret_id = os.environ.get("ICAV2_ACCESS_TOKEN_SECRET_ID")
+
+        self._configuration = Configuration(
+            host=os.environ.get("ICAV2_BASE_URL", DEFAULT_ICAV2_BASE_URL),
+            access_token=self._get_access_token(),
+        )
+
+        self.uri_cache_ttl_seconds = float(
+            os.environ.get(
+                "ICA_URI_CACHE_TTL_SECONDS", DEFAULT_ICA_URI_CACHE_TTL_SECONDS
             )
+        )
+        self._clock = clock
+        # icav2:// URI -> (project ID, data ID)
+        self._resolved_uris = ExpiringCache(clock)
+        # (project ID, data ID) -> presigned download URL
+        self._download_urls = ExpiringCache(clock)
+
+    def _get_access_token(self) -> str:
+        """ICAv2 access token, from the process-wide secret cache"""
+        try:
+            ICAV2_ACCESS_TOKEN = get_cached_secret(self.token_secret_id)
         except Exception as e:
             logger.error(f"Error retrieving ICAv2 token from Secret Manager: {e}")
             raise
@@ -108,11 +223,28 @@ class ICAService:
             raise ValueError(
                 "ICAV2_ACCESS_TOKEN retrieved from Secret Manager is empty"
             )
+        return ICAV2_ACCESS_TOKEN
 
-        self._configuration = Configuration(
-            host=os.environ.get("ICAV2_BASE_URL", DEFAULT_ICAV2_BASE_URL),
-            access_token=ICAV2_ACCESS_TOKEN,
-        )
+    def _call_project_data_api(self, call: Callable[[ProjectDataApi], T]) -> T:
+        """
+        Make a ProjectDataApi call with the current access token. On a 401 the token
+        is read again from Secrets Manager (it may have been rotated since it was
+        cached) and the call retried once.
+
+        :raises ApiException: If the ICA API call fails.
+        """
+        for attempt in (1, 2):
+            self._configuration.access_token = self._get_access_token()
+            with ApiClient(self._configuration) as api_client:
+                try:
+                    return call(ProjectDataApi(api_client))
+                except ApiException as e:
+                    if e.status != 401 or attempt == 2:
+                        raise
+                    logger.warning(
+                        "ICAv2 request unauthorized, refreshing the access token and retrying"
+                    )
+                    invalidate_secret(self.token_secret_id)
 
     def convert_uri_to_project_data_obj(self, data_uri: str) -> ProjectData:
         """
@@ -145,6 +277,17 @@ class ICAService:
         :raises FileNotFoundError: If the file/folder is not found in the project.
         :raises ApiException: If the ICA API call fails.
         """
+        project_id, data_path, data_type = self._parse_uri(data_uri)
+        data_id = self._get_data_id_from_path(project_id, data_path, data_type)
+        return self._get_project_data_obj_by_id(project_id, data_id)
+
+    @staticmethod
+    def _parse_uri(data_uri: str) -> Tuple[str, Path, str]:
+        """
+        Split an icav2:// URI into its project ID, data path and data type ("FILE" or "FOLDER").
+
+        :raises ValueError: If the URI scheme is not "icav2" or netloc is not a valid UUID.
+        """
         uri_obj = urlparse(data_uri)
 
         if uri_obj.scheme != "icav2":
@@ -164,8 +307,30 @@ class ICAService:
         data_path = Path(uri_obj.path)
         data_type = "FOLDER" if uri_obj.path.endswith("/") else "FILE"
 
-        data_id = self._get_data_id_from_path(project_id, data_path, data_type)
-        return self._get_project_data_obj_by_id(project_id, data_id)
+        return project_id, data_path, data_type
+
+    def resolve_uri(self, data_uri: str) -> Tuple[str, str]:
+        """
+        Resolve an icav2:// file URI to its (project ID, data ID), with a single ICA API call (the path
+        lookup) on a cache miss; resolved URIs are reused for ICA_URI_CACHE_TTL_SECONDS.
+
+        :raises ValueError: If the URI is invalid.
+        :raises FileNotFoundError: If the file is not found in the project.
+        :raises ApiException: If the ICA API call fails.
+        """
+        resolved = self._resolved_uris.get(data_uri)
+        if resolved is not None:
+            return resolved
+
+        project_id, data_path, data_type = self._parse_uri(data_uri)
+        resolved = (
+            project_id,
+            self._get_data_id_from_path(project_id, data_path, data_type),
+        )
+        self._resolved_uris.put(
+            data_uri, resolved, self._clock() + self.uri_cache_ttl_seconds
+        )
+        return resolved
 
     def _get_data_id_from_path(
         self,
@@ -210,10 +375,9 @@ class ICAService:
         if parent_folder_path == "//":
             parent_folder_path = "/"
 
-        with ApiClient(self._configuration) as api_client:
-            api_instance = ProjectDataApi(api_client)
-            try:
-                data_items: List[ProjectData] = api_instance.get_project_data_list(
+        try:
+            data_items: List[ProjectData] = self._call_project_data_api(
+                lambda api_instance: api_instance.get_project_data_list(
                     project_id=project_id,
                     parent_folder_path=parent_folder_path,
                     filename=[data_path.name],
@@ -221,9 +385,10 @@ class ICAService:
                     file_path_match_mode="FULL_CASE_INSENSITIVE",
                     type=data_type,
                 ).items
-            except ApiException as e:
-                logger.error(f"Error listing project data: {e}")
-                raise
+            )
+        except ApiException as e:
+            logger.error(f"Error listing project data: {e}")
+            raise
 
         if data_type == "FOLDER":
             match_path = str(data_path) + "/"
@@ -266,16 +431,16 @@ class ICAService:
         :return: The full libica ProjectData object.
         :raises ApiException: If the ICA API call fails.
         """
-        with ApiClient(self._configuration) as api_client:
-            api_instance = ProjectDataApi(api_client)
-            try:
-                return api_instance.get_project_data(
+        try:
+            return self._call_project_data_api(
+                lambda api_instance: api_instance.get_project_data(
                     project_id=project_id,
                     data_id=data_id,
                 )
-            except ApiException as e:
-                logger.error(f"Error getting project data: {e}")
-                raise
+            )
+        except ApiException as e:
+            logger.error(f"Error getting project data: {e}")
+            raise
 
     def _create_download_url(self, project_id: str, file_id: str) -> str:
         """
@@ -297,19 +462,28 @@ class ICAService:
         :return: Presigned download URL string.
         :raises ApiException: If the ICA API call fails.
         """
-        with ApiClient(self._configuration) as api_client:
-            api_instance = ProjectDataApi(api_client)
-            try:
-                api_response: Download = api_instance.create_download_url_for_data(
+        try:
+            api_response: Download = self._call_project_data_api(
+                lambda api_instance: api_instance.create_download_url_for_data(
                     project_id=project_id,
                     data_id=file_id,
                 )
-            except ApiException as e:
-                logger.error(f"Error creating download URL: {e}")
-                raise
+            )
+        except ApiException as e:
+            logger.error(f"Error creating download URL: {e}")
+            raise
 
         return api_response.url
 
+    def _cache_download_url(self, project_id: str, data_id: str, url: str):
+        """Keep a presigned download URL until PRESIGNED_URL_EXPIRY_MARGIN_SECONDS before it expires"""
+        expires_at = get_presigned_url_expiry(url)
+        if expires_at is None:
+            return
+        self._download_urls.put(
+            (project_id, data_id), url, expires_at - PRESIGNED_URL_EXPIRY_MARGIN_SECONDS
+        )
+
     def read_icav2_file_contents(self, project_id: str, data_id: str) -> str:
         """
         Download a file from ICAv2 and return its contents as a string.
@@ -326,6 +500,12 @@ class ICAService:
         - Added `r.raise_for_status()` after the HTTP GET. The original wrapica
           does not validate the HTTP response status (line 2358), meaning a 403
           or 404 from the presigned URL would silently return garbage content.
+        - The download goes through the shared pooled session (timeouts, retries
+          on 429/5xx) instead of a bare `requests.get`.
+        - The content is streamed and capped to SAMPLE_SHEET_MAX_BYTES
+          (SampleSheetTooLargeError), rather than read whole with `r.content`.
+        - The presigned URL of a previous download of the file is reused while it
+          is valid; one that is refused (403) is replaced by a new one.
 
         :param project_id: The ICA project UUID.
         :param data_id: The ICA file data ID (e.g. "fil.xxxxx").
@@ -333,18 +513,32 @@ class ICAService:
         :raises requests.HTTPError: If the presigned URL download fails.
         :raises ApiException: If the download URL creation fails.
         """
-        presigned_url = self._create_download_url(project_id, data_id)
-        r = requests.get(presigned_url)
-        r.raise_for_status()
-        return r.content.decode()
+        while True:
+            presigned_url = self._download_urls.get((project_id, data_id))
+            reused = presigned_url is not None
+            if not reused:
+                presigned_url = self._create_download_url(project_id, data_id)
+                self._cache_download_url(project_id, data_id, presigned_url)
+
+            r = get_session().get(presigned_url, stream=True)
+            if reused and r.status_code == 403:
+                # expired or revoked ahead of time, a new one is created
+                r.close()
+                self._download_urls.invalidate((project_id, data_id))
+                continue
+            r.raise_for_status()
+            return read_response_text(r)
 
     def get_file_contents_from_uri(self, data_uri: str) -> str:
         """
         Convenience method: resolve an icav2:// URI and return file contents.
 
-        New method (not present in wrapica). Combines convert_uri_to_project_data_obj()
-        and read_icav2_file_contents() into a single call for the common use case
-        of "give me the file content for this URI".
+        New method (not present in wrapica). Combines resolve_uri() and
+        read_icav2_file_contents() into a single call for the common use case
+        of "give me the file content for this URI". The URI resolution and the
+        presigned URL are cached, a URI seen again within their lifetime makes no
+        ICA API call; if the cached data ID is no longer found (404, e.g. the file
+        was replaced), the URI is resolved again.
 
         :param data_uri: ICAv2 URI, e.g.
             "icav2://9ec02c1f-53ba-47a5-854d-e6b53101adb7/path/to/SampleSheet.csv"
@@ -361,8 +555,16 @@ class ICAService:
                 "icav2://9ec02c1f-53ba-47a5-854d-e6b53101adb7/path/to/SampleSheet.csv"
             )
         """
-        project_data_obj = self.convert_uri_to_project_data_obj(data_uri)
-        return self.read_icav2_file_contents(
-            project_id=project_data_obj.project_id,
-            data_id=project_data_obj.data.id,
-        )
+        resolved = self._resolved_uris.get(data_uri) is not None
+        project_id, data_id = self.resolve_uri(data_uri)
+        try:
+            return self.read_icav2_file_contents(project_id=project_id, data_id=data_id)
+        except ApiException as e:
+            if not resolved or e.status != 404:
+                raise
+            logger.warning(
+                f"ICAv2 data {data_id} of {data_uri} not found, resolving the URI again"
+            )
+            self._resolved_uris.invalidate(data_uri)
+            project_id, data_id = self.resolve_uri(data_uri)
+            return self.read_icav2_file_contents(project_id=project_id, data_id=data_id)
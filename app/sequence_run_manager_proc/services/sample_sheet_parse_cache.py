@@ -0,0 +1,167 @@
+import copy
+import hashlib
+import json
+import logging
+import os
+import threading
+from collections import OrderedDict
+from importlib import metadata
+from typing import Any, Optional
+
+from v2_samplesheet_parser.functions.parser import parse_samplesheet
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_PARSE_CACHE_SIZE = 64
+DEFAULT_PARSE_CACHE_DIR_MAX_ENTRIES = 256
+# larger sample sheets are parsed without being cached, a warm container must not keep them around
+DEFAULT_PARSE_CACHE_MAX_CONTENT_LENGTH = 1024 * 1024
+
+
+def get_parser_version() -> str:
+    try:
+        return metadata.version("v2-samplesheet-parser")
+    except metadata.PackageNotFoundError:
+        return "unknown"
+
+
+class SampleSheetParseCache:
+    """
+    Thread-safe LRU cache of parsed sample sheets, keyed by the SHA-256 of the CSV content and the
+    parser version, so that the same sample sheet is parsed once per warm container.
+
+    With cache_dir, parsed sample sheets are also written there (one JSON file per key, at most
+    dir_max_entries files, the least recently written are removed) and read back on a memory miss.
+    Parse errors, and sample sheets longer than max_content_length characters, are not cached.
+    """
+
+    def __init__(
+        self,
+        max_size: int = DEFAULT_PARSE_CACHE_SIZE,
+        cache_dir: Optional[str] = None,
+        dir_max_entries: int = DEFAULT_PARSE_CACHE_DIR_MAX_ENTRIES,
+        parser_version: Optional[str] = None,
+        max_content_length: int = DEFAULT_PARSE_CACHE_MAX_CONTENT_LENGTH,
+    ):
+        self.max_size = max_size
+        self.max_content_length = max_content_length
+        self.cache_dir = cache_dir
+        self.dir_max_entries = dir_max_entries
+        self.parser_version = parser_version or get_parser_version()
+        self._entries: OrderedDict[str, dict[str, Any]] = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def key(self, content: str, sha256: Optional[str] = None) -> str:
+        sha256 = sha256 or hashlib.sha256(content.encode("utf-8")).hexdigest()
+        return f"{sha256}-{self.parser_version}"
+
+    def parse(self, content: str, sha256: Optional[str] = None) -> dict[str, Any]:
+        """
+        Parsed sample sheet of the CSV content, sha256 is its checksum if already known.
+        A copy is returned, the cached one is never handed out.
+        """
+        if len(content) > self.max_content_length:
+            return parse_samplesheet(content)
+
+        key = self.key(content, sha256)
+        with self._lock:
+            parsed = self._entries.get(key)
+            if parsed is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return copy.deepcopy(parsed)
+
+        parsed = self._read_file(key)
+        if parsed is None:
+            with self._lock:
+                self.misses += 1
+            parsed = parse_samplesheet(content)
+            self._write_file(key, parsed)
+        else:
+            with self._lock:
+                self.hits += 1
+
+        with self._lock:
+            self._entries[key] = parsed
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+        return copy.deepcopy(parsed)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def _file_path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, f"{key}.json")
+
+    def _read_file(self, key: str) -> Optional[dict[str, Any]]:
+        if not self.cache_dir:
+            return None
+        try:
+            with open(self._file_path(key), "r", encoding="utf-8") as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError) as e:
+            logger.warning(f"Unreadable parsed sample sheet cache file {key}: {e}")
+            return None
+
+    def _write_file(self, key: str, parsed: dict[str, Any]):
+        if not self.cache_dir:
+            return
+        # the disk store is a best effort, a failure to write it must not fail the parse
+        try:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            path = self._file_path(key)
+            tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(parsed, f)
+            os.replace(tmp_path, path)
+            self._evict_files()
+        except (OSError, TypeError, ValueError) as e:
+            logger.warning(f"Failed to write parsed sample sheet cache file {key}: {e}")
+
+    def _evict_files(self):
+        entries = [
+            entry
+            for entry in os.scandir(self.cache_dir)
+            if entry.is_file() and entry.name.endswith(".json")
+        ]
+        if len(entries) <= self.dir_max_entries:
+            return
+        entries.sort(key=lambda entry: entry.stat().st_mtime)
+        for entry in entries[: len(entries) - self.dir_max_entries]:
+            try:
+                os.remove(entry.path)
+            except FileNotFoundError:
+                pass
+
+
+# process-wide, shared across warm Lambda invocations; the disk store (e.g. under /tmp) is opt-in
+sample_sheet_parse_cache = SampleSheetParseCache(
+    max_size=int(
+        os.environ.get("SAMPLE_SHEET_PARSE_CACHE_SIZE", DEFAULT_PARSE_CACHE_SIZE)
+    ),
+    cache_dir=os.environ.get("SAMPLE_SHEET_PARSE_CACHE_DIR") or None,
+    dir_max_entries=int(
+        os.environ.get(
+            "SAMPLE_SHEET_PARSE_CACHE_DIR_MAX_ENTRIES",
+            DEFAULT_PARSE_CACHE_DIR_MAX_ENTRIES,
+        )
+    ),
+    max_content_length=int(
+        os.environ.get(
+            "SAMPLE_SHEET_PARSE_CACHE_MAX_CONTENT_LENGTH",
+            DEFAULT_PARSE_CACHE_MAX_CONTENT_LENGTH,
+        )
+    ),
+)
+
+
+def parse_samplesheet_cached(content: str, sha256: Optional[str] = None) -> dict:
+    return sample_sheet_parse_cache.parse(content, sha256)
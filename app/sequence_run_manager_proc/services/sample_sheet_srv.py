@@ -1,31 +1,34 @@
 from django.db import transaction
-from django.utils import timezone
-import ulid
 import logging
-import base64
-import gzip
 import json
 from typing import Optional
-import hashlib
-import zlib
 from sequence_run_manager.models.sequence import Sequence, LibraryAssociation
-from sequence_run_manager.models.sample_sheet import SampleSheet
+from sequence_run_manager.models.sample_sheet import (
+    SampleSheet,
+    SAMPLE_SHEET_CHECKSUM_TYPES,
+    calculate_sample_sheet_checksums,
+)
 from sequence_run_manager.models.comment import Comment, TargetType
 from sequence_run_manager_proc.domain.samplesheet import SampleSheetDomain
-from sequence_run_manager_proc.services.bssh_srv import BSSHService
+from sequence_run_manager_proc.services.bssh_srv import get_bssh_service
 from sequence_run_manager_proc.services.sequence_library_srv import (
     update_sequence_run_libraries_linking,
 )
 from sequence_run_manager_proc.services.sequence_srv import SequenceConfig
-
-from v2_samplesheet_parser.functions.parser import parse_samplesheet
-from sequence_run_manager_proc.services.ica_srv import ICAService
+from sequence_run_manager_proc.services.sequence_run_context import SequenceRunContext
+from sequence_run_manager_proc.services.sample_sheet_parse_cache import (
+    parse_samplesheet_cached,
+)
+from sequence_run_manager_proc.services.sample_sheet_stream import (
+    decode_base64_gzip_text,
+)
+from sequence_run_manager_proc.services.ica_srv import get_ica_service
 
 logger = logging.getLogger(__name__)
 
 
 def create_sequence_sample_sheet_from_bssh_event(
-    payload: dict,
+    payload: dict, ctx: SequenceRunContext
 ) -> Optional[SampleSheetDomain]:
     """
     Check if the sample sheet for a sequence exists;
@@ -33,26 +36,17 @@ def create_sequence_sample_sheet_from_bssh_event(
     If there's an error (API call error, no files, no content), log the error and continue.
     """
     assert payload["id"] is not None, "sequence run id is required"
-
-    try:
-        sequence_run = Sequence.objects.get(sequence_run_id=payload["id"])
-    except Sequence.DoesNotExist:
-        logger.error(
-            f"Sequence run {payload['id']} not found when checking or creating sequence sample sheet"
-        )
-        return None
+    sequence_run = ctx.sequence
 
     # check if this sequence run already has sample sheet, if so, skip creation
-    if SampleSheet.objects.filter(sequence=sequence_run).exists():
+    if ctx.sample_sheets:
         logger.info(
             f"Sample sheet already exists for sequence {payload['id']}, skipping creation"
         )
         return None
 
     try:
-        sample_sheet, samplesheet_content = create_sequence_sample_sheet(
-            sequence_run, payload
-        )
+        sample_sheet, samplesheet_content = create_sequence_sample_sheet(ctx, payload)
         if not sample_sheet or not samplesheet_content:
             logger.error(
                 f"Error creating sample sheet or no sample sheet name found for sequence {payload['id']}."
@@ -87,6 +81,14 @@ def create_sequence_sample_sheet_from_srssc_event(event_detail: dict):
     instrument_run_id = event_detail["instrumentRunId"]
     samplesheet_name = event_detail["sampleSheetName"]
 
+    # Decode from base64+gzip to get original CSV string, streamed and size capped (SampleSheetTooLargeError)
+    # before anything is recorded
+    original_csv_content = decode_base64_gzip_text(event_detail["samplesheetBase64gz"])
+    checksums = calculate_sample_sheet_checksums(original_csv_content)
+    content_dict = parse_samplesheet_cached(
+        original_csv_content, sha256=checksums["sha256"]
+    )
+
     #  step 1: check if the sequence run exists, create a fake sequence run if not
     if event_detail.get("sequenceRunId") is not None:
         try:
@@ -98,32 +100,26 @@ def create_sequence_sample_sheet_from_srssc_event(event_detail: dict):
                 f"Sequence run {event_detail['sequenceRunId']} not found when checking or creating sequence sample sheet from SRSSE event"
             )
             return
-    else:
-        # create a fake sequence run
-        sequence_run = Sequence.objects.create(
-            instrument_run_id=instrument_run_id,
-            sequence_run_id="r." + ulid.new().str,
+
+        # step 2: create a sample sheet for the sequence run
+        sample_sheet = SampleSheet.objects.create(
+            sequence=sequence_run,
             sample_sheet_name=samplesheet_name,
-            start_time=timezone.now(),  # add start time to record the time when the (ghost) sequence run is created
+            sample_sheet_content=content_dict,
+            sample_sheet_content_original=original_csv_content,  # Store original CSV as UTF-8 string
         )
-        logger.info(
-            f"Created a fake sequence run {sequence_run.sequence_run_id} for instrument run {instrument_run_id}"
+    else:
+        # step 1-2: get or create a fake sequence run with the sample sheet
+        sequence_run, sample_sheet = get_or_create_ghost_sequence_sample_sheet(
+            instrument_run_id,
+            samplesheet_name,
+            original_csv_content,
+            content_dict,
+            checksums["sha256"],
         )
-
-    content_base64_gz = event_detail["samplesheetBase64gz"]
-    # Decode from base64+gzip to get original CSV string
-    original_csv_content = gzip.decompress(base64.b64decode(content_base64_gz)).decode(
-        "utf-8"
-    )
-    content_dict = parse_samplesheet(original_csv_content)
-
-    # step 2: create a sample sheet for the sequence run
-    sample_sheet = SampleSheet.objects.create(
-        sequence=sequence_run,
-        sample_sheet_name=samplesheet_name,
-        sample_sheet_content=content_dict,
-        sample_sheet_content_original=original_csv_content,  # Store original CSV as UTF-8 string
-    )
+        if sample_sheet is None:
+            # a repeated event, already recorded
+            return
 
     # comment object needed for sample sheet, refer: https://github.com/umccr/orcabus/issues/947
     # step 3: create a comment for the sample sheet
@@ -162,13 +158,15 @@ def create_sequence_sample_sheet_from_srssc_event(event_detail: dict):
 
 
 def check_sequence_sample_sheet_from_bssh_event(
-    payload: dict,
+    payload: dict, ctx: SequenceRunContext
 ) -> Optional[SampleSheetDomain]:
     """
     Check if the sample sheet for a sequence exists;
     if not, create it by making BSSH API call.
     If there's an error (API call error, no files, no content), log the error and continue.
     if sample shett exist ,will check if the content is the same, if different, update the sample sheet content, if not return none, if not exists, create a new sample sheet
+    The sample sheet is not downloaded again when the BSSH run file (size, date modified and ETag) is the one
+    the existing sample sheet was downloaded from; otherwise the content is compared by SHA-256 checksum.
     """
     assert payload["id"] is not None, "sequence run id is required"
     if not payload.get("apiUrl", None):
@@ -182,21 +180,27 @@ def check_sequence_sample_sheet_from_bssh_event(
         )
         return None
 
-    try:
-        sequence_run = Sequence.objects.get(sequence_run_id=payload["id"])
-    except Sequence.DoesNotExist:
-        logger.error(
-            f"Sequence run {payload['id']} not found when checking or creating sequence sample sheet from bssh event"
-        )
-        return None
-
+    sequence_run = ctx.sequence
     api_url = payload["apiUrl"]
     sample_sheet_name = payload["sampleSheetName"]
 
+    sample_sheet_obj = ctx.get_latest_sample_sheet(sample_sheet_name)
+
     try:
-        bssh_srv = BSSHService()
+        bssh_srv = get_bssh_service()
+        run_files = ctx.get_bssh_run_files(api_url, bssh_srv.list_run_files)
+        run_file = next(
+            (file for file in run_files or [] if file["Name"] == sample_sheet_name),
+            None,
+        )
+        if sample_sheet_obj and sample_sheet_obj.matches_bssh_file(run_file):
+            logger.info(
+                f"Sample sheet {sample_sheet_name} file is unchanged for sequence {sequence_run.sequence_run_id} from bssh event, skipping download"
+            )
+            return None
+
         sample_sheet_content = bssh_srv.get_sample_sheet_from_bssh_run_files(
-            api_url, sample_sheet_name
+            api_url, sample_sheet_name, run_files=run_files
         )
     except Exception as e:
         logger.error(
@@ -210,8 +214,27 @@ def check_sequence_sample_sheet_from_bssh_event(
         )
         return None
 
+    # compared by checksum of the original content, sample sheets stored without it are compared as parsed
+    sample_sheet_sha256 = calculate_sample_sheet_checksums(sample_sheet_content)[
+        "sha256"
+    ]
+    if (
+        sample_sheet_obj
+        and sample_sheet_obj.checksum_sha256
+        and sample_sheet_obj.checksum_sha256 == sample_sheet_sha256
+    ):
+        logger.info(
+            f"Sample sheet {sample_sheet_name} content is the same for sequence {sequence_run.sequence_run_id} from bssh event"
+        )
+        if run_file:
+            # record the file the content is the one of, so that it is not downloaded again
+            ctx.update_sample_sheet_bssh_file(sample_sheet_obj, run_file)
+        return None
+
     try:
-        content_dict = parse_samplesheet(sample_sheet_content)
+        content_dict = parse_samplesheet_cached(
+            sample_sheet_content, sample_sheet_sha256
+        )
     except Exception as e:
         logger.error(
             f"Error parsing sample sheet {sample_sheet_name} for sequence {sequence_run.sequence_run_id}: {str(e)}."
@@ -220,13 +243,12 @@ def check_sequence_sample_sheet_from_bssh_event(
 
     # Check if sample sheet already exists , if already exists, compare the content, if different, update the sample sheet content, if not return none
     # if not exists, create a new sample sheet
-    if SampleSheet.objects.filter(
-        sequence=sequence_run, sample_sheet_name=sample_sheet_name
-    ).exists():
-        sample_sheet_obj = SampleSheet.objects.get(
-            sequence=sequence_run, sample_sheet_name=sample_sheet_name
-        )
-        if sample_sheet_obj.sample_sheet_content != content_dict:
+    if sample_sheet_obj:
+        # when the existing sample sheet has a checksum, it is known to differ at this point
+        if (
+            sample_sheet_obj.checksum_sha256
+            or sample_sheet_obj.sample_sheet_content != content_dict
+        ):
             logger.info(
                 f"Sample sheet {sample_sheet_name} content is different for sequence {sequence_run.sequence_run_id} from bssh event"
             )
@@ -237,9 +259,10 @@ def check_sequence_sample_sheet_from_bssh_event(
                 sample_sheet_content=content_dict,
                 sample_sheet_content_original=sample_sheet_content,  # Update original CSV as UTF-8 string
             )
-            sample_sheet_new_obj.save()
+            sample_sheet_new_obj.set_bssh_file(run_file)
+            ctx.add_sample_sheet(sample_sheet_new_obj)
             logger.info(
-                f"New sample sheet {sample_sheet_new_obj.sample_sheet_name} created for sequence {sequence_run.sequence_run_id} from bssh event"
+                f"New sample sheet {sample_sheet_new_obj.sample_sheet_name} to be created for sequence {sequence_run.sequence_run_id} from bssh event"
             )
             return SampleSheetDomain(
                 instrument_run_id=sequence_run.instrument_run_id,
@@ -261,9 +284,10 @@ def check_sequence_sample_sheet_from_bssh_event(
                 sample_sheet_content=content_dict,
                 sample_sheet_content_original=sample_sheet_content,  # Store original CSV as UTF-8 string
             )
-            sample_sheet_obj.save()
+            sample_sheet_obj.set_bssh_file(run_file)
+            ctx.add_sample_sheet(sample_sheet_obj)
             logger.info(
-                f"Successfully created sample sheet {sample_sheet_obj.sample_sheet_name} for sequence {sequence_run.sequence_run_id} from bssh event"
+                f"Sample sheet {sample_sheet_obj.sample_sheet_name} to be created for sequence {sequence_run.sequence_run_id} from bssh event"
             )
             return SampleSheetDomain(
                 instrument_run_id=sequence_run.instrument_run_id,
@@ -279,15 +303,15 @@ def check_sequence_sample_sheet_from_bssh_event(
             return None
 
 
-@transaction.atomic
 def create_sequence_sample_sheet(
-    sequence: Sequence, payload: dict
+    ctx: SequenceRunContext, payload: dict
 ) -> tuple[Optional[SampleSheet], Optional[str]]:
     """
-    Create a sample sheet for a sequence.
-    Check if sample sheet already exists before making API call.
+    Create the sample sheets of a sequence run, buffered in the event context.
+    Sample sheets already existing for the sequence run are skipped.
     If API call fails or returns no content, log error and return gracefully.
     """
+    sequence = ctx.sequence
     api_url = payload.get("apiUrl")
     if not api_url:
         logger.warning(
@@ -296,10 +320,11 @@ def create_sequence_sample_sheet(
         return None, None
 
     try:
-        bssh_srv = BSSHService()
+        bssh_srv = get_bssh_service()
         # Get all sample sheet from bssh run files
         sample_sheet_contents = bssh_srv.get_all_sample_sheet_from_bssh_run_files(
-            api_url
+            api_url,
+            run_files=ctx.get_bssh_run_files(api_url, bssh_srv.list_run_files),
         )
     except Exception as e:
         logger.error(
@@ -315,6 +340,9 @@ def create_sequence_sample_sheet(
 
     # Build list of SampleSheet objects to create, then bulk_create at the end
     sample_sheet_objs_to_create = []
+    existing_sample_sheet_names = {
+        sample_sheet.sample_sheet_name for sample_sheet in ctx.sample_sheets
+    }
 
     # instance and content for sequence sample sheet
     sequence_samplesheet: SampleSheet = None
@@ -323,9 +351,7 @@ def create_sequence_sample_sheet(
 
     for sample_sheet_content in sample_sheet_contents:
         # Check if the sample sheet already exists
-        if SampleSheet.objects.filter(
-            sequence=sequence, sample_sheet_name=sample_sheet_content["name"]
-        ).exists():
+        if sample_sheet_content["name"] in existing_sample_sheet_names:
             logger.info(
                 f"Sample sheet {sample_sheet_content['name']} already exists for sequence {sequence.sequence_run_id}"
             )
@@ -340,7 +366,7 @@ def create_sequence_sample_sheet(
 
         try:
             # Convert content to JSON format with v2_samplesheet_to_json function
-            content_dict = parse_samplesheet(sample_sheet_content["content"])
+            content_dict = parse_samplesheet_cached(sample_sheet_content["content"])
 
             sample_sheet_obj = SampleSheet(
                 sequence=sequence,
@@ -350,6 +376,7 @@ def create_sequence_sample_sheet(
                     "content"
                 ],  # Store original CSV as UTF-8 string
             )
+            sample_sheet_obj.set_bssh_file(sample_sheet_content.get("file"))
             sample_sheet_objs_to_create.append(sample_sheet_obj)
 
             if (
@@ -367,18 +394,9 @@ def create_sequence_sample_sheet(
             continue
 
     if sample_sheet_objs_to_create:
-        try:
-            SampleSheet.objects.bulk_create(sample_sheet_objs_to_create)
-            for obj in sample_sheet_objs_to_create:
-                logger.info(
-                    f"Successfully created sample sheet {obj.sample_sheet_name} for sequence {sequence.sequence_run_id}"
-                )
-            return sequence_samplesheet, sequence_samplesheet_content
-        except Exception as e:
-            logger.error(
-                f"Error bulk creating sample sheets for sequence {sequence.sequence_run_id}: {str(e)}."
-            )
-            return None, None
+        for obj in sample_sheet_objs_to_create:
+            ctx.add_sample_sheet(obj)
+        return sequence_samplesheet, sequence_samplesheet_content
     else:
         logger.info(
             f"No sample sheets to create for sequence {sequence.sequence_run_id}."
@@ -416,23 +434,46 @@ def calculate_checksum(
         Returns:
         str: Checksum as hexadecimal string, or empty string if content is None/empty
     """
-    if not sample_sheet_content_original:
-        return ""
-    try:
-        content_bytes = sample_sheet_content_original.encode("utf-8")
-        if checksum_type.lower() == "md5":
-            return hashlib.md5(content_bytes).hexdigest()
-        elif checksum_type.lower() == "crc32":
-            # CRC32 returns a signed integer, convert to unsigned and then to hex
-            crc32_value = zlib.crc32(content_bytes) & 0xFFFFFFFF
-            return format(crc32_value, "08x")
-        else:  # default to sha256
-            return hashlib.sha256(content_bytes).hexdigest()
-    except Exception as e:
-        logger.warning(
-            f"Failed to calculate {checksum_type} checksum from sample sheet content: {str(e)}"
+    checksum_type = checksum_type.lower()
+    if checksum_type not in SAMPLE_SHEET_CHECKSUM_TYPES:
+        checksum_type = "sha256"
+    checksums = calculate_sample_sheet_checksums(sample_sheet_content_original)
+    return checksums[checksum_type] or ""
+
+
+def get_or_create_ghost_sequence_sample_sheet(
+    instrument_run_id: str,
+    sample_sheet_name: str,
+    sample_sheet_content_original: str,
+    sample_sheet_content: dict,
+    checksum_sha256: str,
+) -> tuple[Sequence, Optional[SampleSheet]]:
+    """
+    Ghost (fake) sequence run of the instrument run for the sample sheet, keyed by the instrument run ID,
+    sample sheet name and content checksum. The ghost is created with its sample sheet, together; if it
+    already exists (a repeated event), it is returned with no sample sheet and nothing is written.
+    """
+    with transaction.atomic():
+        sequence, created = Sequence.objects.get_or_create_ghost(
+            instrument_run_id, sample_sheet_name, checksum_sha256
+        )
+        if not created:
+            logger.info(
+                f"Ghost sequence run {sequence.sequence_run_id} already exists for sample sheet {sample_sheet_name} "
+                f"of instrument run {instrument_run_id}, skipping"
+            )
+            return sequence, None
+
+        sample_sheet = SampleSheet.objects.create(
+            sequence=sequence,
+            sample_sheet_name=sample_sheet_name,
+            sample_sheet_content=sample_sheet_content,
+            sample_sheet_content_original=sample_sheet_content_original,  # Store original CSV as UTF-8 string
         )
-        return ""
+    logger.info(
+        f"Created a fake sequence run {sequence.sequence_run_id} for instrument run {instrument_run_id}"
+    )
+    return sequence, sample_sheet
 
 
 def validate_sample_sheet_from_wrsc_event(event_detail: dict):
@@ -450,21 +491,22 @@ def validate_sample_sheet_from_wrsc_event(event_detail: dict):
 
     # step 1: check if the sample sheet exists in the database
 
-    sequences = Sequence.objects.filter(instrument_run_id=instrument_run_id)
-    sample_sheets = SampleSheet.objects.filter(sequence__in=sequences)
-
     samplesheet_name = sample_sheet_uri.split("/")[-1]
-    matching_sample_sheet = sample_sheets.filter(sample_sheet_name=samplesheet_name)
-    for sample_sheet in matching_sample_sheet:
+    checksum_type = samplesheet_checksum_type.lower()
+    if checksum_type not in SAMPLE_SHEET_CHECKSUM_TYPES:
+        checksum_type = "sha256"
 
-        calculated_checksum = calculate_checksum(
-            sample_sheet.sample_sheet_content_original, samplesheet_checksum_type
+    # checksums are stored and indexed on write, so the match is a single lookup
+    sample_sheet = SampleSheet.objects.filter(
+        sequence__instrument_run_id=instrument_run_id,
+        sample_sheet_name=samplesheet_name,
+        **{f"checksum_{checksum_type}": samplesheet_checksum.lower()},
+    ).first()
+    if sample_sheet:
+        logger.info(
+            f"Sample sheet {sample_sheet.sample_sheet_name} found for instrument run {instrument_run_id}"
         )
-        if calculated_checksum == samplesheet_checksum:
-            logger.info(
-                f"Sample sheet {sample_sheet.sample_sheet_name} found for instrument run {instrument_run_id}"
-            )
-            return sample_sheet
+        return sample_sheet
 
     logger.info(
         f"No sample sheet found with name {samplesheet_name} for instrument run {instrument_run_id}, create a new "
@@ -476,7 +518,7 @@ def validate_sample_sheet_from_wrsc_event(event_detail: dict):
     samplesheet_content = None
     content_dict = None
     try:
-        ica_svc = ICAService()
+        ica_svc = get_ica_service()
         samplesheet_content = ica_svc.get_file_contents_from_uri(sample_sheet_uri)
     except Exception as e:
         logger.error(
@@ -485,30 +527,27 @@ def validate_sample_sheet_from_wrsc_event(event_detail: dict):
         return None
 
     if samplesheet_content:
-        content_dict = parse_samplesheet(samplesheet_content)
+        checksums = calculate_sample_sheet_checksums(samplesheet_content)
+        content_dict = parse_samplesheet_cached(
+            samplesheet_content, sha256=checksums["sha256"]
+        )
     else:
         logger.error(
             f"Error getting samplesheet content from sample sheet uri {sample_sheet_uri}."
         )
         return None
 
-    # create a new sequence object
-    sequence = Sequence.objects.create(
-        instrument_run_id=instrument_run_id,
-        sequence_run_id="r." + ulid.new().str,
-        sample_sheet_name=samplesheet_name,
-        start_time=timezone.now(),  # add start time to record the time when the (ghost) sequence run is created
-    )
-    logger.info(
-        f"Successfully created sequence {sequence.sequence_run_id} for instrument run {instrument_run_id}"
-    )
-
-    sample_sheet = SampleSheet.objects.create(
-        sequence=sequence,
-        sample_sheet_name=samplesheet_name,
-        sample_sheet_content=content_dict,
-        sample_sheet_content_original=samplesheet_content,  # Store original CSV as UTF-8 string
+    # get or create a fake sequence object with the sample sheet
+    sequence, sample_sheet = get_or_create_ghost_sequence_sample_sheet(
+        instrument_run_id,
+        samplesheet_name,
+        samplesheet_content,
+        content_dict,
+        checksums["sha256"],
     )
+    if sample_sheet is None:
+        # a repeated event, already recorded
+        return None
     logger.info(
         f"Successfully created sample sheet {sample_sheet.sample_sheet_name} for sequence {sequence.sequence_run_id} from wrsc event"
     )
@@ -0,0 +1,121 @@
+import binascii
+import logging
+import os
+import zlib
+from typing import Iterable, Optional
+
+import requests
+
+logger = logging.getLogger(__name__)
+
+# largest sample sheet accepted (decoded CSV bytes); real ones are well below 1 MB, this bounds the memory
+# a single sample sheet can take in a Lambda
+DEFAULT_SAMPLE_SHEET_MAX_BYTES = 32 * 1024 * 1024
+
+STREAM_CHUNK_SIZE = 64 * 1024
+# a multiple of 4, base64 characters decoded at a time
+BASE64_CHUNK_SIZE = 64 * 1024
+
+# gzip header and trailer, single or multiple members
+GZIP_WBITS = zlib.MAX_WBITS | 16
+
+
+class SampleSheetTooLargeError(ValueError):
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        super().__init__(
+            f"Sample sheet is larger than the maximum size of {max_bytes} bytes"
+        )
+
+
+def get_sample_sheet_max_bytes() -> int:
+    return int(os.environ.get("SAMPLE_SHEET_MAX_BYTES", DEFAULT_SAMPLE_SHEET_MAX_BYTES))
+
+
+class BoundedBuffer:
+    """Bytes accumulated up to max_bytes, SampleSheetTooLargeError is raised beyond"""
+
+    def __init__(self, max_bytes: Optional[int] = None):
+        self.max_bytes = (
+            max_bytes if max_bytes is not None else get_sample_sheet_max_bytes()
+        )
+        self._buffer = bytearray()
+
+    def __len__(self):
+        return len(self._buffer)
+
+    def check_size(self, size: int):
+        if size > self.max_bytes:
+            raise SampleSheetTooLargeError(self.max_bytes)
+
+    def extend(self, data: bytes):
+        self.check_size(len(self._buffer) + len(data))
+        self._buffer += data
+
+    def decode(self, encoding: str = "utf-8") -> str:
+        """Decoded content, the bytes are released"""
+        text = self._buffer.decode(encoding)
+        self._buffer = bytearray()
+        return text
+
+
+def read_response_text(
+    response: requests.Response, max_bytes: Optional[int] = None
+) -> str:
+    """
+    UTF-8 text of a streamed (`stream=True`) response body, read chunk by chunk and rejected as soon as it
+    exceeds max_bytes, without holding the body twice as `response.content` does.
+    """
+    buffer = BoundedBuffer(max_bytes)
+    try:
+        content_length = response.headers.get("Content-Length")
+        if content_length and content_length.isdigit():
+            # the encoded length, the decoded body is at least as large
+            buffer.check_size(int(content_length))
+        for chunk in response.iter_content(STREAM_CHUNK_SIZE):
+            buffer.extend(chunk)
+    finally:
+        response.close()
+    return buffer.decode()
+
+
+def iter_base64_decode(content_base64: str) -> Iterable[bytes]:
+    """Decode base64 content BASE64_CHUNK_SIZE characters at a time, line breaks are ignored"""
+    carry = ""
+    for offset in range(0, len(content_base64), BASE64_CHUNK_SIZE):
+        chunk = carry + "".join(
+            content_base64[offset : offset + BASE64_CHUNK_SIZE].split()
+        )
+        decodable_length = len(chunk) - len(chunk) % 4
+        carry = chunk[decodable_length:]
+        if decodable_length:
+            yield binascii.a2b_base64(chunk[:decodable_length])
+    if carry:
+        raise ValueError("Invalid base64 content: incomplete final block")
+
+
+def decode_base64_gzip_text(
+    content_base64_gz: str, max_bytes: Optional[int] = None
+) -> str:
+    """
+    UTF-8 text of base64 encoded gzip content (e.g. `samplesheetBase64gz`), decoded and decompressed
+    incrementally: neither the whole gzip bytes nor any uncompressed content beyond max_bytes is ever held.
+    """
+    buffer = BoundedBuffer(max_bytes)
+    decompressor = zlib.decompressobj(GZIP_WBITS)
+    for data in iter_base64_decode(content_base64_gz):
+        while data:
+            if decompressor.eof:
+                # next gzip member
+                decompressor = zlib.decompressobj(GZIP_WBITS)
+            # output limited to the next chunk, so that the size is checked before decompressing further
+            buffer.extend(decompressor.decompress(data, STREAM_CHUNK_SIZE))
+            data = (
+                decompressor.unused_data
+                if decompressor.eof
+                else decompressor.unconsumed_tail
+            )
+    buffer.extend(decompressor.flush())
+    if not decompressor.eof:
+        raise ValueError("Invalid gzip content: truncated")
+    return buffer.decode()
@@ -0,0 +1,87 @@
+import base64
+import logging
+import os
+import threading
+import time
+from typing import Callable, Dict, Tuple
+
+from libumccr.aws import libsm
+
+logger = logging.getLogger(__name__)
+
+# how long a secret (access token) is used before being read again from Secrets Manager, so that a
+# rotated token is picked up by warm Lambdas
+DEFAULT_SECRET_TTL_SECONDS = 300
+
+
+def get_secret_value(secret_id: str) -> str:
+    """
+    Secret read from Secrets Manager. Not through `libsm.get_secret`, which keeps the secrets it reads in an
+    LRU cache of its own, with no expiry: an expired or invalidated secret would be read again from there.
+    """
+    response = libsm.sm_client().get_secret_value(SecretId=secret_id)
+    if "SecretString" in response:
+        return response["SecretString"]
+    return base64.b64decode(response["SecretBinary"])
+
+
+class SecretCache:
+    """
+    Thread-safe, TTL-bounded cache of Secrets Manager secrets, keyed by secret id.
+
+    Entries are refreshed once expired, or on demand with `invalidate()` (e.g. after a 401 response);
+    concurrent callers of an expired or missing entry wait for a single Secrets Manager call.
+    """
+
+    def __init__(
+        self,
+        ttl_seconds: float = DEFAULT_SECRET_TTL_SECONDS,
+        fetch: Callable[[str], str] = None,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.ttl_seconds = ttl_seconds
+        self._fetch = fetch or get_secret_value
+        self._clock = clock
+        self._entries: Dict[str, Tuple[str, float]] = {}
+        self._lock = threading.Lock()
+
+    def get(self, secret_id: str) -> str:
+        entry = self._entries.get(secret_id)
+        if entry is not None and entry[1] > self._clock():
+            return entry[0]
+
+        with self._lock:
+            # refreshed by another thread while waiting for the lock
+            entry = self._entries.get(secret_id)
+            if entry is not None and entry[1] > self._clock():
+                return entry[0]
+
+            logger.info(f"Retrieving secret {secret_id} from Secrets Manager")
+            value = self._fetch(secret_id)
+            if value:
+                self._entries[secret_id] = (value, self._clock() + self.ttl_seconds)
+            return value
+
+    def invalidate(self, secret_id: str):
+        with self._lock:
+            self._entries.pop(secret_id, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+# process-wide, shared across warm Lambda invocations
+secret_cache = SecretCache(
+    ttl_seconds=float(
+        os.environ.get("SECRET_CACHE_TTL_SECONDS", DEFAULT_SECRET_TTL_SECONDS)
+    )
+)
+
+
+def get_cached_secret(secret_id: str) -> str:
+    return secret_cache.get(secret_id)
+
+
+def invalidate_secret(secret_id: str):
+    secret_cache.invalidate(secret_id)
@@ -3,90 +3,58 @@ from django.utils import timezone
 import logging
 
 from sequence_run_manager.models.sequence import Sequence, LibraryAssociation
-from sequence_run_manager.models.sample_sheet import SampleSheet
 from sequence_run_manager_proc.services.bssh_srv import BSSHService
+from sequence_run_manager_proc.services.sequence_srv import get_bssh_run_details
 from sequence_run_manager_proc.domain.librarylinking import LibraryLinkingDomain
+from sequence_run_manager_proc.services.sequence_run_context import SequenceRunContext
 from typing import Optional
 
 logger = logging.getLogger(__name__)
 
-ASSOCIATION_STATUS = "ACTIVE"
-
-
-@transaction.atomic
-def create_sequence_run_libraries_linking(
-    sequence_run: Sequence, linked_libraries: list[str]
-):
-    """
-    Create sequence run libraries linking
-    """
-
-    # Build list of LibraryAssociation objects to create, then bulk_create at the end
-    library_associations_to_create = []
-    for library_id in linked_libraries:
-        library_associations_to_create.append(
-            LibraryAssociation(
-                sequence=sequence_run,
-                library_id=library_id,
-                association_date=timezone.now(),
-                status=ASSOCIATION_STATUS,
-            )
-        )
-    LibraryAssociation.objects.bulk_create(library_associations_to_create)
-    logger.info(
-        f"Library associations created for sequence run {sequence_run.sequence_run_id}, linked libraries: {linked_libraries}"
-    )
-
 
 def update_sequence_run_libraries_linking(
     sequence_run: Sequence, linked_libraries: list[str]
-):
+) -> tuple[set[str], set[str]]:
     """
-    Update sequence run libraries linking
+    Update sequence run libraries linking, only the libraries added or removed are written.
+    Returns the (added, removed) library id sets.
     """
-    if (
-        LibraryAssociation.objects.filter(sequence=sequence_run).exists()
-        and linked_libraries
-    ):
-        existing_libraries = LibraryAssociation.objects.filter(
-            sequence=sequence_run
-        ).values_list("library_id", flat=True)
-        if existing_libraries and set(existing_libraries) == set(linked_libraries):
-            logger.info(
-                f"Library associations already exist for sequence run {sequence_run.sequence_run_id}, linked libraries: {linked_libraries}"
-            )
-            return
-        else:
-            LibraryAssociation.objects.filter(sequence=sequence_run).delete()
-            logger.info(
-                f"Library associations deleted for sequence run {sequence_run.sequence_run_id}, linked libraries: {linked_libraries}"
-            )
-
     if not linked_libraries:
         logger.info(
             f"No libraries found for sequence run {sequence_run.sequence_run_id}, skipping library associations creation"
         )
-        return
+        return set(), set()
     try:
-        create_sequence_run_libraries_linking(sequence_run, linked_libraries)
+        added, removed = LibraryAssociation.objects.link_libraries(
+            sequence_run, linked_libraries
+        )
     except Exception as e:
         logger.error(
-            f"Error creating library associations for sequence {sequence_run.sequence_run_id}: {str(e)}. Will retry on next state change."
+            f"Error updating library associations for sequence {sequence_run.sequence_run_id}: {str(e)}. Will retry on next state change."
         )
-        return
+        return set(), set()
+
+    if not added and not removed:
+        logger.info(
+            f"Library associations already exist for sequence run {sequence_run.sequence_run_id}, linked libraries: {linked_libraries}"
+        )
+    else:
+        logger.info(
+            f"Library associations updated for sequence run {sequence_run.sequence_run_id}, added libraries: {sorted(added)}, removed libraries: {sorted(removed)}"
+        )
+    return added, removed
 
 
-def get_libraries_from_bssh(api_url: str) -> list[str]:
+def get_libraries_from_bssh(ctx: SequenceRunContext) -> list[str]:
     """
-    Get libraries from bssh
+    Get libraries from bssh run details
     """
-    bssh_srv = BSSHService()
-    run_details = bssh_srv.get_run_details(api_url)
+    run_details = ctx.get_bssh_run_details(get_bssh_run_details)
     return BSSHService.get_libraries_from_run_details(run_details)
 
 
 def check_sequence_run_libraries_linking_from_bssh_event(
-    payload: dict, force_check: bool = False
+    payload: dict, ctx: SequenceRunContext, force_check: bool = False
 ) -> Optional[LibraryLinkingDomain]:
     """
     Check if libraries are linked to the sequence run;
@@ -96,26 +64,17 @@ def check_sequence_run_libraries_linking_from_bssh_event(
     otherwise, we will skip checking if libraries are already linked
     """
     assert payload["id"] is not None, "sequence run id is required"
-
-    try:
-        sequence_run = Sequence.objects.get(sequence_run_id=payload["id"])
-    except Sequence.DoesNotExist:
-        logger.error(
-            f"Sequence run {payload['id']} not found when checking or creating sequence run libraries linking"
-        )
-        return None
+    sequence_run = ctx.sequence
 
     # check if there is any library association for this sequence run, if so, skip creation
-    if (
-        not force_check
-        and LibraryAssociation.objects.filter(sequence=sequence_run).exists()
-    ):
+    if not force_check and ctx.library_ids:
         logger.info(
             f"Library associations already exist for sequence run {sequence_run.sequence_run_id}, skipping creation"
         )
         return None
 
     linked_libraries = []
+    sample_sheet = None
 
     if not payload.get("sampleSheetName", None):
         logger.info(
@@ -127,7 +86,7 @@ def check_sequence_run_libraries_linking_from_bssh_event(
                     f"No API URL available for sequence {sequence_run.sequence_run_id}, cannot fetch libraries from BSSH"
                 )
                 return None
-            linked_libraries = get_libraries_from_bssh(sequence_run.api_url)
+            linked_libraries = get_libraries_from_bssh(ctx)
         except Exception as e:
             logger.error(
                 f"Error fetching libraries from BSSH API for sequence {sequence_run.sequence_run_id}: {str(e)}. Will retry on next state change."
@@ -135,13 +94,7 @@ def check_sequence_run_libraries_linking_from_bssh_event(
             return None
     else:
         # Get the latest sample sheet by association_timestamp
-        sample_sheet = (
-            SampleSheet.objects.filter(
-                sequence=sequence_run, sample_sheet_name=payload["sampleSheetName"]
-            )
-            .order_by("-association_timestamp")
-            .first()
-        )
+        sample_sheet = ctx.get_latest_sample_sheet(payload["sampleSheetName"])
 
         if sample_sheet:
             logger.info(
@@ -174,7 +127,7 @@ def check_sequence_run_libraries_linking_from_bssh_event(
                     )
                     return None
 
-                linked_libraries = get_libraries_from_bssh(sequence_run.api_url)
+                linked_libraries = get_libraries_from_bssh(ctx)
 
             except Exception as e:
                 logger.error(
@@ -189,46 +142,31 @@ def check_sequence_run_libraries_linking_from_bssh_event(
         return None
 
     # if libraries are already linked, check if the libraries are the same
-    if LibraryAssociation.objects.filter(sequence=sequence_run).exists():
-        existing_libraries = LibraryAssociation.objects.filter(
-            sequence=sequence_run
-        ).values_list("library_id", flat=True)
-        if set(existing_libraries) == set(linked_libraries):
-            logger.info(
-                f"Library associations already exist for sequence run {sequence_run.sequence_run_id}, linked libraries: {linked_libraries}"
-            )
-            return None
-        else:
-            LibraryAssociation.objects.filter(sequence=sequence_run).delete()
-            logger.info(
-                f"Library associations deleted for sequence run {sequence_run.sequence_run_id}"
-            )
-
-    try:
-        create_sequence_run_libraries_linking(sequence_run, linked_libraries)
+    if set(ctx.library_ids) == set(linked_libraries):
         logger.info(
-            f"Library associations created for sequence run {sequence_run.sequence_run_id}, linked libraries: {linked_libraries}"
-        )
-
-        # Get timestamp from sample sheet if available, otherwise use current time
-        if sample_sheet and sample_sheet.association_timestamp:
-            timestamp = sample_sheet.association_timestamp
-        else:
-            timestamp = timezone.now()
-
-        return LibraryLinkingDomain(
-            instrument_run_id=sequence_run.instrument_run_id,
-            sequence_run_id=sequence_run.sequence_run_id,
-            linked_libraries=linked_libraries,
-            timestamp=timestamp,
-            library_linking_has_changed=True,
-        )
-    except Exception as e:
-        logger.error(
-            f"Error creating library associations for sequence {sequence_run.sequence_run_id}: {str(e)}. Will retry on next state change."
+            f"Library associations already exist for sequence run {sequence_run.sequence_run_id}, linked libraries: {linked_libraries}"
         )
         return None
 
+    # written by the event context flush
+    added, removed = ctx.set_library_ids(linked_libraries)
+
+    # Get timestamp from sample sheet if available, otherwise use current time
+    if sample_sheet and sample_sheet.association_timestamp:
+        timestamp = sample_sheet.association_timestamp
+    else:
+        timestamp = timezone.now()
+
+    return LibraryLinkingDomain(
+        instrument_run_id=sequence_run.instrument_run_id,
+        sequence_run_id=sequence_run.sequence_run_id,
+        linked_libraries=linked_libraries,
+        timestamp=timestamp,
+        library_linking_has_changed=True,
+        added_libraries=sorted(added),
+        removed_libraries=sorted(removed),
+    )
+
 
 @transaction.atomic
 def update_sequence_run_libraries_linking_from_srllc_event(event_detail: dict):
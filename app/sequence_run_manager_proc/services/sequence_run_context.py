@@ -0,0 +1,195 @@
+import logging
+from typing import Any, Callable, Optional
+
+from django.db import transaction
+from django.utils import timezone
+
+from sequence_run_manager.models.sequence import Sequence, LibraryAssociation
+from sequence_run_manager.models.sample_sheet import SampleSheet
+from sequence_run_manager.models.sequence_run_details import SequenceRunDetails
+
+logger = logging.getLogger(__name__)
+
+
+class SequenceRunContext:
+    """
+    Per-event unit of work for a sequence run.
+
+    The sequence run is passed in once, its sample sheets and linked libraries are loaded lazily (at
+    most one query each) on first access, and service functions handling the same event read them
+    from here instead of re-querying. Sample sheet and library linking writes are buffered and
+    written together by `flush()`. BSSH run file listings are memoized the same way, per run API URL,
+    and so are the BSSH run details (recorded on flush when fetched).
+
+    The BSSH event handler fills it in with no transaction open, so that no BSSH API call is made while
+    the sequence run is locked, and flushes it in a short transaction of its own.
+    """
+
+    def __init__(self, sequence: Sequence, run_details_recorded: bool = True):
+        """run_details_recorded=False tells that there are no recorded run details yet (new sequence run)"""
+        self.sequence = sequence
+        self._sample_sheets: Optional[list[SampleSheet]] = None
+        self._library_ids: Optional[list[str]] = None
+        # library ids as in the database, to diff the buffered changes against on flush
+        self._persisted_library_ids: Optional[list[str]] = None
+
+        self._new_sample_sheets: list[SampleSheet] = []
+        self._updated_sample_sheets: list[SampleSheet] = []
+        self._library_ids_changed = False
+        self._sequence_changed = False
+
+        self._bssh_run_files: dict[str, list[dict[str, Any]]] = {}
+        self._bssh_run_details: Optional[dict[str, Any]] = None
+        self._run_details_recorded = run_details_recorded
+        # recorded run details to be replaced on flush by the ones fetched, if any
+        self._fetched_run_details: Optional[
+            tuple[dict[str, Any], Optional[SequenceRunDetails]]
+        ] = None
+
+    @property
+    def sample_sheets(self) -> list[SampleSheet]:
+        """Sample sheets of the sequence run, including buffered ones, oldest first"""
+        if self._sample_sheets is None:
+            self._sample_sheets = list(
+                SampleSheet.objects.filter(sequence=self.sequence).order_by(
+                    "association_timestamp"
+                )
+            )
+        return self._sample_sheets
+
+    @property
+    def library_ids(self) -> list[str]:
+        """Library ids linked to the sequence run, including buffered changes"""
+        if self._library_ids is None:
+            self._load_library_ids()
+        return self._library_ids
+
+    def _load_library_ids(self):
+        self._library_ids = list(
+            LibraryAssociation.objects.filter(sequence=self.sequence).values_list(
+                "library_id", flat=True
+            )
+        )
+        self._persisted_library_ids = list(self._library_ids)
+
+    def get_bssh_run_files(
+        self, api_url: str, list_run_files: Callable[[str], list[dict[str, Any]]]
+    ) -> list[dict[str, Any]]:
+        """Files of the BSSH run at api_url, listed with list_run_files on first access"""
+        if api_url not in self._bssh_run_files:
+            self._bssh_run_files[api_url] = list_run_files(api_url)
+        return self._bssh_run_files[api_url]
+
+    def get_bssh_run_details(
+        self, get_run_details: Callable[[str], dict[str, Any]]
+    ) -> dict[str, Any]:
+        """
+        BSSH run details of the sequence run: the recorded ones if they were fetched at the current run
+        status, otherwise (first call, or the status has changed since) fetched with get_run_details from
+        the run API URL, to be recorded on flush.
+        """
+        if self._bssh_run_details is None:
+            sequence_run_details = (
+                SequenceRunDetails.objects.get_for_sequence(self.sequence)
+                if self._run_details_recorded
+                else None
+            )
+            if sequence_run_details is not None and sequence_run_details.is_fetched_at(
+                self.sequence.status
+            ):
+                self._bssh_run_details = sequence_run_details.run_details
+            else:
+                logger.info(
+                    f"Fetching run details from BSSH (sequence_run_id={self.sequence.sequence_run_id}, status={self.sequence.status})"
+                )
+                self._bssh_run_details = get_run_details(self.sequence.api_url)
+                self._fetched_run_details = (
+                    self._bssh_run_details,
+                    sequence_run_details,
+                )
+        return self._bssh_run_details
+
+    def get_latest_sample_sheet(
+        self, sample_sheet_name: Optional[str] = None
+    ) -> Optional[SampleSheet]:
+        """Latest sample sheet by association timestamp, optionally of the given name"""
+        sample_sheets = [
+            sample_sheet
+            for sample_sheet in self.sample_sheets
+            if sample_sheet_name is None
+            or sample_sheet.sample_sheet_name == sample_sheet_name
+        ]
+        return sample_sheets[-1] if sample_sheets else None
+
+    def add_sample_sheet(self, sample_sheet: SampleSheet):
+        """Buffer a new sample sheet of the sequence run, to be created on flush"""
+        sample_sheet.sequence = self.sequence
+        # provisional, set again by auto_now_add on insert
+        sample_sheet.association_timestamp = timezone.now()
+        self.sample_sheets.append(sample_sheet)
+        self._new_sample_sheets.append(sample_sheet)
+
+    def update_sample_sheet_bssh_file(
+        self, sample_sheet: SampleSheet, bssh_file: Optional[dict]
+    ):
+        """Buffer the update of the BSSH file a sample sheet was downloaded from, to be written on flush"""
+        sample_sheet.set_bssh_file(bssh_file)
+        self._updated_sample_sheets.append(sample_sheet)
+
+    def update_sequence(self):
+        """Buffer the update of the (changed fields of the) sequence run, to be written on flush"""
+        self._sequence_changed = True
+
+    def set_library_ids(self, library_ids: list[str]) -> tuple[set[str], set[str]]:
+        """
+        Buffer the replacement of the linked libraries, to be written on flush.
+        Returns the (added, removed) library id sets against the linking in the database.
+        """
+        if self._persisted_library_ids is None:
+            self._load_library_ids()
+        persisted_library_ids = set(self._persisted_library_ids)
+        self._library_ids = list(dict.fromkeys(library_ids))
+        self._library_ids_changed = True
+        return (
+            set(self._library_ids) - persisted_library_ids,
+            persisted_library_ids - set(self._library_ids),
+        )
+
+    @transaction.atomic
+    def flush(self):
+        """Write all buffered changes in one transaction"""
+        if self._sequence_changed:
+            self.sequence.save(fast=True)
+            self._sequence_changed = False
+
+        if self._fetched_run_details is not None:
+            SequenceRunDetails.objects.store(self.sequence, *self._fetched_run_details)
+            self._fetched_run_details = None
+
+        if self._new_sample_sheets:
+            SampleSheet.objects.bulk_create(self._new_sample_sheets)
+            for sample_sheet in self._new_sample_sheets:
+                logger.info(
+                    f"Successfully created sample sheet {sample_sheet.sample_sheet_name} for sequence {self.sequence.sequence_run_id}"
+                )
+            self._new_sample_sheets = []
+
+        for sample_sheet in self._updated_sample_sheets:
+            SampleSheet.objects.filter(orcabus_id=sample_sheet.orcabus_id).update(
+                bssh_file_size=sample_sheet.bssh_file_size,
+                bssh_file_date_modified=sample_sheet.bssh_file_date_modified,
+                bssh_file_etag=sample_sheet.bssh_file_etag,
+            )
+        self._updated_sample_sheets = []
+
+        if self._library_ids_changed:
+            added, removed = LibraryAssociation.objects.link_libraries(
+                self.sequence,
+                self._library_ids,
+                existing_library_ids=self._persisted_library_ids,
+            )
+            logger.info(
+                f"Library associations updated for sequence run {self.sequence.sequence_run_id}, added libraries: {sorted(added)}, removed libraries: {sorted(removed)}"
+            )
+            self._persisted_library_ids = list(self._library_ids)
+            self._library_ids_changed = False
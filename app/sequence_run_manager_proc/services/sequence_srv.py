@@ -6,7 +6,8 @@ from django.db import transaction
 from sequence_run_manager.models.sequence import Sequence, SequenceStatus
 from sequence_run_manager.models.state import State
 from sequence_run_manager_proc.domain.sequence import SequenceDomain
-from sequence_run_manager_proc.services.bssh_srv import BSSHService
+from sequence_run_manager_proc.services.bssh_srv import get_bssh_service
+from sequence_run_manager_proc.services.sequence_run_context import SequenceRunContext
 
 # from data_processors.pipeline.tools import liborca
 
@@ -24,6 +25,7 @@ def create_or_update_sequence_from_bssh_event(payload: dict) -> SequenceDomain:
     """
     Payload dict is sourced from BSSH Run event
     Here, we map BSSH event body attributes to our Sequence model
+    No BSSH API call is made here, the sequence run is enriched by `enrich_sequence_with_run_details`
 
     BSSH event body has the following JSON content
     NOTE: values are mocked
@@ -59,16 +61,20 @@ def create_or_update_sequence_from_bssh_event(payload: dict) -> SequenceDomain:
         # calculate timing info
         timing_info = calculate_timing_info(date_modified, status)
 
-        # flag to show if new sequence is created
-        is_new_sequence = False
-
-        # get or create sequence
-        sequence = Sequence.objects.filter(sequence_run_id=run_id).first()
+        # existing sequence is the common case (duplicate or later state events), lock it against
+        # racing events of the same run
+        sequence = (
+            Sequence.objects.select_for_update().filter(sequence_run_id=run_id).first()
+        )
 
+        is_new_sequence = False
         if not sequence:
-            is_new_sequence = True
             sequence = create_new_sequence(run_id, payload, status, timing_info)
-        else:
+            is_new_sequence = sequence is not None
+        if not sequence:
+            # created by a racing event in the meantime
+            sequence = Sequence.objects.select_for_update().get(sequence_run_id=run_id)
+        if not is_new_sequence:
             sequence = update_existing_sequence(sequence, payload)
 
         # create sequence domain
@@ -94,8 +100,11 @@ def calculate_timing_info(
 
 def create_new_sequence(
     run_id: str, payload: Dict, status: SequenceStatus, timing_info: Dict
-) -> Sequence:
-    """Create a new sequence record"""
+) -> Optional[Sequence]:
+    """
+    Create a new sequence record with `INSERT ... ON CONFLICT DO NOTHING`.
+    Returns None if a sequence with the same sequence_run_id already exists.
+    """
     logger.info(f"Creating new Sequence (sequence_run_id={run_id})")
 
     sequence = Sequence(
@@ -119,25 +128,30 @@ def create_new_sequence(
         sequence_run_name=payload.get("name", SequenceConfig.UNKNOWN_VALUE),
     )
 
-    if payload.get("apiUrl"):
-        enrich_sequence_with_run_details(sequence, payload["apiUrl"])
+    if not Sequence.objects.insert_or_ignore(sequence, ["sequence_run_id"]):
+        logger.info(f"Sequence (sequence_run_id={run_id}) already exists")
+        return None
 
-    sequence.save()
     logger.info(
         f"Created new Sequence (sequence_run_id={run_id}, status={status.value})"
     )
     return sequence
 
 
-def enrich_sequence_with_run_details(sequence: Sequence, api_url: str) -> None:
+def enrich_sequence_with_run_details(ctx: SequenceRunContext) -> None:
     """
-    Fetch and add run details from BSSH API
-    Note: currently only experiment name is fetched, more details can be added here
+    Add run details from BSSH API (recorded in SequenceRunDetails, see `SequenceRunContext.get_bssh_run_details`)
+    to a sequence run with a new status and no experiment name yet (new, or enrichment failed earlier).
+    The sequence run is updated on flush of ctx.
+    Note: currently only experiment name is set, more details can be added here
     """
+    sequence = ctx.sequence
+    if sequence.experiment_name or not sequence.api_url:
+        return
     try:
-        bssh_service = BSSHService()
-        run_details = bssh_service.get_run_details(api_url)
+        run_details = ctx.get_bssh_run_details(get_bssh_run_details)
         sequence.experiment_name = run_details.get("ExperimentName")
+        ctx.update_sequence()
         logger.info(
             f"Enriched Sequence (sequence_run_id={sequence.sequence_run_id}, experiment_name={sequence.experiment_name})"
         )
@@ -146,6 +160,11 @@ def enrich_sequence_with_run_details(sequence: Sequence, api_url: str) -> None:
         return
 
 
+def get_bssh_run_details(api_url: str) -> dict:
+    """BSSH run details of the run at api_url, fetched from BSSH API"""
+    return get_bssh_service().get_run_details(api_url)
+
+
 def update_existing_sequence(sequence: Sequence, payload: Dict) -> Sequence:
     """Update an existing sequence record"""
 
@@ -172,7 +191,7 @@ def update_existing_sequence(sequence: Sequence, payload: Dict) -> Sequence:
         f"Updating Sequence successfully (sequence_run_id={sequence.sequence_run_id}, instrument_run_id={sequence.instrument_run_id})"
     )
 
-    sequence.save()
+    sequence.save(fast=True)
     return sequence
 
 
@@ -187,7 +206,8 @@ def create_sequence_domain(
     Create SequenceDomain with change tracking
 
     state_changed to be true if:
-    - new state is created (state has unique status, timestamp combination as duplicate events detection)
+    - new state is created (state has unique sequence, status, timestamp combination as duplicate events detection),
+      the state is recorded here with a single upsert statement
 
     status_changed to be true if:
     - new sequence is created
@@ -201,10 +221,11 @@ def create_sequence_domain(
 
     """
 
-    # check if state exists
-    state_exists = State.objects.filter(
-        sequence=sequence, timestamp=timing_info["start_time"], status=state
-    ).exists()
+    # record the state, an existing (sequence, timestamp, status) state means a duplicate event
+    state_created = State.objects.insert_or_ignore(
+        State(sequence=sequence, timestamp=timing_info["start_time"], status=state),
+        ["sequence", "timestamp", "status"],
+    )
 
     # check instrument upload complete
     sample_sheet_ready = (
@@ -215,7 +236,7 @@ def create_sequence_domain(
         and sequence.instrument_run_id != SequenceConfig.UNKNOWN_VALUE
     )
 
-    if state_exists:
+    if not state_created:
         return SequenceDomain(
             sequence=sequence,
             status_has_changed=False,
@@ -243,12 +264,13 @@ def create_sequence_domain(
         )
         sequence.status = status
         sequence.end_time = timing_info["end_time"]
-        sequence.save()
+        sequence.save(fast=True)
 
     return SequenceDomain(
         sequence=sequence,
         status_has_changed=status_changed,
         state_has_changed=True,
+        is_new_sequence=is_new_sequence,
         is_reconversion=is_reconversion,
         sample_sheet_ready=sample_sheet_ready,
     )
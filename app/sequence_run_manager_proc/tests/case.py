@@ -1,12 +1,22 @@
+import gzip
 import logging
 import os
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
 from django.test import TestCase
 from libumccr import aws
 from libumccr.aws import libsqs, libeb, libsm
 from mockito import when, unstub, mock
 from unittest.mock import patch, MagicMock
 
+from sequence_run_manager_proc.domain.sequence import emergency_stop_list
+from sequence_run_manager_proc.services import bssh_srv, http_session, ica_srv
 from sequence_run_manager_proc.services.bssh_srv import BSSHService
+from sequence_run_manager_proc.services.sample_sheet_parse_cache import (
+    sample_sheet_parse_cache,
+)
+from sequence_run_manager_proc.services.secret_cache import secret_cache
 from sequence_run_manager_proc.tests.factories import SequenceRunManagerProcFactory
 
 logger = logging.getLogger()
@@ -25,12 +35,18 @@ class SequenceRunProcUnitTestCase(TestCase):
         when(libsqs).sqs_client(...).thenReturn(mock_sqs)
 
         mock_eb = MagicMock()
-        mock_eb.put_events.return_value = {"FailedEntryCount": 0, "Entries": [{"EventId": "test-event-id"}]}
+        mock_eb.put_events.return_value = {
+            "FailedEntryCount": 0,
+            "Entries": [{"EventId": "test-event-id"}],
+        }
         when(aws).eb_client(...).thenReturn(mock_eb)
         when(libeb).eb_client(...).thenReturn(mock_eb)
 
-        # Mock Secrets Manager client
+        # Mock Secrets Manager client, see `mock_secret`
+        self.secrets = {}
         mock_sm = MagicMock()
+        mock_sm.get_secret_value.side_effect = self.get_secret_value
+        self.mock_sm = mock_sm
         when(aws).sm_client(...).thenReturn(mock_sm)
         when(libsm).sm_client(...).thenReturn(mock_sm)
 
@@ -41,14 +57,20 @@ class SequenceRunProcUnitTestCase(TestCase):
             "https://test.sequence.prod.umccr.org"
         )
 
-        # Mock the libsm.get_secret function
-        when(libsm).get_secret("test").thenReturn("mock-token")
+        self.mock_secret("test", "mock-token")
+        # process-wide token cache and services, not shared between tests
+        secret_cache.clear()
+        bssh_srv.reset_bssh_service()
+        ica_srv.reset_ica_service()
+        emergency_stop_list.clear()
+        sample_sheet_parse_cache.clear()
 
         mock_run_details = SequenceRunManagerProcFactory.mock_bssh_run_details()
         mock_sample_sheet = SequenceRunManagerProcFactory.mock_bssh_sample_sheet()
         mock_bssh_service = mock(BSSHService)
 
         when(mock_bssh_service).get_run_details(...).thenReturn(mock_run_details)
+        when(mock_bssh_service).list_run_files(...).thenReturn([])
         when(mock_bssh_service).get_sample_sheet_from_bssh_run_files(...).thenReturn(
             mock_sample_sheet
         )
@@ -56,27 +78,39 @@ class SequenceRunProcUnitTestCase(TestCase):
             ...
         ).thenReturn([{"name": "SampleSheet.csv", "content": mock_sample_sheet}])
 
-        # Use patch to replace the BSSHService class with our mock
+        # Use patch to replace the BSSHService singleton with our mock
         patcher_seq = patch(
-            "sequence_run_manager_proc.services.sequence_srv.BSSHService",
-            return_value=mock_bssh_service,
-        )
-        patcher_lib = patch(
-            "sequence_run_manager_proc.services.sequence_library_srv.BSSHService",
+            "sequence_run_manager_proc.services.sequence_srv.get_bssh_service",
             return_value=mock_bssh_service,
         )
         patcher_sample_sheet = patch(
-            "sequence_run_manager_proc.services.sample_sheet_srv.BSSHService",
+            "sequence_run_manager_proc.services.sample_sheet_srv.get_bssh_service",
             return_value=mock_bssh_service,
         )
 
-        self.mock_bssh_class_lib = patcher_lib.start()
         self.mock_bssh_class_seq = patcher_seq.start()
         self.mock_bssh_class_sample_sheet = patcher_sample_sheet.start()
-        self.addCleanup(patcher_lib.stop)
         self.addCleanup(patcher_seq.stop)
         self.addCleanup(patcher_sample_sheet.stop)
 
+    def mock_secret(self, secret_id: str, *values: str):
+        """Values of the secret in Secrets Manager, one per read (the last one for all the later reads)"""
+        self.secrets[secret_id] = list(values)
+
+    def get_secret_value(self, SecretId: str) -> dict:
+        values = self.secrets[SecretId]
+        return {"SecretString": values.pop(0) if len(values) > 1 else values[0]}
+
+    def secret_reads(self, secret_id: str) -> int:
+        """Number of reads of the secret from Secrets Manager"""
+        return len(
+            [
+                call
+                for call in self.mock_sm.get_secret_value.call_args_list
+                if call.kwargs["SecretId"] == secret_id
+            ]
+        )
+
     def tearDown(self) -> None:
         # Clean up environment variables
         if "EVENT_BUS_NAME" in os.environ:
@@ -103,5 +137,64 @@ class SequenceRunProcUnitTestCase(TestCase):
         logger.info(f"-" * 32)
 
 
+class StubHandler(BaseHTTPRequestHandler):
+    """
+    Serves the responses queued for a path in `server.responses`, (status, headers, body, delay) each,
+    and records (path, client port, request headers) in `server.requests`. Responses queued for the path
+    with its query string take precedence.
+    """
+
+    protocol_version = "HTTP/1.1"  # keep-alive
+
+    def do_GET(self):
+        self.server.requests.append(
+            (self.path, self.client_address[1], dict(self.headers))
+        )
+        responses = self.server.responses.get(self.path) or self.server.responses.get(
+            self.path.split("?")[0], []
+        )
+        status, headers, body, delay = (
+            responses.pop(0) if responses else (404, {}, b"", 0)
+        )
+        if delay:
+            time.sleep(delay)
+
+        if "gzip" in self.headers.get("Accept-Encoding", ""):
+            body = gzip.compress(body)
+            headers = {**headers, "Content-Encoding": "gzip"}
+        self.send_response(status)
+        for name, value in headers.items():
+            self.send_header(name, value)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        logger.debug(format % args)
+
+
+class StubHttpServerTestCase(SequenceRunProcUnitTestCase):
+    """Unit test case with a local stub HTTP server at `self.base_url`, see `StubHandler`"""
+
+    def setUp(self) -> None:
+        super().setUp()
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), StubHandler)
+        self.server.daemon_threads = True
+        self.server.responses = {}
+        self.server.requests = []
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.base_url = f"http://127.0.0.1:{self.server.server_address[1]}"
+        http_session.reset_session()
+
+    def tearDown(self) -> None:
+        http_session.reset_session()
+        self.server.shutdown()
+        self.server.server_close()
+        super().tearDown()
+
+    def respond(self, path, *responses):
+        self.server.responses[path] = list(responses)
+
+
 class SequenceRunProcIntegrationTestCase(TestCase):
     pass
@@ -1,5 +1,8 @@
 import os
+from unittest.mock import MagicMock, patch
 
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
 from libumccr import libjson
 from libumccr.aws import libssm, libeb
 from mockito import when, verify
@@ -11,12 +14,19 @@ from sequence_run_manager.models.sequence import (
 )
 from sequence_run_manager.models.state import State
 from sequence_run_manager.models.sample_sheet import SampleSheet
+from sequence_run_manager.models.event_outbox import EventOutbox, EventOutboxStatus
+from sequence_run_manager.models.sequence_run_details import SequenceRunDetails
 from sequence_run_manager.tests.factories import TestConstant
 from sequence_run_manager_proc.tests.factories import SequenceRunManagerProcFactory
-from sequence_run_manager_proc.lambdas import bssh_event
+from sequence_run_manager_proc.lambdas import bssh_event, outbox_relay
+from sequence_run_manager_proc.services import sample_sheet_srv, sequence_library_srv
+from sequence_run_manager_proc.services.sequence_run_context import SequenceRunContext
 from sequence_run_manager_proc.services.bssh_srv import BSSHService
 from sequence_run_manager_proc.tests.case import logger, SequenceRunProcUnitTestCase
-from sequence_run_manager_proc.domain.sequence import SequenceRuleError
+from sequence_run_manager_proc.domain.sequence import (
+    EmergencyStopList,
+    SequenceRuleError,
+)
 
 """
 example event:
@@ -54,6 +64,17 @@ example event:
 
 
 class BSSHEventUnitTests(SequenceRunProcUnitTestCase):
+    def mock_emergency_stop_list(self, instrument_run_ids, version=1) -> MagicMock:
+        mock_ssm = MagicMock()
+        mock_ssm.get_parameter.return_value = {
+            "Parameter": {
+                "Value": libjson.dumps(instrument_run_ids),
+                "Version": version,
+            }
+        }
+        when(libssm).ssm_client(...).thenReturn(mock_ssm)
+        return mock_ssm
+
     def setUp(self) -> None:
         super(BSSHEventUnitTests, self).setUp()
 
@@ -97,7 +118,7 @@ class BSSHEventUnitTests(SequenceRunProcUnitTestCase):
         """
         python manage.py test sequence_run_manager_proc.tests.test_bssh_event.BSSHEventUnitTests.test_event_handler
         """
-        when(libssm).get_ssm_param(...).thenReturn(libjson.dumps([]))
+        self.mock_emergency_stop_list([])
 
         _ = bssh_event.event_handler(
             SequenceRunManagerProcFactory.bssh_event_message("Uploading"), None
@@ -128,9 +149,9 @@ class BSSHEventUnitTests(SequenceRunProcUnitTestCase):
         self.assertEqual(1, qs_sample_sheet.count())
         qs_libraries = LibraryAssociation.objects.filter(sequence=seq)
         self.assertEqual(2, qs_libraries.count())
-        verify(libeb, times=3).eb_client(
+        verify(libeb, times=2).eb_client(
             ...
-        )  # 2 new events should fire: SequenceRunSampleSheetChange, SequenceRunLibraryLinkingChange
+        )  # new events should fire in one request: SequenceRunStateChange, SequenceRunSampleSheetChange, SequenceRunLibraryLinkingChange (and delta)
 
         # test event update to completed status
         _ = bssh_event.event_handler(
@@ -142,7 +163,7 @@ class BSSHEventUnitTests(SequenceRunProcUnitTestCase):
         self.assertEqual(SequenceStatus.SUCCEEDED, seq.status)
         qs_states = State.objects.filter(sequence=seq)
         self.assertEqual(3, qs_states.count())
-        verify(libeb, times=4).eb_client(
+        verify(libeb, times=3).eb_client(
             ...
         )  # 1 new event should fire: SequenceRunStatusChange
 
@@ -156,7 +177,7 @@ class BSSHEventUnitTests(SequenceRunProcUnitTestCase):
         self.assertEqual(SequenceStatus.SUCCEEDED, seq.status)
         qs_states = State.objects.filter(sequence=seq)
         self.assertEqual(4, qs_states.count())
-        verify(libeb, times=4).eb_client(...)  # no events should fire
+        verify(libeb, times=3).eb_client(...)  # no events should fire
 
         # clear db records
         qs_sample_sheet.delete()
@@ -169,26 +190,414 @@ class BSSHEventUnitTests(SequenceRunProcUnitTestCase):
         python manage.py test sequence_run_manager_proc.tests.test_bssh_event.BSSHEventUnitTests.test_event_handler_emergency_stop
         """
         # Mock emergency stop list to include our test run ID
-        when(libssm).get_ssm_param(...).thenReturn(
-            libjson.dumps([TestConstant.instrument_run_id.value])
-        )
+        self.mock_emergency_stop_list([TestConstant.instrument_run_id.value])
 
         # Test that SequenceRuleError logger is raised
         with self.assertLogs(logger, level="WARNING") as context:
-            bssh_event.event_handler(
-                SequenceRunManagerProcFactory.bssh_event_message(), None
-            )  # change status to complete
+            with CaptureQueriesContext(connection) as ctx:
+                bssh_event.event_handler(
+                    SequenceRunManagerProcFactory.bssh_event_message(), None
+                )  # change status to complete
 
         # Verify the logging message
         self.assertIn("marked for emergency stop", str(context.output))
 
-        # Verify sequence was still created
-        qs = Sequence.objects.filter(
-            instrument_run_id=TestConstant.instrument_run_id.value
+        # Verify the run was stopped before any database query or BSSH API call
+        self.assertEqual(0, len(ctx.captured_queries))
+        self.assertFalse(
+            Sequence.objects.filter(
+                instrument_run_id=TestConstant.instrument_run_id.value
+            ).exists()
         )
-        sqr = qs.get()
-        logger.info(f"Found SequenceRun record from db: {sqr}")
-        self.assertEqual(1, qs.count())
+        self.mock_bssh_class_seq.assert_not_called()
 
         # Verify no event was emitted
         verify(libeb, times=0).eb_client(...)  # event should not fire
+
+    def test_event_handler_terminal_run_files_listed_once(self):
+        """
+        python manage.py test sequence_run_manager_proc.tests.test_bssh_event.BSSHEventUnitTests.test_event_handler_terminal_run_files_listed_once
+        """
+        self.mock_emergency_stop_list([])
+        mock_bssh_service = self.mock_bssh_class_sample_sheet.return_value
+
+        # first event of the run at a terminal status: the sample sheets are created, then checked again
+        bssh_event.event_handler(
+            SequenceRunManagerProcFactory.bssh_event_message("Complete"), None
+        )
+
+        self.assertEqual(1, SampleSheet.objects.count())
+        verify(mock_bssh_service, times=1).get_all_sample_sheet_from_bssh_run_files(...)
+        verify(mock_bssh_service, times=1).get_sample_sheet_from_bssh_run_files(...)
+        verify(mock_bssh_service, times=1).list_run_files(...)
+
+    def test_event_handler_unchanged_sample_sheet_not_downloaded(self):
+        """
+        python manage.py test sequence_run_manager_proc.tests.test_bssh_event.BSSHEventUnitTests.test_event_handler_unchanged_sample_sheet_not_downloaded
+        """
+        self.mock_emergency_stop_list([])
+        mock_bssh_service = self.mock_bssh_class_sample_sheet.return_value
+        mock_sample_sheet = SequenceRunManagerProcFactory.mock_bssh_sample_sheet()
+        run_file = {
+            "Name": "SampleSheet.csv",
+            "HrefContent": "https://api.example.com/v2/files/1/content",
+            "Size": len(mock_sample_sheet),
+            "DateModified": "2024-10-30T01:32:14.0000000Z",
+            "ETag": "etag-1",
+        }
+        when(mock_bssh_service).list_run_files(...).thenReturn([run_file])
+        when(mock_bssh_service).get_all_sample_sheet_from_bssh_run_files(
+            ...
+        ).thenReturn(
+            [
+                {
+                    "name": "SampleSheet.csv",
+                    "content": mock_sample_sheet,
+                    "file": run_file,
+                }
+            ]
+        )
+
+        bssh_event.event_handler(
+            SequenceRunManagerProcFactory.bssh_event_message("New"), None
+        )
+        sample_sheet = SampleSheet.objects.get()
+        self.assertEqual(len(mock_sample_sheet), sample_sheet.bssh_file_size)
+        self.assertEqual("etag-1", sample_sheet.bssh_file_etag)
+
+        # terminal status: the sample sheet file is unchanged, it is not downloaded again
+        bssh_event.event_handler(
+            SequenceRunManagerProcFactory.bssh_event_message("Complete"), None
+        )
+        verify(mock_bssh_service, times=0).get_sample_sheet_from_bssh_run_files(...)
+        self.assertEqual(1, SampleSheet.objects.count())
+
+        # the file has changed (e.g. touched) but not its content: downloaded, compared by checksum and the
+        # new file metadata recorded
+        sequence = Sequence.objects.get()
+        payload = SequenceRunManagerProcFactory.bssh_event_message("Complete")[
+            "detail"
+        ]["ica-event"]
+        when(mock_bssh_service).list_run_files(...).thenReturn(
+            [{**run_file, "ETag": "etag-2"}]
+        )
+
+        ctx = SequenceRunContext(sequence)
+        self.assertIsNone(
+            sample_sheet_srv.check_sequence_sample_sheet_from_bssh_event(payload, ctx)
+        )
+        ctx.flush()
+        verify(mock_bssh_service, times=1).get_sample_sheet_from_bssh_run_files(...)
+        self.assertEqual(1, SampleSheet.objects.count())
+        self.assertEqual("etag-2", SampleSheet.objects.get().bssh_file_etag)
+
+        # and not downloaded again
+        self.assertIsNone(
+            sample_sheet_srv.check_sequence_sample_sheet_from_bssh_event(
+                payload, SequenceRunContext(sequence)
+            )
+        )
+        verify(mock_bssh_service, times=1).get_sample_sheet_from_bssh_run_files(...)
+
+        # the content has changed: a new sample sheet
+        when(mock_bssh_service).list_run_files(...).thenReturn(
+            [{**run_file, "ETag": "etag-3"}]
+        )
+        when(mock_bssh_service).get_sample_sheet_from_bssh_run_files(...).thenReturn(
+            mock_sample_sheet.replace("my-illumina-sequencing-run", "renamed-run")
+        )
+        ctx = SequenceRunContext(sequence)
+        sample_sheet_domain = (
+            sample_sheet_srv.check_sequence_sample_sheet_from_bssh_event(payload, ctx)
+        )
+        ctx.flush()
+        self.assertTrue(sample_sheet_domain.sample_sheet_has_changed)
+        self.assertEqual(
+            "etag-3",
+            SampleSheet.objects.order_by("association_timestamp").last().bssh_file_etag,
+        )
+
+    def test_event_handler_run_details_fetched_once_per_status(self):
+        """
+        python manage.py test sequence_run_manager_proc.tests.test_bssh_event.BSSHEventUnitTests.test_event_handler_run_details_fetched_once_per_status
+        """
+        self.mock_emergency_stop_list([])
+        mock_bssh_service = self.mock_bssh_class_seq.return_value
+        run_details = SequenceRunManagerProcFactory.mock_bssh_run_details()
+        run_details["Properties"]["Items"].append(
+            {
+                "Type": "library[]",
+                "Name": "Input.Libraries",
+                "SampleLibraryItems": [{"Name": "L2400001"}, {"Name": "L2400002"}],
+            }
+        )
+        run_details["Properties"]["Items"].reverse()
+        when(mock_bssh_service).get_run_details(...).thenReturn(run_details)
+
+        def bssh_event_message_without_sample_sheet(status):
+            message = SequenceRunManagerProcFactory.bssh_event_message(status)
+            message["detail"]["ica-event"].pop("sampleSheetName")
+            return message
+
+        # created: fetched for the experiment name, then read from the database for the libraries
+        bssh_event.event_handler(bssh_event_message_without_sample_sheet("New"), None)
+        verify(mock_bssh_service, times=1).get_run_details(...)
+        seq = Sequence.objects.get()
+        self.assertEqual("ExperimentName", seq.experiment_name)
+        self.assertEqual(
+            ["L2400001", "L2400002"],
+            sorted(LibraryAssociation.objects.values_list("library_id", flat=True)),
+        )
+        sequence_run_details = SequenceRunDetails.objects.get(sequence=seq)
+        self.assertEqual(run_details, sequence_run_details.run_details)
+        self.assertEqual(SequenceStatus.STARTED, sequence_run_details.fetched_status)
+        self.assertLess(
+            len(sequence_run_details.content), len(libjson.dumps(run_details))
+        )
+
+        # same status: not fetched again
+        bssh_event.event_handler(
+            bssh_event_message_without_sample_sheet("Running"), None
+        )
+        verify(mock_bssh_service, times=1).get_run_details(...)
+
+        # status transition: the libraries are already linked, not fetched again until read
+        bssh_event.event_handler(
+            bssh_event_message_without_sample_sheet("Complete"), None
+        )
+        verify(mock_bssh_service, times=1).get_run_details(...)
+
+        # read at the new status: fetched once again, and only once for the event
+        seq = Sequence.objects.get()
+        payload = bssh_event_message_without_sample_sheet("Complete")["detail"][
+            "ica-event"
+        ]
+        ctx = SequenceRunContext(seq)
+        for _ in range(2):
+            sequence_library_srv.check_sequence_run_libraries_linking_from_bssh_event(
+                payload, ctx, force_check=True
+            )
+        verify(mock_bssh_service, times=2).get_run_details(...)
+        ctx.flush()
+        self.assertEqual(
+            SequenceStatus.SUCCEEDED,
+            SequenceRunDetails.objects.get(sequence=seq).fetched_status,
+        )
+        sequence_library_srv.check_sequence_run_libraries_linking_from_bssh_event(
+            payload, SequenceRunContext(seq), force_check=True
+        )
+        verify(mock_bssh_service, times=2).get_run_details(...)
+
+    def test_event_handler_emergency_stop_list_cached(self):
+        """
+        python manage.py test sequence_run_manager_proc.tests.test_bssh_event.BSSHEventUnitTests.test_event_handler_emergency_stop_list_cached
+        """
+        mock_ssm = self.mock_emergency_stop_list([])
+
+        for status in ["Uploading", "New", "Complete"]:
+            bssh_event.event_handler(
+                SequenceRunManagerProcFactory.bssh_event_message(status), None
+            )
+
+        # a single SSM call for the burst of events
+        mock_ssm.get_parameter.assert_called_once()
+        self.assertEqual(
+            SequenceStatus.SUCCEEDED,
+            Sequence.objects.get(
+                sequence_run_id=TestConstant.sequence_run_id.value
+            ).status,
+        )
+
+    def test_emergency_stop_list_refresh(self):
+        """
+        python manage.py test sequence_run_manager_proc.tests.test_bssh_event.BSSHEventUnitTests.test_emergency_stop_list_refresh
+        """
+        now = [0.0]
+        stop_list = EmergencyStopList(
+            "/iap/workflow/emergency_stop_list", ttl_seconds=30, clock=lambda: now[0]
+        )
+        mock_ssm = self.mock_emergency_stop_list(["RUN_1"], version=1)
+
+        self.assertEqual(["RUN_1"], stop_list.get())
+        now[0] = 29
+        self.assertEqual(["RUN_1"], stop_list.get())
+        self.assertEqual(1, mock_ssm.get_parameter.call_count)
+
+        # expired, same version: the value is not parsed again
+        now[0] = 30
+        mock_ssm.get_parameter.return_value["Parameter"]["Value"] = "not parsed"
+        self.assertEqual(["RUN_1"], stop_list.get())
+        self.assertEqual(2, mock_ssm.get_parameter.call_count)
+
+        # expired, new version
+        now[0] = 60
+        mock_ssm.get_parameter.return_value = {
+            "Parameter": {"Value": libjson.dumps(["RUN_1", "RUN_2"]), "Version": 2}
+        }
+        self.assertEqual(["RUN_1", "RUN_2"], stop_list.get())
+
+        # SSM unavailable (e.g. throttled): the last known list is kept until the next refresh
+        now[0] = 90
+        mock_ssm.get_parameter.side_effect = Exception("ThrottlingException")
+        self.assertEqual(["RUN_1", "RUN_2"], stop_list.get())
+        now[0] = 100
+        self.assertEqual(["RUN_1", "RUN_2"], stop_list.get())
+        self.assertEqual(4, mock_ssm.get_parameter.call_count)
+
+    def test_event_handler_statements(self):
+        """
+        python manage.py test sequence_run_manager_proc.tests.test_bssh_event.BSSHEventUnitTests.test_event_handler_statements
+        """
+        self.mock_emergency_stop_list([])
+
+        def statements(status) -> list[str]:
+            with CaptureQueriesContext(connection) as ctx:
+                bssh_event.event_handler(
+                    SequenceRunManagerProcFactory.bssh_event_message(status), None
+                )
+            return [
+                q["sql"]
+                for q in ctx.captured_queries
+                if "SAVEPOINT" not in q["sql"].upper()
+            ]
+
+        def count(sqls: list[str], prefix: str, table: str) -> int:
+            return len([s for s in sqls if s.startswith(prefix) and table in s])
+
+        # new run: sequence lookup, insert and instrument run summary upsert, state insert and the
+        # status change event outbox insert; sample sheets and libraries loaded once each (no run
+        # details recorded yet for a run just created); then the buffered enrichment update, run details,
+        # sample sheet and library linking inserts and the change events outbox insert; then the relay of
+        # the outbox events (2 lookups and the claim update, then the update of the result)
+        sqls = statements("New")
+        self.assertEqual(16, len(sqls))
+        self.assertEqual(2, count(sqls, "INSERT", '"sequence_run_manager_eventoutbox"'))
+        self.assertEqual(2, count(sqls, "UPDATE", '"sequence_run_manager_eventoutbox"'))
+        self.assertEqual(1, count(sqls, "SELECT", '"sequence_run_manager_samplesheet"'))
+        self.assertEqual(1, SampleSheet.objects.count())
+        self.assertEqual(2, LibraryAssociation.objects.count())
+
+        # terminal status: the final check of the sample sheet and library linking reuses what the
+        # first check loaded (and the status update upserts the instrument run summary)
+        sqls = statements("Complete")
+        self.assertEqual(11, len(sqls))
+        self.assertEqual(1, count(sqls, "SELECT", '"sequence_run_manager_sequence"'))
+        self.assertEqual(1, count(sqls, "SELECT", '"sequence_run_manager_samplesheet"'))
+        self.assertEqual(
+            1, count(sqls, "SELECT", '"sequence_run_manager_libraryassociation"')
+        )
+
+    def test_event_handler_bssh_calls_outside_transaction(self):
+        """
+        python manage.py test sequence_run_manager_proc.tests.test_bssh_event.BSSHEventUnitTests.test_event_handler_bssh_calls_outside_transaction
+        """
+        self.mock_emergency_stop_list([])
+        mock_bssh_service = self.mock_bssh_class_seq.return_value
+        # atomic blocks of the test case itself
+        test_atomic_blocks = len(connection.atomic_blocks)
+        call_atomic_blocks = []
+
+        def get_bssh_service():
+            call_atomic_blocks.append(len(connection.atomic_blocks))
+            return mock_bssh_service
+
+        self.mock_bssh_class_seq.side_effect = get_bssh_service
+        self.mock_bssh_class_sample_sheet.side_effect = get_bssh_service
+
+        for status in ["New", "Complete"]:
+            bssh_event.event_handler(
+                SequenceRunManagerProcFactory.bssh_event_message(status), None
+            )
+
+        self.assertEqual(1, SampleSheet.objects.count())
+        self.assertEqual(2, LibraryAssociation.objects.count())
+        # run details of the new run, run files and sample sheets of both events
+        self.assertEqual(3, len(call_atomic_blocks))
+        self.assertEqual([test_atomic_blocks] * 3, call_atomic_blocks)
+
+    def test_event_handler_library_linking_delta(self):
+        """
+        python manage.py test sequence_run_manager_proc.tests.test_bssh_event.BSSHEventUnitTests.test_event_handler_library_linking_delta
+        """
+        self.mock_emergency_stop_list([])
+
+        with patch.object(libeb, "emit_events", wraps=libeb.emit_events) as emit_events:
+            bssh_event.event_handler(
+                SequenceRunManagerProcFactory.bssh_event_message(), None
+            )
+
+        # all events of the BSSH event, SRLLC followed by its delta variant, in one PutEvents call
+        emit_events.assert_called_once()
+        entries = emit_events.call_args.args[0]
+        self.assertEqual(
+            [
+                "SequenceRunStateChange",
+                "SequenceRunSampleSheetChange",
+                "SequenceRunLibraryLinkingChange",
+                "SequenceRunLibraryLinkingDelta",
+            ],
+            [entry["DetailType"] for entry in entries],
+        )
+        srllc_detail = libjson.loads(entries[2]["Detail"])
+        self.assertEqual(
+            ["MyFirstSample", "MySecondSample"], srllc_detail["linkedLibraries"]
+        )
+        self.assertEqual(
+            ["MyFirstSample", "MySecondSample"], srllc_detail["addedLibraries"]
+        )
+        self.assertEqual([], srllc_detail["removedLibraries"])
+        delta_detail = libjson.loads(entries[3]["Detail"])
+        self.assertEqual(
+            ["MyFirstSample", "MySecondSample"], delta_detail["addedLibraries"]
+        )
+        self.assertEqual([], delta_detail["removedLibraries"])
+
+    def test_event_handler_rejected_entries_relayed_later(self):
+        """
+        python manage.py test sequence_run_manager_proc.tests.test_bssh_event.BSSHEventUnitTests.test_event_handler_rejected_entries_relayed_later
+        """
+        self.mock_emergency_stop_list([])
+
+        def put_events(entries):
+            # the sample sheet change entry is throttled on the first request only
+            if len(entries) > 1:
+                return {
+                    "FailedEntryCount": 1,
+                    "Entries": [
+                        (
+                            {
+                                "ErrorCode": "ThrottlingException",
+                                "ErrorMessage": "Rate exceeded",
+                            }
+                            if entry["DetailType"] == "SequenceRunSampleSheetChange"
+                            else {"EventId": "test-event-id"}
+                        )
+                        for entry in entries
+                    ],
+                }
+            return {"FailedEntryCount": 0, "Entries": [{"EventId": "test-event-id"}]}
+
+        with patch.object(libeb, "emit_events", side_effect=put_events) as emit_events:
+            bssh_event.event_handler(
+                SequenceRunManagerProcFactory.bssh_event_message(), None
+            )
+
+            # all events are sent in one request, the rejected one is left pending in the outbox
+            emit_events.assert_called_once()
+            self.assertEqual(4, len(emit_events.call_args.args[0]))
+            pending = EventOutbox.objects.get(status=EventOutboxStatus.PENDING)
+            self.assertEqual("SequenceRunSampleSheetChange", pending.detail_type)
+            self.assertEqual(1, pending.attempt_count)
+            self.assertIn("ThrottlingException", pending.last_error)
+
+            # and only that one is sent again by the scheduled relay
+            result = outbox_relay.handler({}, None)
+
+        self.assertEqual(1, result["published"])
+        self.assertEqual(
+            ["SequenceRunSampleSheetChange"],
+            [entry["DetailType"] for entry in emit_events.call_args.args[0]],
+        )
+        self.assertFalse(
+            EventOutbox.objects.exclude(status=EventOutboxStatus.PUBLISHED).exists()
+        )
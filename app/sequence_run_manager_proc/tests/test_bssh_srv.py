@@ -0,0 +1,184 @@
+import json
+import time
+
+from sequence_run_manager_proc.services.bssh_srv import BSSHService
+from sequence_run_manager_proc.tests.case import StubHttpServerTestCase, logger
+
+# latency injected by the stub for each sample sheet download
+DOWNLOAD_LATENCY = 0.2
+
+
+class BSSHServiceUnitTests(StubHttpServerTestCase):
+    def setUp(self) -> None:
+        super(BSSHServiceUnitTests, self).setUp()
+        self.api_url = f"{self.base_url}/v2/runs/r.ABC"
+
+    def tearDown(self) -> None:
+        super(BSSHServiceUnitTests, self).tearDown()
+
+    def stub_run_files(self, sample_sheet_count: int, failed_index: int = None):
+        names = [f"SampleSheet.V2.{i}.csv" for i in range(sample_sheet_count)]
+        self.respond(
+            "/v2/runs/r.ABC/files",
+            (
+                200,
+                {},
+                json.dumps(
+                    {
+                        "Items": [
+                            {
+                                "Name": name,
+                                "HrefContent": f"{self.base_url}/v2/files/{i}/content",
+                            }
+                            for i, name in enumerate(names)
+                        ]
+                    }
+                ).encode(),
+                0,
+            ),
+        )
+        for i, name in enumerate(names):
+            self.respond(
+                f"/v2/files/{i}/content",
+                (
+                    404 if i == failed_index else 200,
+                    {},
+                    f"[Header]\nRunName,{name}\n".encode(),
+                    DOWNLOAD_LATENCY,
+                ),
+            )
+        return names
+
+    def fetch_all_sample_sheets(self, max_concurrency: int):
+        start = time.monotonic()
+        sample_sheets = BSSHService(
+            max_concurrency=max_concurrency
+        ).get_all_sample_sheet_from_bssh_run_files(self.api_url)
+        return sample_sheets, time.monotonic() - start
+
+    def test_get_all_sample_sheets_benchmark(self):
+        """
+        python manage.py test sequence_run_manager_proc.tests.test_bssh_srv.BSSHServiceUnitTests.test_get_all_sample_sheets_benchmark
+        """
+        names = self.stub_run_files(5)
+        serial, serial_elapsed = self.fetch_all_sample_sheets(max_concurrency=1)
+
+        self.stub_run_files(5)
+        concurrent, concurrent_elapsed = self.fetch_all_sample_sheets(max_concurrency=5)
+
+        logger.info(
+            f"5 sample sheets with {DOWNLOAD_LATENCY}s latency each: serial {serial_elapsed:.3f}s, "
+            f"concurrent {concurrent_elapsed:.3f}s"
+        )
+        self.assertEqual(serial, concurrent)
+        # in the order of the run files
+        self.assertEqual(names, [sample_sheet["name"] for sample_sheet in concurrent])
+        self.assertEqual(
+            "[Header]\nRunName,SampleSheet.V2.3.csv\n", concurrent[3]["content"]
+        )
+        self.assertGreaterEqual(serial_elapsed, 5 * DOWNLOAD_LATENCY)
+        self.assertLess(concurrent_elapsed, 3 * DOWNLOAD_LATENCY)
+
+    def test_get_all_sample_sheets_concurrency_cap(self):
+        """
+        python manage.py test sequence_run_manager_proc.tests.test_bssh_srv.BSSHServiceUnitTests.test_get_all_sample_sheets_concurrency_cap
+        """
+        self.stub_run_files(4)
+
+        sample_sheets, elapsed = self.fetch_all_sample_sheets(max_concurrency=2)
+
+        self.assertEqual(4, len(sample_sheets))
+        # two rounds of two downloads
+        self.assertGreaterEqual(elapsed, 2 * DOWNLOAD_LATENCY)
+
+    def test_get_all_sample_sheets_download_error(self):
+        """
+        python manage.py test sequence_run_manager_proc.tests.test_bssh_srv.BSSHServiceUnitTests.test_get_all_sample_sheets_download_error
+        """
+        self.stub_run_files(3, failed_index=1)
+
+        with self.assertRaises(ValueError):
+            self.fetch_all_sample_sheets(max_concurrency=3)
+
+    def stub_run_files_pages(self, file_count: int, page_limit: int, total_count=True):
+        names = [f"File{i}.csv" for i in range(file_count)]
+        for offset in range(0, file_count, page_limit):
+            paging = {"Offset": offset, "Limit": page_limit}
+            if total_count:
+                paging["TotalCount"] = file_count
+            self.respond(
+                f"/v2/runs/r.ABC/files?extension=csv&directory=%2F&offset={offset}&limit={page_limit}",
+                (
+                    200,
+                    {},
+                    json.dumps(
+                        {
+                            "Items": [
+                                {"Name": name, "HrefContent": f"{self.base_url}/{name}"}
+                                for name in names[offset : offset + page_limit]
+                            ],
+                            "Paging": paging,
+                        }
+                    ).encode(),
+                    DOWNLOAD_LATENCY,
+                ),
+            )
+        return names
+
+    def test_list_run_files_parallel_pages(self):
+        """
+        python manage.py test sequence_run_manager_proc.tests.test_bssh_srv.BSSHServiceUnitTests.test_list_run_files_parallel_pages
+        """
+        names = self.stub_run_files_pages(file_count=9, page_limit=2)
+
+        start = time.monotonic()
+        files = BSSHService(max_concurrency=4).list_run_files(
+            self.api_url, page_limit=2
+        )
+        elapsed = time.monotonic() - start
+
+        self.assertEqual(names, [file["Name"] for file in files])
+        self.assertEqual(5, len(self.server.requests))
+        # the first page, then the 4 others at once
+        self.assertLess(elapsed, 4 * DOWNLOAD_LATENCY)
+
+    def test_list_run_files_without_total_count(self):
+        """
+        python manage.py test sequence_run_manager_proc.tests.test_bssh_srv.BSSHServiceUnitTests.test_list_run_files_without_total_count
+        """
+        names = self.stub_run_files_pages(file_count=4, page_limit=2, total_count=False)
+        self.respond(
+            "/v2/runs/r.ABC/files?extension=csv&directory=%2F&offset=4&limit=2",
+            (200, {}, b'{"Items": []}', 0),
+        )
+
+        files = BSSHService().list_run_files(self.api_url, page_limit=2)
+
+        self.assertEqual(names, [file["Name"] for file in files])
+        self.assertEqual(3, len(self.server.requests))
+
+    def test_sample_sheets_from_listed_run_files(self):
+        """
+        python manage.py test sequence_run_manager_proc.tests.test_bssh_srv.BSSHServiceUnitTests.test_sample_sheets_from_listed_run_files
+        """
+        names = self.stub_run_files(2)
+        bssh_service = BSSHService()
+        run_files = bssh_service.list_run_files(self.api_url)
+        self.server.responses["/v2/files/1/content"].append(
+            (200, {}, b"[Header]\nRunName,again\n", 0)
+        )
+
+        sample_sheets = bssh_service.get_all_sample_sheet_from_bssh_run_files(
+            self.api_url, run_files=run_files
+        )
+        sample_sheet = bssh_service.get_sample_sheet_from_bssh_run_files(
+            self.api_url, names[1], run_files=run_files
+        )
+
+        self.assertEqual(names, [s["name"] for s in sample_sheets])
+        self.assertEqual("[Header]\nRunName,again\n", sample_sheet)
+        # listed once
+        self.assertEqual(
+            1,
+            len([path for path, _, _ in self.server.requests if "/files?" in path]),
+        )
@@ -0,0 +1,178 @@
+import json
+import time
+
+import requests
+
+from sequence_run_manager_proc.services import http_session
+from sequence_run_manager_proc.services.bssh_srv import BSSHService, get_bssh_service
+from sequence_run_manager_proc.services.http_session import build_session
+from sequence_run_manager_proc.tests.case import StubHttpServerTestCase
+
+
+class HttpSessionUnitTests(StubHttpServerTestCase):
+    def test_retry_on_5xx(self):
+        """
+        python manage.py test sequence_run_manager_proc.tests.test_http_session.HttpSessionUnitTests.test_retry_on_5xx
+        """
+        self.respond(
+            "/runs",
+            (502, {}, b"bad gateway", 0),
+            (500, {}, b"error", 0),
+            (200, {}, b"ok", 0),
+        )
+
+        response = build_session(backoff_factor=0).get(f"{self.base_url}/runs")
+
+        self.assertEqual(200, response.status_code)
+        self.assertEqual(b"ok", response.content)
+        self.assertEqual(3, len(self.server.requests))
+
+    def test_retries_exhausted_returns_last_response(self):
+        """
+        python manage.py test sequence_run_manager_proc.tests.test_http_session.HttpSessionUnitTests.test_retries_exhausted_returns_last_response
+        """
+        self.respond("/runs", *[(503, {}, b"unavailable", 0)] * 3)
+
+        response = build_session(retries=2, backoff_factor=0).get(
+            f"{self.base_url}/runs"
+        )
+
+        self.assertEqual(503, response.status_code)
+        self.assertEqual(3, len(self.server.requests))
+        with self.assertRaises(requests.exceptions.HTTPError):
+            response.raise_for_status()
+
+    def test_retry_after(self):
+        """
+        python manage.py test sequence_run_manager_proc.tests.test_http_session.HttpSessionUnitTests.test_retry_after
+        """
+        self.respond(
+            "/runs",
+            (429, {"Retry-After": "1"}, b"slow down", 0),
+            (200, {}, b"ok", 0),
+        )
+        start = time.monotonic()
+        response = build_session(backoff_factor=0).get(f"{self.base_url}/runs")
+        elapsed = time.monotonic() - start
+
+        self.assertEqual(200, response.status_code)
+        self.assertGreaterEqual(elapsed, 1)
+
+        # capped to retry_after_max
+        self.respond(
+            "/runs",
+            (429, {"Retry-After": "60"}, b"slow down", 0),
+            (200, {}, b"ok", 0),
+        )
+        start = time.monotonic()
+        response = build_session(backoff_factor=0, retry_after_max=0.1).get(
+            f"{self.base_url}/runs"
+        )
+        elapsed = time.monotonic() - start
+
+        self.assertEqual(200, response.status_code)
+        self.assertLess(elapsed, 5)
+
+    def test_read_timeout(self):
+        """
+        python manage.py test sequence_run_manager_proc.tests.test_http_session.HttpSessionUnitTests.test_read_timeout
+        """
+        self.respond("/runs", (200, {}, b"late", 2))
+
+        start = time.monotonic()
+        with self.assertRaises(requests.exceptions.ConnectionError):
+            build_session(timeout=(1, 0.2), retries=0).get(f"{self.base_url}/runs")
+        self.assertLess(time.monotonic() - start, 2)
+
+    def test_gzip_and_keep_alive(self):
+        """
+        python manage.py test sequence_run_manager_proc.tests.test_http_session.HttpSessionUnitTests.test_gzip_and_keep_alive
+        """
+        body = json.dumps({"Items": ["x" * 100] * 100}).encode()
+        self.respond("/files", (200, {}, body, 0), (200, {}, body, 0))
+
+        session = http_session.get_session()
+        self.assertIs(session, http_session.get_session())
+        responses = [session.get(f"{self.base_url}/files") for _ in range(2)]
+
+        self.assertEqual([body, body], [response.content for response in responses])
+        self.assertEqual("gzip", responses[0].headers["Content-Encoding"])
+        self.assertIn("gzip", self.server.requests[0][2]["Accept-Encoding"])
+        # both requests on the same pooled connection
+        self.assertEqual(1, len({port for _, port, _ in self.server.requests}))
+
+    def test_bssh_service_through_shared_session(self):
+        """
+        python manage.py test sequence_run_manager_proc.tests.test_http_session.HttpSessionUnitTests.test_bssh_service_through_shared_session
+        """
+        run_details = {"Id": "r.ABC", "Name": "241024_A00130_0336_XXXXXXXXX"}
+        self.respond(
+            "/v2/runs/r.ABC",
+            (503, {}, b"unavailable", 0),
+            (
+                200,
+                {"Content-Type": "application/json"},
+                json.dumps(run_details).encode(),
+                0,
+            ),
+        )
+        self.respond(
+            "/v2/runs/r.ABC/files",
+            (
+                200,
+                {},
+                json.dumps(
+                    {
+                        "Items": [
+                            {
+                                "Name": "SampleSheet.csv",
+                                "HrefContent": f"{self.base_url}/v2/files/f1/content",
+                            }
+                        ]
+                    }
+                ).encode(),
+                0,
+            ),
+        )
+        self.respond("/v2/files/f1/content", (200, {}, b"[Header]\n", 0))
+
+        bssh_service = BSSHService()
+        api_url = f"{self.base_url}/v2/runs/r.ABC"
+
+        self.assertEqual(run_details, bssh_service.get_run_details(api_url))
+        self.assertEqual(
+            "[Header]\n",
+            bssh_service.get_sample_sheet_from_bssh_run_files(
+                api_url, "SampleSheet.csv"
+            ),
+        )
+        self.assertEqual(
+            "Bearer mock-token", self.server.requests[0][2]["Authorization"]
+        )
+        # one connection for all the calls, including the retried one
+        self.assertEqual(4, len(self.server.requests))
+        self.assertEqual(1, len({port for _, port, _ in self.server.requests}))
+
+    def test_bssh_service_token_refreshed_on_401(self):
+        """
+        python manage.py test sequence_run_manager_proc.tests.test_http_session.HttpSessionUnitTests.test_bssh_service_token_refreshed_on_401
+        """
+        self.mock_secret("test", "old-token", "new-token")
+        self.respond(
+            "/v2/runs/r.ABC",
+            (401, {}, b"unauthorized", 0),
+            (200, {}, b'{"Id": "r.ABC"}', 0),
+        )
+
+        run_details = get_bssh_service().get_run_details(
+            f"{self.base_url}/v2/runs/r.ABC"
+        )
+
+        self.assertEqual({"Id": "r.ABC"}, run_details)
+        self.assertEqual(
+            ["Bearer old-token", "Bearer new-token"],
+            [headers["Authorization"] for _, _, headers in self.server.requests],
+        )
+        self.assertEqual(
+            "Bearer new-token", get_bssh_service().headers["Authorization"]
+        )
@@ -0,0 +1,265 @@
+import json
+import os
+import re
+from datetime import datetime, timezone
+from types import SimpleNamespace
+from unittest.mock import patch
+
+from libica.openapi.v3 import ApiClient, ApiException, rest
+
+from sequence_run_manager_proc.services.ica_srv import (
+    ICAService,
+    PRESIGNED_URL_EXPIRY_MARGIN_SECONDS,
+    get_presigned_url_expiry,
+)
+from sequence_run_manager_proc.services.sample_sheet_stream import (
+    SampleSheetTooLargeError,
+)
+from sequence_run_manager_proc.tests.case import StubHttpServerTestCase, logger
+
+PROJECT_ID = "9ec02c1f-53ba-47a5-854d-e6b53101adb7"
+TENANT_ID = "3a1f2b4c-5d6e-4f70-8a9b-0c1d2e3f4a5b"
+SAMPLE_SHEET_PATH = "/primary/240101_A01052_0001_BHXXXXXX/SampleSheet.csv"
+SAMPLE_SHEET_URI = f"icav2://{PROJECT_ID}{SAMPLE_SHEET_PATH}"
+SAMPLE_SHEET = "[Header]\nFileFormatVersion,2\n"
+
+# 2024-01-01T00:00:00Z, presigned URLs valid for an hour
+SIGNED_AT = datetime(2024, 1, 1, tzinfo=timezone.utc).timestamp()
+URL_EXPIRES_IN = 3600
+
+
+def project_data(data_id: str, path: str) -> dict:
+    return {
+        "projectId": PROJECT_ID,
+        "data": {
+            "id": data_id,
+            "details": {
+                "timeCreated": "2024-01-01T00:00:00Z",
+                "timeModified": "2024-01-01T00:00:00Z",
+                "tenantId": TENANT_ID,
+                "owningProjectId": PROJECT_ID,
+                "name": path.rsplit("/", 1)[-1],
+                "path": path,
+                "status": "AVAILABLE",
+                "tags": {
+                    "technicalTags": [],
+                    "userTags": [],
+                    "connectorTags": [],
+                    "runInTags": [],
+                    "runOutTags": [],
+                    "referenceTags": [],
+                },
+                "dataType": "FILE",
+            },
+        },
+    }
+
+
+class ICAServiceUnitTests(StubHttpServerTestCase):
+    """ICAService against a stub of the libica ApiClient (ICA API) and of the presigned URL storage"""
+
+    def setUp(self) -> None:
+        super(ICAServiceUnitTests, self).setUp()
+        os.environ["ICAV2_ACCESS_TOKEN_SECRET_ID"] = "ica-test"
+        self.mock_secret("ica-test", "ica-token")
+
+        self.now = SIGNED_AT
+        # ICA API state: the data ID at the sample sheet path, and the calls made
+        self.data_id = "fil.1"
+        self.api_calls = []
+        self.signed_urls = 0
+
+        patcher = patch.object(ApiClient, "call_api", self.call_api)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def tearDown(self) -> None:
+        del os.environ["ICAV2_ACCESS_TOKEN_SECRET_ID"]
+        super(ICAServiceUnitTests, self).tearDown()
+
+    def call_api(self, method, url, *args, **kwargs):
+        path = url.split("?")[0].split("/ica/rest", 1)[-1]
+        self.api_calls.append((method, path))
+
+        if method == "GET" and path == f"/api/projects/{PROJECT_ID}/data":
+            status, payload = 200, {
+                "items": [project_data(self.data_id, SAMPLE_SHEET_PATH)]
+            }
+        elif method == "GET" and re.fullmatch(
+            rf"/api/projects/{PROJECT_ID}/data/[^/:]+", path
+        ):
+            status, payload = 200, project_data(
+                path.rsplit("/", 1)[-1], SAMPLE_SHEET_PATH
+            )
+        elif method == "POST" and path.endswith(":createDownloadUrl"):
+            data_id = path.rsplit("/", 1)[-1].split(":")[0]
+            if data_id != self.data_id:
+                status, payload = 404, {"detail": "Not found"}
+            else:
+                self.signed_urls += 1
+                status, payload = 200, {"url": self.presigned_url(data_id)}
+        else:
+            status, payload = 404, {}
+
+        return rest.RESTResponse(
+            SimpleNamespace(
+                status=status,
+                reason="OK" if status == 200 else "Not Found",
+                data=json.dumps(payload).encode(),
+                headers={"content-type": "application/json"},
+            )
+        )
+
+    def presigned_url(self, data_id: str) -> str:
+        signed_at = datetime.fromtimestamp(self.now, tz=timezone.utc)
+        return (
+            f"{self.base_url}/{data_id}/SampleSheet.csv?X-Amz-Date={signed_at:%Y%m%dT%H%M%SZ}"
+            f"&X-Amz-Expires={URL_EXPIRES_IN}&X-Amz-Signature={self.signed_urls}"
+        )
+
+    def stub_download(self, data_id: str, *responses):
+        self.respond(
+            f"/{data_id}/SampleSheet.csv",
+            *(responses or [(200, {}, SAMPLE_SHEET.encode(), 0)] * 10),
+        )
+
+    def build_service(self) -> ICAService:
+        return ICAService(clock=lambda: self.now)
+
+    def test_get_presigned_url_expiry(self):
+        """
+        python manage.py test sequence_run_manager_proc.tests.test_ica_srv.ICAServiceUnitTests.test_get_presigned_url_expiry
+        """
+        self.assertEqual(
+            SIGNED_AT + URL_EXPIRES_IN,
+            get_presigned_url_expiry(self.presigned_url("fil.1")),
+        )
+        self.assertEqual(
+            1704070800.0,
+            get_presigned_url_expiry(
+                "https://bucket.s3.amazonaws.com/key?Expires=1704070800"
+            ),
+        )
+        self.assertIsNone(get_presigned_url_expiry("https://example.com/key"))
+        self.assertIsNone(
+            get_presigned_url_expiry(
+                "https://example.com/key?X-Amz-Date=x&X-Amz-Expires=1"
+            )
+        )
+
+    def test_get_file_contents_from_uri_cached(self):
+        """
+        python manage.py test sequence_run_manager_proc.tests.test_ica_srv.ICAServiceUnitTests.test_get_file_contents_from_uri_cached
+        """
+        self.stub_download("fil.1")
+        ica_service = self.build_service()
+
+        for _ in range(5):
+            self.assertEqual(
+                SAMPLE_SHEET, ica_service.get_file_contents_from_uri(SAMPLE_SHEET_URI)
+            )
+
+        logger.info(f"ICA API calls for 5 reads of the same URI: {self.api_calls}")
+        # the path lookup and the download URL, once; the project data is never fetched
+        self.assertEqual(
+            [
+                ("GET", f"/api/projects/{PROJECT_ID}/data"),
+                ("POST", f"/api/projects/{PROJECT_ID}/data/fil.1:createDownloadUrl"),
+            ],
+            self.api_calls,
+        )
+        self.assertEqual(5, len(self.server.requests))
+
+    def test_uri_cache_ttl(self):
+        """
+        python manage.py test sequence_run_manager_proc.tests.test_ica_srv.ICAServiceUnitTests.test_uri_cache_ttl
+        """
+        ica_service = self.build_service()
+
+        self.assertEqual(
+            (PROJECT_ID, "fil.1"), ica_service.resolve_uri(SAMPLE_SHEET_URI)
+        )
+        self.now += ica_service.uri_cache_ttl_seconds - 1
+        self.assertEqual(
+            (PROJECT_ID, "fil.1"), ica_service.resolve_uri(SAMPLE_SHEET_URI)
+        )
+        self.assertEqual(1, len(self.api_calls))
+
+        # expired
+        self.now += 1
+        self.data_id = "fil.2"
+        self.assertEqual(
+            (PROJECT_ID, "fil.2"), ica_service.resolve_uri(SAMPLE_SHEET_URI)
+        )
+        self.assertEqual(2, len(self.api_calls))
+
+    def test_presigned_url_refreshed_before_expiry(self):
+        """
+        python manage.py test sequence_run_manager_proc.tests.test_ica_srv.ICAServiceUnitTests.test_presigned_url_refreshed_before_expiry
+        """
+        self.stub_download("fil.1")
+        ica_service = self.build_service()
+
+        ica_service.read_icav2_file_contents(PROJECT_ID, "fil.1")
+        self.now += URL_EXPIRES_IN - PRESIGNED_URL_EXPIRY_MARGIN_SECONDS - 1
+        ica_service.read_icav2_file_contents(PROJECT_ID, "fil.1")
+        self.assertEqual(1, self.signed_urls)
+
+        # within the margin of its expiry
+        self.now += 1
+        ica_service.read_icav2_file_contents(PROJECT_ID, "fil.1")
+        self.assertEqual(2, self.signed_urls)
+        self.assertNotEqual(self.server.requests[0][0], self.server.requests[2][0])
+
+    def test_presigned_url_refused(self):
+        """
+        python manage.py test sequence_run_manager_proc.tests.test_ica_srv.ICAServiceUnitTests.test_presigned_url_refused
+        """
+        self.stub_download(
+            "fil.1",
+            (200, {}, SAMPLE_SHEET.encode(), 0),
+            (403, {}, b"AccessDenied", 0),
+            (200, {}, SAMPLE_SHEET.encode(), 0),
+        )
+        ica_service = self.build_service()
+
+        ica_service.read_icav2_file_contents(PROJECT_ID, "fil.1")
+        # the reused URL is refused, a new one is created
+        self.assertEqual(
+            SAMPLE_SHEET, ica_service.read_icav2_file_contents(PROJECT_ID, "fil.1")
+        )
+        self.assertEqual(2, self.signed_urls)
+        self.assertEqual(3, len(self.server.requests))
+
+    def test_replaced_file_resolved_again(self):
+        """
+        python manage.py test sequence_run_manager_proc.tests.test_ica_srv.ICAServiceUnitTests.test_replaced_file_resolved_again
+        """
+        self.stub_download("fil.2")
+        ica_service = self.build_service()
+        ica_service.resolve_uri(SAMPLE_SHEET_URI)
+
+        # the sample sheet is replaced, the cached data ID is gone
+        self.data_id = "fil.2"
+        self.assertEqual(
+            SAMPLE_SHEET, ica_service.get_file_contents_from_uri(SAMPLE_SHEET_URI)
+        )
+        self.assertEqual(
+            (PROJECT_ID, "fil.2"), ica_service.resolve_uri(SAMPLE_SHEET_URI)
+        )
+
+        # a data ID not found without a cached resolution is an error
+        self.data_id = "fil.3"
+        with self.assertRaises(ApiException):
+            ica_service.read_icav2_file_contents(PROJECT_ID, "fil.1")
+
+    def test_file_too_large(self):
+        """
+        python manage.py test sequence_run_manager_proc.tests.test_ica_srv.ICAServiceUnitTests.test_file_too_large
+        """
+        os.environ["SAMPLE_SHEET_MAX_BYTES"] = "1024"
+        self.addCleanup(os.environ.pop, "SAMPLE_SHEET_MAX_BYTES")
+        self.stub_download("fil.1", (200, {}, b"x" * 2048, 0))
+
+        with self.assertRaises(SampleSheetTooLargeError):
+            self.build_service().get_file_contents_from_uri(SAMPLE_SHEET_URI)
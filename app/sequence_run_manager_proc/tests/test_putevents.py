@@ -0,0 +1,194 @@
+import json
+
+from django.utils import timezone
+
+from sequence_run_manager.tests.factories import SequenceFactory
+from sequence_run_manager.models.sample_sheet import SampleSheet
+from sequence_run_manager_proc.domain.librarylinking import LibraryLinkingDomain
+from sequence_run_manager_proc.domain.samplesheet import SampleSheetDomain
+from sequence_run_manager_proc.domain.putevents import (
+    MAX_PUT_EVENTS_ENTRY_SIZE,
+    EventEntryTooLargeError,
+    batch_put_events_entries,
+    put_events_entry_size,
+)
+from sequence_run_manager_proc.domain.events.srllc import (
+    SequenceRunLibraryLinkingChange,
+)
+from sequence_run_manager_proc.domain.events.srlld import (
+    SequenceRunLibraryLinkingDelta,
+)
+from sequence_run_manager_proc.tests.case import SequenceRunProcUnitTestCase, logger
+
+
+class PutEventsUnitTests(SequenceRunProcUnitTestCase):
+    def setUp(self) -> None:
+        super(PutEventsUnitTests, self).setUp()
+
+    def tearDown(self) -> None:
+        super(PutEventsUnitTests, self).tearDown()
+
+    def build_library_linking_domain(self, library_count: int) -> LibraryLinkingDomain:
+        linked_libraries = [f"L{i:07d}" for i in range(library_count)]
+        return LibraryLinkingDomain(
+            instrument_run_id="250328_A01052_0258_AHFGM7DSXF",
+            sequence_run_id="r.01J5M2JFE1JPYV62RYQEG99RUN",
+            linked_libraries=linked_libraries,
+            timestamp=timezone.now(),
+            library_linking_has_changed=True,
+            added_libraries=linked_libraries[: library_count // 2],
+            removed_libraries=["L9999999"],
+        )
+
+    def test_put_events_entry_size(self):
+        """
+        python manage.py test sequence_run_manager_proc.tests.test_putevents.PutEventsUnitTests.test_put_events_entry_size
+        """
+        entry = {
+            "Source": "orcabus.sequencerunmanager",
+            "DetailType": "SequenceRunLibraryLinkingChange",
+            "Detail": '{"linkedLibraries":["L2000001"],"note":"é"}',
+            "Resources": ["arn:aws:test"],
+            "EventBusName": "MockBus",
+        }
+        # EventBusName does not count, Detail is counted in UTF-8 bytes
+        self.assertEqual(
+            len("orcabus.sequencerunmanager")
+            + len("SequenceRunLibraryLinkingChange")
+            + len('{"linkedLibraries":["L2000001"],"note":"é"}'.encode("utf-8"))
+            + len("arn:aws:test"),
+            put_events_entry_size(entry),
+        )
+        self.assertEqual(
+            put_events_entry_size(entry) + 14,
+            put_events_entry_size({**entry, "Time": timezone.now()}),
+        )
+
+    def test_library_linking_entries(self):
+        """
+        python manage.py test sequence_run_manager_proc.tests.test_putevents.PutEventsUnitTests.test_library_linking_entries
+        """
+        domain = self.build_library_linking_domain(10)
+
+        entries = domain.to_put_events_request_entries(event_bus_name="MockBus")
+
+        self.assertEqual(
+            ["SequenceRunLibraryLinkingChange", "SequenceRunLibraryLinkingDelta"],
+            [entry["DetailType"] for entry in entries],
+        )
+        detail = json.loads(entries[0]["Detail"])
+        self.assertEqual(domain.linked_libraries, detail["linkedLibraries"])
+        self.assertNotIn("chunkIndex", detail)
+        self.assertNotIn("chunkCount", detail)
+
+    def test_library_linking_entries_chunked(self):
+        """
+        python manage.py test sequence_run_manager_proc.tests.test_putevents.PutEventsUnitTests.test_library_linking_entries_chunked
+        """
+        # ~11 bytes per library id, well over the limit
+        domain = self.build_library_linking_domain(30000)
+        self.assertGreater(
+            put_events_entry_size(
+                domain.to_put_events_request_entry(event_bus_name="MockBus")
+            ),
+            MAX_PUT_EVENTS_ENTRY_SIZE,
+        )
+
+        entries = domain.to_put_events_request_entries(event_bus_name="MockBus")
+
+        for entry in entries:
+            self.assertLessEqual(
+                put_events_entry_size(entry), MAX_PUT_EVENTS_ENTRY_SIZE
+            )
+
+        srllc_chunks = [
+            SequenceRunLibraryLinkingChange.model_validate_json(entry["Detail"])
+            for entry in entries
+            if entry["DetailType"] == "SequenceRunLibraryLinkingChange"
+        ]
+        logger.info(f"{len(srllc_chunks)} SRLLC chunks")
+        self.assertGreater(len(srllc_chunks), 1)
+        self.assertEqual(
+            list(range(1, len(srllc_chunks) + 1)),
+            [chunk.chunkIndex for chunk in srllc_chunks],
+        )
+        self.assertEqual(
+            {len(srllc_chunks)}, {chunk.chunkCount for chunk in srllc_chunks}
+        )
+        # reassembled chunks give back the full lists
+        self.assertEqual(
+            domain.linked_libraries,
+            [lib for chunk in srllc_chunks for lib in chunk.linkedLibraries],
+        )
+        self.assertEqual(
+            domain.added_libraries,
+            [lib for chunk in srllc_chunks for lib in chunk.addedLibraries],
+        )
+        self.assertEqual(
+            domain.removed_libraries,
+            [lib for chunk in srllc_chunks for lib in chunk.removedLibraries],
+        )
+
+        srlld_chunks = [
+            SequenceRunLibraryLinkingDelta.model_validate_json(entry["Detail"])
+            for entry in entries
+            if entry["DetailType"] == "SequenceRunLibraryLinkingDelta"
+        ]
+        self.assertEqual(
+            domain.added_libraries,
+            [lib for chunk in srlld_chunks for lib in chunk.addedLibraries],
+        )
+
+    def test_library_linking_entries_too_large(self):
+        """
+        python manage.py test sequence_run_manager_proc.tests.test_putevents.PutEventsUnitTests.test_library_linking_entries_too_large
+        """
+        domain = self.build_library_linking_domain(4)
+
+        with self.assertRaises(EventEntryTooLargeError):
+            domain.to_put_events_request_entries(
+                event_bus_name="MockBus", max_entry_size=100
+            )
+
+    def test_sample_sheet_pointer_entry(self):
+        """
+        python manage.py test sequence_run_manager_proc.tests.test_putevents.PutEventsUnitTests.test_sample_sheet_pointer_entry
+        """
+        sample_sheet = SampleSheet(
+            sequence=SequenceFactory(),
+            sample_sheet_name="SampleSheet.csv",
+            sample_sheet_content_original="[Header]\nFileFormatVersion,2\n",
+            association_timestamp=timezone.now(),
+        )
+        domain = SampleSheetDomain(
+            sample_sheet=sample_sheet,
+            instrument_run_id="250328_A01052_0258_AHFGM7DSXF",
+            sequence_run_id="r.01J5M2JFE1JPYV62RYQEG99RUN",
+            description="Comment: " + "x" * MAX_PUT_EVENTS_ENTRY_SIZE,
+        )
+
+        entries = domain.to_put_events_request_entries(event_bus_name="MockBus")
+
+        self.assertEqual(1, len(entries))
+        self.assertLessEqual(
+            put_events_entry_size(entries[0]), MAX_PUT_EVENTS_ENTRY_SIZE
+        )
+        detail = json.loads(entries[0]["Detail"])
+        self.assertIsNone(detail["description"])
+        self.assertIn("apiUrl", detail)
+
+    def test_batch_put_events_entries(self):
+        """
+        python manage.py test sequence_run_manager_proc.tests.test_putevents.PutEventsUnitTests.test_batch_put_events_entries
+        """
+        small_entries = [{"Detail": "{}"} for _ in range(23)]
+        self.assertEqual(
+            [10, 10, 3],
+            [len(batch) for batch in batch_put_events_entries(small_entries)],
+        )
+
+        large_entries = [{"Detail": "x" * 100_000} for _ in range(5)]
+        self.assertEqual(
+            [2, 2, 1],
+            [len(batch) for batch in batch_put_events_entries(large_entries)],
+        )
@@ -0,0 +1,138 @@
+import base64
+import gzip
+import io
+import tracemalloc
+from unittest import TestCase
+
+import requests
+
+from sequence_run_manager_proc.services.sample_sheet_stream import (
+    SampleSheetTooLargeError,
+    decode_base64_gzip_text,
+    read_response_text,
+)
+from sequence_run_manager_proc.tests.case import logger
+
+SAMPLE_SHEET_SIZE = 10 * 1024 * 1024
+
+
+def build_sample_sheet(size: int) -> str:
+    header = "[Header]\nFileFormatVersion,2\n[BCLConvert_Data]\nLane,Sample_ID,index,index2\n"
+    row = "1,L2400001,ACGTACGTAC,TGCATGCATG\n"
+    return header + row * ((size - len(header)) // len(row))
+
+
+def measure_peak(fn):
+    """Result of fn and the peak of the memory it allocated"""
+    tracemalloc.start()
+    try:
+        result = fn()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return result, peak
+
+
+class CountingBytesIO(io.BytesIO):
+    """Response body stream recording how many bytes were read from it"""
+
+    bytes_read = 0
+
+    def read(self, *args, **kwargs):
+        data = super().read(*args, **kwargs)
+        self.bytes_read += len(data)
+        return data
+
+
+def build_response(body: bytes, headers: dict = None) -> requests.Response:
+    response = requests.Response()
+    response.status_code = 200
+    response.headers.update(headers or {})
+    response.raw = CountingBytesIO(body)
+    return response
+
+
+class SampleSheetStreamUnitTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.sample_sheet = build_sample_sheet(SAMPLE_SHEET_SIZE)
+        cls.sample_sheet_base64_gz = base64.b64encode(
+            gzip.compress(cls.sample_sheet.encode("utf-8"))
+        ).decode("ascii")
+
+    def test_decode_base64_gzip_peak_memory(self):
+        """
+        python manage.py test sequence_run_manager_proc.tests.test_sample_sheet_stream.SampleSheetStreamUnitTests.test_decode_base64_gzip_peak_memory
+        """
+        content, peak = measure_peak(
+            lambda: decode_base64_gzip_text(self.sample_sheet_base64_gz)
+        )
+        logger.info(
+            f"Decoded a {len(content)} bytes sample sheet, peak memory {peak} bytes"
+        )
+
+        self.assertEqual(self.sample_sheet, content)
+        # the decoded text and the bytes it is decoded from, plus the working chunks
+        self.assertLess(peak, 2.25 * SAMPLE_SHEET_SIZE)
+
+    def test_decode_base64_gzip_rejected(self):
+        """
+        python manage.py test sequence_run_manager_proc.tests.test_sample_sheet_stream.SampleSheetStreamUnitTests.test_decode_base64_gzip_rejected
+        """
+        max_bytes = 1024 * 1024
+
+        def decode():
+            with self.assertRaises(SampleSheetTooLargeError):
+                decode_base64_gzip_text(
+                    self.sample_sheet_base64_gz, max_bytes=max_bytes
+                )
+
+        _, peak = measure_peak(decode)
+
+        # rejected as soon as the limit is reached, the rest is never decompressed
+        self.assertLess(peak, 2 * max_bytes)
+
+    def test_decode_base64_gzip_line_breaks_and_members(self):
+        """
+        python manage.py test sequence_run_manager_proc.tests.test_sample_sheet_stream.SampleSheetStreamUnitTests.test_decode_base64_gzip_line_breaks_and_members
+        """
+        content_base64_gz = base64.encodebytes(
+            gzip.compress(b"[Header]\n") + gzip.compress(b"FileFormatVersion,2\n")
+        ).decode("ascii")
+
+        self.assertEqual(
+            "[Header]\nFileFormatVersion,2\n",
+            decode_base64_gzip_text(content_base64_gz),
+        )
+        with self.assertRaises(ValueError):
+            decode_base64_gzip_text(content_base64_gz[:-10])
+
+    def test_read_response_peak_memory(self):
+        """
+        python manage.py test sequence_run_manager_proc.tests.test_sample_sheet_stream.SampleSheetStreamUnitTests.test_read_response_peak_memory
+        """
+        body = self.sample_sheet.encode("utf-8")
+
+        content, peak = measure_peak(lambda: read_response_text(build_response(body)))
+
+        self.assertEqual(self.sample_sheet, content)
+        self.assertLess(peak, 2.25 * SAMPLE_SHEET_SIZE)
+
+    def test_read_response_rejected(self):
+        """
+        python manage.py test sequence_run_manager_proc.tests.test_sample_sheet_stream.SampleSheetStreamUnitTests.test_read_response_rejected
+        """
+        body = self.sample_sheet.encode("utf-8")
+
+        # by the announced length, before reading the body
+        response = build_response(body, {"Content-Length": str(len(body))})
+        with self.assertRaises(SampleSheetTooLargeError):
+            read_response_text(response, max_bytes=1024 * 1024)
+        self.assertEqual(0, response.raw.bytes_read)
+
+        # or while reading it
+        response = build_response(body)
+        with self.assertRaises(SampleSheetTooLargeError):
+            read_response_text(response, max_bytes=1024 * 1024)
+        self.assertLess(response.raw.bytes_read, 2 * 1024 * 1024)
@@ -1,9 +1,14 @@
+import os
+
+from mockito import mock, when
+
 from sequence_run_manager.models.sequence import Sequence, LibraryAssociation
 from sequence_run_manager.models.sample_sheet import SampleSheet
 from sequence_run_manager.models.comment import Comment
 from sequence_run_manager.tests.factories import TestConstant
 from sequence_run_manager_proc.tests.factories import SequenceRunManagerProcFactory
 from sequence_run_manager_proc.lambdas import samplesheet_event
+from sequence_run_manager_proc.services import sample_sheet_srv
 from sequence_run_manager_proc.tests.case import logger, SequenceRunProcUnitTestCase
 
 """
@@ -115,3 +120,74 @@ class SampleSheetEventUnitTests(SequenceRunProcUnitTestCase):
         qs_sample_sheet = SampleSheet.objects.filter(sequence=seq)
         logger.info(f"Found SampleSheet record from db: {qs_sample_sheet}")
         self.assertEqual(1, qs_sample_sheet.count())
+
+    def test_event_handler_sample_sheet_too_large(self):
+        """
+        python manage.py test sequence_run_manager_proc.tests.test_samplesheet_event.SampleSheetEventUnitTests.test_event_handler_sample_sheet_too_large
+        """
+        mock_event_message = (
+            SequenceRunManagerProcFactory.mock_sample_sheet_change_event_message()
+        )
+        os.environ["SAMPLE_SHEET_MAX_BYTES"] = "100"
+        self.addCleanup(os.environ.pop, "SAMPLE_SHEET_MAX_BYTES")
+
+        with self.assertLogs(level="INFO") as logs:
+            response = samplesheet_event.event_handler(mock_event_message, None)
+
+        self.assertIn("Sample sheet rejected", response["message"])
+        # rejected before anything is recorded
+        self.assertFalse(Sequence.objects.exists())
+        self.assertFalse(SampleSheet.objects.exists())
+        # the sample sheet content is not logged
+        self.assertNotIn(
+            mock_event_message["detail"]["samplesheetBase64gz"], str(logs.output)
+        )
+
+    def test_event_handler_repeated_srssc_event(self):
+        """
+        python manage.py test sequence_run_manager_proc.tests.test_samplesheet_event.SampleSheetEventUnitTests.test_event_handler_repeated_srssc_event
+        """
+        mock_event_message = (
+            SequenceRunManagerProcFactory.mock_sample_sheet_change_event_message()
+        )
+
+        for _ in range(3):
+            samplesheet_event.event_handler(mock_event_message, None)
+
+        # a single ghost sequence run, with its sample sheet and comment
+        seq = Sequence.objects.get(
+            instrument_run_id=TestConstant.instrument_run_id.value
+        )
+        self.assertIsNotNone(seq.ghost_sample_sheet_checksum)
+        sample_sheet = SampleSheet.objects.get(sequence=seq)
+        self.assertEqual(seq.ghost_sample_sheet_checksum, sample_sheet.checksum_sha256)
+        self.assertEqual(
+            1, Comment.objects.filter(target_id=sample_sheet.orcabus_id).count()
+        )
+        self.assertEqual(2, LibraryAssociation.objects.filter(sequence=seq).count())
+
+    def test_event_handler_repeated_wrsc_event(self):
+        """
+        python manage.py test sequence_run_manager_proc.tests.test_samplesheet_event.SampleSheetEventUnitTests.test_event_handler_repeated_wrsc_event
+        """
+        mock_event_message = (
+            SequenceRunManagerProcFactory.mock_workflow_run_update_event_message()
+        )
+        # the content read from ICA does not match the checksum of the event
+        sample_sheet_content = (
+            SequenceRunManagerProcFactory.mock_bssh_sample_sheet() + "\n"
+        )
+        mock_ica_service = mock()
+        when(mock_ica_service).get_file_contents_from_uri(...).thenReturn(
+            sample_sheet_content
+        )
+        when(sample_sheet_srv).get_ica_service().thenReturn(mock_ica_service)
+
+        for _ in range(3):
+            samplesheet_event.event_handler(mock_event_message, None)
+
+        seq = Sequence.objects.get(
+            instrument_run_id=TestConstant.instrument_run_id.value
+        )
+        self.assertEqual("sample_sheet.csv", seq.sample_sheet_name)
+        self.assertEqual(1, SampleSheet.objects.filter(sequence=seq).count())
@@ -1,9 +1,17 @@
 import json
+import os
+import tempfile
 from pathlib import Path
 
 from unittest import TestCase
+from unittest.mock import patch
 from v2_samplesheet_parser.functions.parser import parse_samplesheet
 
+from sequence_run_manager_proc.services import sample_sheet_parse_cache
+from sequence_run_manager_proc.services.sample_sheet_parse_cache import (
+    SampleSheetParseCache,
+)
+
 
 class TestSampleSheetParser(TestCase):
     def setUp(self):
@@ -80,3 +88,78 @@ class TestSampleSheetParser(TestCase):
                 print(f"Value mismatch at {current_path}:")
                 print(f"  Actual: {actual[key]}")
                 print(f"  Expected: {expected[key]}")
+
+
+class TestSampleSheetParseCache(TestCase):
+    def setUp(self):
+        super().setUp()
+        with open(
+            Path(__file__).parent / "examples/standard-sheet-with-settings.csv", "r"
+        ) as f:
+            self.samplesheet = f.read()
+        with open(
+            Path(__file__).parent / "examples/tso500-cloud-settings.csv", "r"
+        ) as f:
+            self.other_samplesheet = f.read()
+        patcher = patch.object(
+            sample_sheet_parse_cache,
+            "parse_samplesheet",
+            side_effect=parse_samplesheet,
+        )
+        self.mock_parse_samplesheet = patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_parsed_once(self):
+        """
+        python manage.py test sequence_run_manager_proc.tests.test_samplesheet_parser.TestSampleSheetParseCache.test_parsed_once
+        """
+        cache = SampleSheetParseCache(max_size=1, parser_version="1")
+
+        result = cache.parse(self.samplesheet)
+        self.assertEqual(parse_samplesheet(self.samplesheet), result)
+        # a copy is returned, the cached one is left as is
+        result["header"] = None
+        self.assertEqual(result.keys(), cache.parse(self.samplesheet).keys())
+        self.assertNotEqual(None, cache.parse(self.samplesheet)["header"])
+        self.assertEqual(1, self.mock_parse_samplesheet.call_count)
+        self.assertEqual((2, 1), (cache.hits, cache.misses))
+
+        # evicted by the least recently used
+        cache.parse(self.other_samplesheet)
+        cache.parse(self.samplesheet)
+        self.assertEqual(3, self.mock_parse_samplesheet.call_count)
+
+        # keyed by parser version
+        SampleSheetParseCache(parser_version="2").parse(self.samplesheet)
+        self.assertEqual(4, self.mock_parse_samplesheet.call_count)
+
+    def test_parse_error_not_cached(self):
+        """
+        python manage.py test sequence_run_manager_proc.tests.test_samplesheet_parser.TestSampleSheetParseCache.test_parse_error_not_cached
+        """
+        cache = SampleSheetParseCache()
+        self.mock_parse_samplesheet.side_effect = ValueError("invalid sample sheet")
+
+        for _ in range(2):
+            with self.assertRaises(ValueError):
+                cache.parse("not a sample sheet")
+        self.assertEqual(2, self.mock_parse_samplesheet.call_count)
+
+    def test_disk_store(self):
+        """
+        python manage.py test sequence_run_manager_proc.tests.test_samplesheet_parser.TestSampleSheetParseCache.test_disk_store
+        """
+        with tempfile.TemporaryDirectory() as cache_dir:
+            cache = SampleSheetParseCache(cache_dir=cache_dir, dir_max_entries=1)
+            expected = cache.parse(self.samplesheet)
+
+            # read back by another process (cold memory cache)
+            result = SampleSheetParseCache(cache_dir=cache_dir).parse(self.samplesheet)
+            self.assertEqual(expected, result)
+            self.assertEqual(1, self.mock_parse_samplesheet.call_count)
+
+            # bounded
+            cache.parse(self.other_samplesheet)
+            self.assertEqual(
+                [f"{cache.key(self.other_samplesheet)}.json"], os.listdir(cache_dir)
+            )
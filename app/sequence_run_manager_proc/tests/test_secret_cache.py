@@ -0,0 +1,165 @@
+import os
+import threading
+import time
+from unittest.mock import MagicMock, patch
+
+from libica.openapi.v3 import ApiException
+from libumccr.aws import libsm
+
+from sequence_run_manager_proc.services import bssh_srv, ica_srv
+from sequence_run_manager_proc.services.secret_cache import SecretCache
+from sequence_run_manager_proc.tests.case import SequenceRunProcUnitTestCase, logger
+
+
+class SecretCacheUnitTests(SequenceRunProcUnitTestCase):
+    def setUp(self) -> None:
+        super(SecretCacheUnitTests, self).setUp()
+        self.now = 0.0
+        self.fetched = []
+
+    def tearDown(self) -> None:
+        if "ICAV2_ACCESS_TOKEN_SECRET_ID" in os.environ:
+            del os.environ["ICAV2_ACCESS_TOKEN_SECRET_ID"]
+        super(SecretCacheUnitTests, self).tearDown()
+
+    def fetch(self, secret_id):
+        self.fetched.append(secret_id)
+        return f"{secret_id}-token-{len(self.fetched)}"
+
+    def test_ttl(self):
+        """
+        python manage.py test sequence_run_manager_proc.tests.test_secret_cache.SecretCacheUnitTests.test_ttl
+        """
+        cache = SecretCache(ttl_seconds=60, fetch=self.fetch, clock=lambda: self.now)
+
+        self.assertEqual("bssh-token-1", cache.get("bssh"))
+        self.now = 59
+        self.assertEqual("bssh-token-1", cache.get("bssh"))
+        self.assertEqual(["bssh"], self.fetched)
+
+        # expired
+        self.now = 60
+        self.assertEqual("bssh-token-2", cache.get("bssh"))
+
+        # refreshed on demand
+        cache.invalidate("bssh")
+        self.assertEqual("bssh-token-3", cache.get("bssh"))
+        self.assertEqual("ica-token-4", cache.get("ica"))
+        self.assertEqual(["bssh", "bssh", "bssh", "ica"], self.fetched)
+
+    def test_secrets_manager_read_on_refresh(self):
+        """
+        python manage.py test sequence_run_manager_proc.tests.test_secret_cache.SecretCacheUnitTests.test_secrets_manager_read_on_refresh
+        """
+        self.mock_secret("bssh", "token-1", "token-2", "token-3")
+        # a stale value in the LRU cache of libsm.get_secret is not served
+        libsm.get_secret.cache_clear()
+        self.assertEqual("token-1", libsm.get_secret("bssh"))
+        cache = SecretCache(ttl_seconds=60, clock=lambda: self.now)
+
+        self.assertEqual("token-2", cache.get("bssh"))
+        self.assertEqual("token-2", cache.get("bssh"))
+
+        # expired
+        self.now = 60
+        self.assertEqual("token-3", cache.get("bssh"))
+
+        # refreshed on demand
+        self.mock_secret("bssh", "token-4")
+        cache.invalidate("bssh")
+        self.assertEqual("token-4", cache.get("bssh"))
+        self.assertEqual(4, self.secret_reads("bssh"))
+        libsm.get_secret.cache_clear()
+
+    def test_concurrent_get(self):
+        """
+        python manage.py test sequence_run_manager_proc.tests.test_secret_cache.SecretCacheUnitTests.test_concurrent_get
+        """
+
+        def slow_fetch(secret_id):
+            time.sleep(0.05)
+            return self.fetch(secret_id)
+
+        cache = SecretCache(fetch=slow_fetch)
+        tokens = []
+        threads = [
+            threading.Thread(target=lambda: tokens.append(cache.get("bssh")))
+            for _ in range(8)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        # a single Secrets Manager call for all the threads
+        self.assertEqual(["bssh"], self.fetched)
+        self.assertEqual(["bssh-token-1"] * 8, tokens)
+
+    def test_bssh_service_singleton(self):
+        """
+        python manage.py test sequence_run_manager_proc.tests.test_secret_cache.SecretCacheUnitTests.test_bssh_service_singleton
+        """
+        bssh_service = bssh_srv.get_bssh_service()
+
+        self.assertIs(bssh_service, bssh_srv.get_bssh_service())
+        for _ in range(3):
+            self.assertEqual("Bearer mock-token", bssh_service.headers["Authorization"])
+            self.assertEqual(
+                "Bearer mock-token",
+                bssh_srv.BSSHService().headers["Authorization"],
+            )
+        # one Secrets Manager call for all the services and requests
+        self.assertEqual(1, self.secret_reads("test"))
+
+    def test_ica_service_token_refreshed_on_401(self):
+        """
+        python manage.py test sequence_run_manager_proc.tests.test_secret_cache.SecretCacheUnitTests.test_ica_service_token_refreshed_on_401
+        """
+        os.environ["ICAV2_ACCESS_TOKEN_SECRET_ID"] = "ica-test"
+        self.mock_secret("ica-test", "old-token", "new-token")
+
+        used_tokens = []
+
+        def create_download_url_for_data(project_id, data_id):
+            token = mock_project_data_api.call_args[0][0].configuration.access_token
+            used_tokens.append(token)
+            if token == "old-token":
+                raise ApiException(status=401, reason="Unauthorized")
+            return MagicMock(url="https://presigned.example.com/SampleSheet.csv")
+
+        with patch.object(ica_srv, "ProjectDataApi") as mock_project_data_api:
+            mock_project_data_api.return_value.create_download_url_for_data.side_effect = (
+                create_download_url_for_data
+            )
+            ica_service = ica_srv.get_ica_service()
+            self.assertIs(ica_service, ica_srv.get_ica_service())
+
+            url = ica_service._create_download_url("project-id", "fil.1")
+            self.assertEqual("https://presigned.example.com/SampleSheet.csv", url)
+            # the refreshed token is kept
+            ica_service._create_download_url("project-id", "fil.2")
+
+        logger.info(f"Tokens used: {used_tokens}")
+        self.assertEqual(["old-token", "new-token", "new-token"], used_tokens)
+        self.assertEqual(2, self.secret_reads("ica-test"))
+
+    def test_ica_service_unauthorized_after_refresh(self):
+        """
+        python manage.py test sequence_run_manager_proc.tests.test_secret_cache.SecretCacheUnitTests.test_ica_service_unauthorized_after_refresh
+        """
+        os.environ["ICAV2_ACCESS_TOKEN_SECRET_ID"] = "ica-test"
+        self.mock_secret("ica-test", "revoked-token")
+
+        with patch.object(ica_srv, "ProjectDataApi") as mock_project_data_api:
+            mock_project_data_api.return_value.get_project_data.side_effect = (
+                ApiException(status=401, reason="Unauthorized")
+            )
+            with self.assertRaises(ApiException):
+                ica_srv.get_ica_service()._get_project_data_obj_by_id(
+                    "project-id", "fil.1"
+                )
+
+        # retried once only
+        self.assertEqual(
+            2, mock_project_data_api.return_value.get_project_data.call_count
+        )
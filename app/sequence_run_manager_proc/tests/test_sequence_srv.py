@@ -1,4 +1,8 @@
-from sequence_run_manager.models.sequence import Sequence
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from sequence_run_manager.models.sequence import Sequence, SequenceStatus
+from sequence_run_manager.models.state import State
 from sequence_run_manager.tests.factories import TestConstant, SequenceFactory
 from sequence_run_manager_proc.domain.sequence import SequenceDomain
 from sequence_run_manager_proc.services import sequence_srv
@@ -87,3 +91,87 @@ class SequenceRunSrvUnitTests(SequenceRunProcUnitTestCase):
         self.assertFalse(
             seq_domain.status_has_changed
         )  # assert Sequence Run Status has changed False
+
+    def test_update_existing_sequence_duplicate_event_no_write(self):
+        """
+        python manage.py test sequence_run_manager_proc.tests.test_sequence_srv.SequenceRunSrvUnitTests.test_update_existing_sequence_duplicate_event_no_write
+        """
+        mock_seq: Sequence = SequenceFactory()
+        seq_in_db = Sequence.objects.get(sequence_run_id=mock_seq.sequence_run_id)
+
+        with self.assertNumQueries(0):
+            sequence_srv.update_existing_sequence(
+                seq_in_db,
+                {
+                    "id": mock_seq.sequence_run_id,
+                    "instrumentRunId": mock_seq.instrument_run_id,
+                    "sampleSheetName": mock_seq.sample_sheet_name,
+                },
+            )
+
+    def test_create_or_update_sequence_from_bssh_event_statements(self):
+        """
+        python manage.py test sequence_run_manager_proc.tests.test_sequence_srv.SequenceRunSrvUnitTests.test_create_or_update_sequence_from_bssh_event_statements
+        """
+        mock_payload = {
+            "id": TestConstant.sequence_run_id.value,
+            "name": TestConstant.sequence_run_id.value,
+            "instrumentRunId": TestConstant.instrument_run_id.value,
+            "dateModified": "2020-05-09T22:17:10.815Z",
+            "status": "New",
+            "sampleSheetName": "SampleSheet.csv",
+        }
+
+        def statements(payload) -> list[str]:
+            with CaptureQueriesContext(connection) as ctx:
+                sequence_srv.create_or_update_sequence_from_bssh_event(payload)
+            return [
+                q["sql"]
+                for q in ctx.captured_queries
+                if "SAVEPOINT" not in q["sql"].upper()
+            ]
+
+        # new run: lookup, sequence insert and instrument run summary upsert, state insert
+        self.assertEqual(4, len(statements(mock_payload)))
+
+        # duplicate delivery: lookup, state insert which is ignored on conflict
+        self.assertEqual(2, len(statements(mock_payload)))
+        self.assertEqual(
+            1,
+            State.objects.filter(
+                sequence__sequence_run_id=TestConstant.sequence_run_id.value
+            ).count(),
+        )
+
+        # next state: lookup, state insert, status update and instrument run summary upsert
+        seq_domain_statements = statements(
+            {
+                **mock_payload,
+                "dateModified": "2020-05-10T22:17:10.815Z",
+                "status": "Complete",
+            }
+        )
+        self.assertEqual(4, len(seq_domain_statements))
+        self.assertEqual(
+            "SUCCEEDED",
+            Sequence.objects.get(
+                sequence_run_id=TestConstant.sequence_run_id.value
+            ).status,
+        )
+
+    def test_create_new_sequence_conflict(self):
+        """
+        python manage.py test sequence_run_manager_proc.tests.test_sequence_srv.SequenceRunSrvUnitTests.test_create_new_sequence_conflict
+        """
+        mock_seq: Sequence = SequenceFactory()
+        status = SequenceStatus.from_seq_run_status("New")
+
+        # e.g. created by a racing lambda after our lookup
+        sequence = sequence_srv.create_new_sequence(
+            mock_seq.sequence_run_id,
+            {"id": mock_seq.sequence_run_id},
+            status,
+            sequence_srv.calculate_timing_info("2020-05-09T22:17:10.815Z", status),
+        )
+        self.assertIsNone(sequence)
+        self.assertEqual(1, Sequence.objects.count())
@@ -58,5 +58,14 @@ export const getSchemas = (): Array<SchemaProps> => {
         docBase + '/SequenceRunLibraryLinkingChange/SequenceRunLibraryLinkingChange.schema.json'
       ),
     },
+    {
+      schemaName: SCHEMA_REGISTRY_NAME + '@SequenceRunLibraryLinkingDelta',
+      schemaDescription:
+        'Library linking delta (added and removed libraries) event for sequence run by SequenceRunManager',
+      schemaLocation: path.join(
+        __dirname,
+        docBase + '/SequenceRunLibraryLinkingDelta/SequenceRunLibraryLinkingDelta.schema.json'
+      ),
+    },
   ];
 };
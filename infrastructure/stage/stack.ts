@@ -3,7 +3,14 @@ import * as cdk from 'aws-cdk-lib';
 import { aws_lambda, aws_secretsmanager, Duration } from 'aws-cdk-lib';
 import { Construct } from 'constructs';
 import { ISecurityGroup, IVpc, SecurityGroup, Vpc, VpcLookupOptions } from 'aws-cdk-lib/aws-ec2';
-import { EventBus, EventField, IEventBus, Rule, RuleTargetInput } from 'aws-cdk-lib/aws-events';
+import {
+  EventBus,
+  EventField,
+  IEventBus,
+  Rule,
+  RuleTargetInput,
+  Schedule,
+} from 'aws-cdk-lib/aws-events';
 import { Topic } from 'aws-cdk-lib/aws-sns';
 import { LambdaFunction, SnsTopic } from 'aws-cdk-lib/aws-events-targets';
 import { PythonFunction, PythonLayerVersion } from '@aws-cdk/aws-lambda-python-alpha';
@@ -145,6 +152,7 @@ export class SequenceRunManagerStack extends GitStack {
     this.createSlackNotificationHandler(props.slackTopicName, props.orcabusUIBaseUrl);
     this.createProcSampleSheetHandler();
     this.createProcLibraryLinkingHandler();
+    this.createOutboxRelayHandler();
   }
 
   private createPythonFunction(name: string, props: object): PythonFunction {
@@ -388,6 +396,30 @@ export class SequenceRunManagerStack extends GitStack {
     eventRule.addTarget(new LambdaFunction(fn));
   }
 
+  private createOutboxRelayHandler() {
+    /**
+     * Publish the pending domain events of the event outbox table, recorded along with the database changes
+     * (by the API, or left over by the ProcHandler e.g. when rejected by EventBridge).
+     * A single instance at a time, so that the events of a sequence run are published in order.
+     */
+    const outboxRelayFn = this.createPythonFunction('OutboxRelay', {
+      index: 'sequence_run_manager_proc/lambdas/outbox_relay.py',
+      handler: 'handler',
+      timeout: Duration.minutes(2),
+      memorySize: 512,
+      reservedConcurrentExecutions: 1,
+    });
+
+    this.mainBus.grantPutEventsTo(outboxRelayFn);
+
+    const scheduleRule = new Rule(this, this.stackName + 'OutboxRelayScheduleRule', {
+      ruleName: this.stackName + 'OutboxRelayScheduleRule',
+      description: 'Rule to periodically run the SRM OutboxRelay Lambda',
+      schedule: Schedule.rate(Duration.minutes(1)),
+    });
+    scheduleRule.addTarget(new LambdaFunction(outboxRelayFn));
+  }
+
   private createSlackNotificationHandler(topicName: string, orcabusUIBaseUrl: string) {
     /**
      * subscribe to the 'SequenceRunStateChange' event, and send the slack notification toptic when the failed event is triggered.
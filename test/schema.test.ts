@@ -26,4 +26,8 @@ test('Test orcabus.sequencerunmanager SequenceRunManagerSchemaRegistry Creation'
   template.hasResourceProperties('AWS::EventSchemas::Schema', {
     SchemaName: 'orcabus.sequencerunmanager@SequenceRunLibraryLinkingChange',
   });
+
+  template.hasResourceProperties('AWS::EventSchemas::Schema', {
+    SchemaName: 'orcabus.sequencerunmanager@SequenceRunLibraryLinkingDelta',
+  });
 });